@@ -1,17 +1,17 @@
-import requests
-from bs4 import BeautifulSoup
 import pandas as pd
-import time
 import os
 import json
 from datetime import datetime
+from http_client import BASE_URL, get_client
+from parser_backend import DEFAULT_PARSER, make_soup
+from category_crawler import DEFAULT_CATEGORY_WORKERS, DEFAULT_CATEGORY_RPS, FailedPages, crawl_categories, crawl_pages, pagination_links
 
 class LineageMScraper:
-    def __init__(self):
-        self.base_url = "https://www.gametsg.net"
-        self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
+    def __init__(self, parser=DEFAULT_PARSER):
+        self.base_url = BASE_URL
+        self.parser = parser
+        self.client = get_client()
+        self.failed_pages = FailedPages()
         self.categories = []
         self.items = []
         
@@ -27,10 +27,10 @@ class LineageMScraper:
         try:
             url = f"{self.base_url}/equip.html"
             print(f"Fetching categories from {url}...")
-            response = requests.get(url, headers=self.headers)
+            response = self.client.get(url)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = make_soup(response.text, self.parser)
             
             # Find all links that contain "/equip?type_name="
             links = soup.find_all('a', href=lambda href: href and '/equip?type_name=' in href)
@@ -60,27 +60,26 @@ class LineageMScraper:
             print(f"Error getting equipment categories: {str(e)}")
             return []
 
-    def get_items_for_category(self, category):
+    def parse_category_page(self, category, page_url):
         """
-        Scrapes items for a specific category
+        Scrapes the items on one page of a category list
+        
+        Returns:
+            (items, URLs of the other list pages linked from this page)
         """
         try:
-            category_id = category['type_id']
-            category_name = category['category_name']
-            url = category['url']
-            
-            print(f"\nScraping items for category: {category_name} (URL: {url})")
-            
-            response = requests.get(url, headers=self.headers)
+            response = self.client.get(page_url)
             response.raise_for_status()
+            self.failed_pages.resolve(page_url)
             
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = make_soup(response.text, self.parser)
+            links = pagination_links(soup, page_url)
             
             # Find the table containing the items
             item_table = soup.find('table', class_='table')
             if not item_table:
-                print(f"No item table found for category: {category_name}")
-                return []
+                print(f"No item table found for category: {category['category_name']} ({page_url})")
+                return [], links
                 
             rows = item_table.find_all('tr')[1:]  # Skip header row
             category_items = []
@@ -98,8 +97,8 @@ class LineageMScraper:
                 item_url = f"{self.base_url}{item_link['href']}" if item_link else None
                 
                 item_data = {
-                    'category_id': category_id,
-                    'category_name': category_name,
+                    'category_id': category['type_id'],
+                    'category_name': category['category_name'],
                     'item_name': item_name,
                     'item_url': item_url
                 }
@@ -111,36 +110,49 @@ class LineageMScraper:
                     item_data[key] = value
                 
                 category_items.append(item_data)
-                print(f"Found item: {item_name}")
             
-            # Add items to the main list
-            self.items.extend(category_items)
-            
-            print(f"Found {len(category_items)} items in category {category_name}")
-            
-            # Be nice to the server
-            time.sleep(1)
-            
-            return category_items
+            return category_items, links
         
         except Exception as e:
-            print(f"Error scraping items for category {category['category_name']}: {str(e)}")
-            return []
+            print(f"Error scraping items for category {category['category_name']} ({page_url}): {str(e)}")
+            self.failed_pages.add(category, page_url, e)
+            return [], []
 
-    def scrape_all_categories(self):
+    def get_items_for_category(self, category):
+        """
+        Scrapes items for a specific category, following its pager
+        """
+        print(f"Scraping items for category: {category['category_name']} (URL: {category['url']})")
+        category_items = crawl_pages(
+            category['url'],
+            lambda page_url: self.parse_category_page(category, page_url),
+            lambda item: item.get('item_url')
+        )
+        print(f"Found {len(category_items)} items in category {category['category_name']}")
+        return category_items
+
+    def save_category(self, category, items):
+        """
+        Saves one category's items to its CSV and JSON files
+        """
+        category_filename = f"items_{category['type_id']}_{self._sanitize_filename(category['category_name'])}"
+        self._save_to_csv(items, f"{category_filename}.csv")
+        self._save_to_json(items, f"{category_filename}.json")
+
+    def scrape_all_categories(self, workers=DEFAULT_CATEGORY_WORKERS, requests_per_second=DEFAULT_CATEGORY_RPS):
         """
         Scrapes items for all categories
+        
+        Categories are fetched concurrently under a shared rate limit and
+        each category's files are written on a background thread.
         """
         if not self.categories:
             self.get_equipment_categories()
         
-        for category in self.categories:
-            items = self.get_items_for_category(category)
-            
-            # Save items for this category
-            category_filename = f"items_{category['type_id']}_{self._sanitize_filename(category['category_name'])}"
-            self._save_to_csv(items, f"{category_filename}.csv")
-            self._save_to_json(items, f"{category_filename}.json")
+        results = crawl_categories(self.client, self.categories, self.get_items_for_category, self.save_category,
+                                   workers, requests_per_second)
+        # Combined files keep the category order
+        self.items = [item for items in results for item in items]
         
         # Save all items
         self._save_to_csv(self.items, "all_items.csv")
@@ -0,0 +1,270 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import platform
+import sys
+import time
+import types
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from fetch_and_parse_items import ItemFetcher
+from item_detail_fetcher import ItemDetailFetcher
+from parser_backend import PARSER_BACKENDS, DEFAULT_PARSER, DETAIL_REGIONS, make_soup, load_example_pages
+
+logger = logging.getLogger(__name__)
+
+BENCHMARK_TARGETS = ('final', 'items', 'monster_drops')
+DEFAULT_OUTPUT = "parser_benchmark.json"
+
+FINAL_SECTIONS = ('extract_basic_info', 'extract_detail_info', 'extract_enhance_info', 'extract_monster_drops')
+DETAIL_SECTIONS = ('extract_basic_info', 'extract_detail_info', 'extract_enhance_info', 'extract_craft_materials', 'extract_monster_drops')
+
+class SectionTimer:
+    def __init__(self):
+        """
+        Accumulate the time spent in wrapped extractor methods
+        """
+        self.totals = {}
+
+    def wrap(self, owner, names):
+        """
+        Replace owner.<name> with a timed wrapper for each name
+        """
+        for name in names:
+            setattr(owner, name, self.timed(name, getattr(owner, name)))
+            self.totals[name] = 0.0
+
+    def timed(self, name, method):
+        totals = self.totals
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                totals[name] += time.perf_counter() - start
+        return wrapper
+
+    def reset(self):
+        for name in self.totals:
+            self.totals[name] = 0.0
+
+
+def final_target(parser, restrict, timer):
+    """
+    ItemFetcher.parse_item_html, timed per extract_* section
+    """
+    fetcher = ItemFetcher(offline=True, parser=parser, restrict=restrict)
+    timer.wrap(fetcher.xpath_extractor or fetcher, FINAL_SECTIONS)
+    return fetcher.parse_item_html
+
+def items_target(parser, restrict, timer):
+    """
+    ItemDetailFetcher.parse_item_details, timed per extract_* section
+    """
+    fetcher = ItemDetailFetcher(None, offline=True, parser=parser, restrict=restrict)
+    timer.wrap(fetcher.xpath_extractor or fetcher, DETAIL_SECTIONS)
+    return fetcher.parse_item_details
+
+def monster_drops_target(parser, restrict, timer):
+    """
+    update_filtered_items.extract_monster_drops on a BeautifulSoup tree
+    """
+    # Imported here: update_filtered_items truncates its log file on import
+    import update_filtered_items
+
+    extractor = types.SimpleNamespace(extract_monster_drops=update_filtered_items.extract_monster_drops)
+    timer.wrap(extractor, ('extract_monster_drops',))
+    regions = DETAIL_REGIONS if restrict else None
+    def parse(html_content, item):
+        return extractor.extract_monster_drops(make_soup(html_content, parser, regions))
+    return parse
+
+TARGETS = {
+    'final': final_target,
+    'items': items_target,
+    'monster_drops': monster_drops_target,
+}
+
+
+def percentile(sorted_values, pct):
+    """
+    Nearest-rank percentile of an already sorted list
+    """
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process in MiB, or None where unsupported
+
+    The peak is process-wide, so each target runs in a process of its own
+    (see target_process).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KiB on Linux
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def run_target(target, pages, parser=DEFAULT_PARSER, restrict=False, warmup=20):
+    """
+    Replay the pages through one benchmark target
+
+    Returns:
+        Dict with pages_per_sec, latency_ms percentiles, sections_ms (mean per page) and peak_rss_mb
+    """
+    timer = SectionTimer()
+    parse = TARGETS[target](parser, restrict, timer)
+    for item, html_content in pages[:warmup]:
+        parse(html_content, item)
+    timer.reset()
+
+    latencies = []
+    start = time.perf_counter()
+    for item, html_content in pages:
+        page_start = time.perf_counter()
+        parse(html_content, item)
+        latencies.append(time.perf_counter() - page_start)
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    count = len(latencies) or 1
+    total = sum(latencies)
+    # Whatever is not spent in an extractor is tree building and record assembly
+    sections = {name: seconds for name, seconds in timer.totals.items()}
+    sections['parse_tree'] = max(0.0, total - sum(timer.totals.values()))
+    return {
+        'pages': len(latencies),
+        'pages_per_sec': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'latency_ms': {
+            'mean': round(total / count * 1000, 3),
+            'p50': round(percentile(latencies, 50) * 1000, 3) if latencies else None,
+            'p95': round(percentile(latencies, 95) * 1000, 3) if latencies else None,
+            'p99': round(percentile(latencies, 99) * 1000, 3) if latencies else None,
+            'max': round(latencies[-1] * 1000, 3) if latencies else None,
+        },
+        'sections_ms': {name: round(seconds / count * 1000, 3) for name, seconds in sections.items()},
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+def target_process(target, example_dir, limit, parser, restrict, warmup):
+    """
+    Load the pages and run one target; runs in a fresh process so peak_rss_mb belongs to that target alone
+    """
+    warnings.filterwarnings('ignore', category=FutureWarning)
+    return run_target(target, load_example_pages(example_dir, limit), parser, restrict, warmup)
+
+def run_benchmark(example_dir='example', limit=None, targets=BENCHMARK_TARGETS, parser=DEFAULT_PARSER, restrict=False, warmup=20):
+    """
+    Run the benchmark targets over the example/ corpus, each in a spawned process
+
+    Returns:
+        Results dict: {'meta': {...}, 'targets': {target: {...}}}
+    """
+    logger.info(f"Benchmarking {', '.join(targets)} on {example_dir} ({parser}{', restrict' if restrict else ''})")
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'parser': parser,
+            'restrict': restrict,
+            'pages': None,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'targets': {},
+    }
+    context = multiprocessing.get_context('spawn')
+    for target in targets:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            result = executor.submit(target_process, target, example_dir, limit, parser, restrict, warmup).result()
+        results['targets'][target] = result
+        results['meta']['pages'] = result['pages']
+        logger.info(f"{target}: {result['pages_per_sec']} pages/sec, p95 {result['latency_ms']['p95']} ms")
+    return results
+
+def compare_results(current, baseline, threshold=0.10):
+    """
+    Compare pages/sec against a baseline run
+
+    Returns:
+        (rows, regressions): rows of (target, baseline, current, change) and the
+        targets whose throughput dropped by more than threshold
+    """
+    for key in ('parser', 'restrict', 'pages'):
+        if current['meta'].get(key) != baseline['meta'].get(key):
+            logger.warning(f"Baseline was run with {key}={baseline['meta'].get(key)}, this run with {key}={current['meta'].get(key)}")
+
+    rows = []
+    regressions = []
+    for target, result in current['targets'].items():
+        base = baseline['targets'].get(target)
+        if not base or not base.get('pages_per_sec') or not result.get('pages_per_sec'):
+            continue
+        change = result['pages_per_sec'] / base['pages_per_sec'] - 1
+        rows.append((target, base['pages_per_sec'], result['pages_per_sec'], change))
+        if change < -threshold:
+            regressions.append(target)
+    return rows, regressions
+
+def print_results(results):
+    for target, result in results['targets'].items():
+        latency = result['latency_ms']
+        print(f"\n{target}: {result['pages_per_sec']} pages/sec  "
+              f"p50 {latency['p50']} ms  p95 {latency['p95']} ms  p99 {latency['p99']} ms  peak RSS {result['peak_rss_mb']} MiB")
+        for section, ms in sorted(result['sections_ms'].items(), key=lambda entry: -entry[1]):
+            print(f"  {section:26} {ms:>8.3f} ms/page")
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    # soupsieve warns about :contains on every page
+    warnings.filterwarnings('ignore', category=FutureWarning)
+
+    parser = argparse.ArgumentParser(description='Benchmark the page extractors on the example/ corpus')
+    parser.add_argument('--example-dir', default='example', help='Folder with <item_name>.html files')
+    parser.add_argument('--limit', type=int, help='Only benchmark the first N pages')
+    parser.add_argument('--targets', nargs='+', choices=BENCHMARK_TARGETS, default=list(BENCHMARK_TARGETS), help='Extractors to benchmark')
+    parser.add_argument('--parser', choices=PARSER_BACKENDS, default=DEFAULT_PARSER, help='HTML parser backend')
+    parser.add_argument('--restrict', action='store_true', help='Only parse the page regions the extractors read')
+    parser.add_argument('--warmup', type=int, default=20, help='Pages parsed before timing starts')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='Write the results as JSON to this file')
+    parser.add_argument('--baseline', help='Results JSON of an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Allowed pages/sec drop against the baseline (0.10 = 10%%)')
+    args = parser.parse_args()
+
+    # Read the baseline before the results are written: --output may be the same file
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    results = run_benchmark(args.example_dir, args.limit, args.targets, args.parser, args.restrict, args.warmup)
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        logger.info(f"Results saved to {args.output}")
+
+    if baseline:
+        rows, regressions = compare_results(results, baseline, args.threshold)
+        print(f"\nCompared with {args.baseline} (threshold {args.threshold:.0%})")
+        for target, base, current, change in rows:
+            flag = "  REGRESSION" if target in regressions else ""
+            print(f"  {target:14} {base:>8} -> {current:>8} pages/sec  {change:+.1%}{flag}")
+        if regressions:
+            logger.error(f"Throughput regressed beyond {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import parse_qs, urljoin, urlsplit
+
+from failed_items import DeadLetterQueue
+
+DEFAULT_CATEGORY_WORKERS = 8
+DEFAULT_CATEGORY_RPS = 4.0
+# Safety stop for a pager that keeps linking to new URLs
+MAX_CATEGORY_PAGES = 200
+# Stage of failed category list pages in failed_items.jsonl
+CATEGORY_PAGE_STAGE = 'category_pages'
+
+def pagination_links(soup, page_url):
+    """
+    Return the list pages linked from a page's pager (div.page), as absolute URLs
+
+    Only links to the same path and the same type_name are followed. The
+    comment pager (mess_page / mess_type) uses the same markup and is skipped.
+    """
+    page = urlsplit(page_url)
+    type_name = parse_qs(page.query).get('type_name')
+    links = []
+    for link in soup.select('div.page a[href]'):
+        url = urljoin(page_url, link['href'])
+        parts = urlsplit(url)
+        query = parse_qs(parts.query)
+        if parts.path != page.path or query.get('type_name') != type_name:
+            continue
+        if any(key.startswith('mess_') for key in query):
+            continue
+        if url not in links:
+            links.append(url)
+    return links
+
+def crawl_pages(first_url, parse_page, item_key, max_pages=MAX_CATEGORY_PAGES):
+    """
+    Follow a category's pager from its first page and collect the items of every page
+
+    Args:
+        first_url: URL of the first list page
+        parse_page: Callable(url) -> (items, linked page URLs)
+        item_key: Callable(item) -> key used to drop items seen on an earlier page
+        max_pages: Maximum number of pages fetched for one category
+
+    Returns:
+        List of items in page order
+    """
+    seen_urls = {first_url}
+    pending = [first_url]
+    seen_keys = set()
+    items = []
+    fetched = 0
+    while pending and fetched < max_pages:
+        page_items, links = parse_page(pending.pop(0))
+        fetched += 1
+        for item in page_items:
+            key = item_key(item)
+            if key:
+                if key in seen_keys:
+                    continue
+                seen_keys.add(key)
+            items.append(item)
+        for link in links:
+            if link not in seen_urls:
+                seen_urls.add(link)
+                pending.append(link)
+    if pending:
+        print(f"Stopped after {max_pages} pages for {first_url}")
+    return items
+
+
+class FailedPages:
+    def __init__(self, dead_letters=None):
+        """
+        Record category list pages that could not be fetched in the failed-items list
+
+        A page that a later crawl fetches again is marked resolved;
+        `failed_items.py replay --stage category_pages` crawls their
+        categories again (ItemDetailScraper.replay_failed).
+        """
+        self.dead_letters = dead_letters or DeadLetterQueue()
+        self.outstanding = {entry['item_url'] for entry in self.dead_letters.load(CATEGORY_PAGE_STAGE)}
+        self.lock = threading.Lock()
+
+    def add(self, category, page_url, error):
+        """
+        Record a failed list page of a category
+        """
+        item = {'item_id': category.get('type_id', ''), 'item_name': category.get('category_name', ''), 'item_url': page_url}
+        self.dead_letters.add(CATEGORY_PAGE_STAGE, item, error)
+        with self.lock:
+            self.outstanding.add(page_url)
+
+    def resolve(self, page_url):
+        """
+        Mark a list page as fetched if it had failed before
+        """
+        with self.lock:
+            if page_url not in self.outstanding:
+                return
+            self.outstanding.discard(page_url)
+        self.dead_letters.resolve(CATEGORY_PAGE_STAGE, page_url)
+
+
+class BackgroundWriter:
+    def __init__(self, max_pending=16):
+        """
+        Run file writes on a single background thread
+
+        Scraping threads hand finished categories to submit() and carry on;
+        the writer saves them one at a time. At most max_pending writes are
+        queued before submit() blocks.
+        """
+        self.queue = queue.Queue(max_pending)
+        self.errors = 0
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, func, *args):
+        """
+        Queue func(*args) for the writer thread
+        """
+        self.queue.put((func, args))
+
+    def run(self):
+        while True:
+            task = self.queue.get()
+            if task is None:
+                return
+            func, args = task
+            try:
+                func(*args)
+            except Exception as e:
+                self.errors += 1
+                print(f"Error writing output: {str(e)}")
+
+    def close(self):
+        """
+        Wait for every queued write to finish
+        """
+        self.queue.put(None)
+        self.thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def crawl_categories(client, categories, scrape_category, save_category,
+                     workers=DEFAULT_CATEGORY_WORKERS, requests_per_second=DEFAULT_CATEGORY_RPS):
+    """
+    Scrape categories concurrently and save each one on a background writer
+
+    All requests share the client's rate limiter, capped at
+    requests_per_second. Categories are saved in the order they finish.
+
+    Args:
+        client: Shared HttpClient
+        categories: Category dicts
+        scrape_category: Callable(category) -> list of items
+        save_category: Callable(category, items), run on the writer thread
+        workers: Number of categories fetched at once
+        requests_per_second: Global ceiling on request starts per second
+
+    Returns:
+        List of item lists, in the same order as categories
+    """
+    client.ensure_pool_size(workers)
+
+    results = [[] for _ in categories]
+    with client.rate_limiter.capped(requests_per_second), BackgroundWriter() as writer, ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(scrape_category, category): index for index, category in enumerate(categories)}
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                items = future.result()
+            except Exception as e:
+                print(f"Error scraping category {categories[index].get('category_name')}: {str(e)}")
+                items = []
+            results[index] = items
+            if items:
+                writer.submit(save_category, categories[index], items)
+    return results
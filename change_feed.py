@@ -0,0 +1,251 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from crawl_frontier import CRAWL_FRONTIER_DB
+from jsonl_sink import JsonlSink
+
+logger = logging.getLogger(__name__)
+
+CHANGES_DIR = "changes"
+
+# The item content of a detail page sits between these markers; the comment
+# section after it changes on its own and must not count as an item change
+CONTENT_START = b'<div class="container1 itemPage">'
+CONTENT_END = b'<div class="k detail">'
+
+MISSING = '<missing>'
+
+ADDED = 'added'
+CHANGED = 'changed'
+REMOVED = 'removed'
+# Returned in place of a record for a page whose fingerprint has not changed
+UNCHANGED = 'unchanged'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fingerprints (
+    stage TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (stage, item_id)
+);
+CREATE TABLE IF NOT EXISTS crawl_history (
+    stage TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    checked_at REAL NOT NULL,
+    changed INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_crawl_history_item ON crawl_history (stage, item_id, checked_at);
+"""
+
+def content_fingerprint(html_content):
+    """
+    Return the SHA-1 of a detail page's item content region
+
+    Pages without the usual markers are hashed whole.
+    """
+    data = html_content.encode('utf-8') if isinstance(html_content, str) else html_content
+    start = data.find(CONTENT_START)
+    if start != -1:
+        end = data.find(CONTENT_END, start)
+        data = data[start:end if end != -1 else len(data)]
+    return hashlib.sha1(data).hexdigest()
+
+def diff_records(expected, actual, prefix=''):
+    """
+    Compare two records field by field
+
+    Nested dicts (basic_info, detail_info) are compared key by key, so their
+    fields show up as e.g. 'basic_info.重量'; lists are compared as a whole.
+
+    Returns:
+        List of (field, expected value, actual value)
+    """
+    if not isinstance(expected, dict) or not isinstance(actual, dict):
+        return [] if expected == actual else [(prefix or '<record>', expected, actual)]
+    diffs = []
+    for key in list(expected) + [key for key in actual if key not in expected]:
+        field = f"{prefix}.{key}" if prefix else key
+        expected_value = expected.get(key, MISSING)
+        actual_value = actual.get(key, MISSING)
+        if isinstance(expected_value, dict) and isinstance(actual_value, dict):
+            diffs.extend(diff_records(expected_value, actual_value, field))
+        elif expected_value != actual_value:
+            diffs.append((field, expected_value, actual_value))
+    return diffs
+
+
+class ChangeTracker:
+    def __init__(self, stage, db_path=CRAWL_FRONTIER_DB, changes_dir=CHANGES_DIR):
+        """
+        Page fingerprints and the delta feed for one pipeline stage
+
+        check() compares a fetched page with the fingerprint stored for the
+        item; the caller skips parsing and writing when it is unchanged.
+        commit() stores the new fingerprint and appends an 'added' or
+        'changed' entry (with field-level diffs) to changes/<stage>.jsonl.
+        Every revisit of a fingerprinted page is also logged in crawl_history
+        (changed or not), which the recrawl scheduler uses to estimate how
+        often each item changes. Fingerprints and history live in the crawl
+        frontier database next to the URLs.
+
+        Args:
+            stage: Pipeline stage name, e.g. 'fetch_and_parse_items'
+            db_path: SQLite database file
+            changes_dir: Directory of the delta feeds
+        """
+        self.stage = stage
+        self.lock = threading.Lock()
+        self.pending = {}
+
+        self.conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+        if not os.path.exists(changes_dir):
+            os.makedirs(changes_dir)
+        self.feed = JsonlSink(os.path.join(changes_dir, f"{stage}.jsonl"))
+
+    def stored_hash(self, item_id):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT content_hash FROM fingerprints WHERE stage = ? AND item_id = ?", (self.stage, str(item_id))
+            ).fetchone()
+        return row[0] if row else None
+
+    def check(self, item_id, html_content):
+        """
+        Fingerprint a fetched page and return True if it matches the stored fingerprint
+
+        The fingerprint is kept until commit() or skip() for the item.
+        """
+        content_hash = content_fingerprint(html_content)
+        stored_hash = self.stored_hash(item_id)
+        with self.lock:
+            self.pending[str(item_id)] = (content_hash, stored_hash)
+        return content_hash == stored_hash
+
+    def skip(self, item_id):
+        """
+        Forget the pending fingerprint of an unchanged page and log the visit
+        """
+        with self.lock:
+            pending = self.pending.pop(str(item_id), None)
+            if pending:
+                self.log_visit(item_id, changed=False)
+
+    def log_visit(self, item_id, changed):
+        # Called with the lock held
+        self.conn.execute(
+            "INSERT INTO crawl_history (stage, item_id, checked_at, changed) VALUES (?, ?, ?, ?)",
+            (self.stage, str(item_id), time.time(), int(changed))
+        )
+
+    def commit(self, item_id, record, old_record=None):
+        """
+        Store the pending fingerprint and record the change in the delta feed
+
+        Returns:
+            'added', 'changed' or None when the record is the same as before
+        """
+        item_id = str(item_id)
+        with self.lock:
+            content_hash, stored_hash = self.pending.pop(item_id, (None, None))
+            if content_hash:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO fingerprints (stage, item_id, content_hash, updated_at) VALUES (?, ?, ?, ?)",
+                    (self.stage, item_id, content_hash, time.time())
+                )
+                # The first visit only sets the baseline
+                self.log_visit(item_id, changed=stored_hash is not None and stored_hash != content_hash)
+
+        if old_record is None:
+            entry = {'op': ADDED, 'record': record}
+        else:
+            diffs = diff_records(old_record, record)
+            if not diffs:
+                return None
+            fields = {}
+            for field, old_value, new_value in diffs:
+                change = {}
+                if old_value != MISSING:
+                    change['old'] = old_value
+                if new_value != MISSING:
+                    change['new'] = new_value
+                fields[field] = change
+            entry = {'op': CHANGED, 'fields': fields}
+        self.append(item_id, record.get('item_name'), content_hash, entry)
+        return entry['op']
+
+    def remove_missing(self, current_ids):
+        """
+        Record tracked items that are no longer listed as removed
+
+        Returns:
+            List of removed item IDs
+        """
+        current_ids = {str(item_id) for item_id in current_ids}
+        with self.lock:
+            tracked = [row[0] for row in self.conn.execute("SELECT item_id FROM fingerprints WHERE stage = ?", (self.stage,))]
+        removed = [item_id for item_id in tracked if item_id not in current_ids]
+        for item_id in removed:
+            self.append(item_id, None, None, {'op': REMOVED})
+        if removed:
+            with self.lock:
+                for table in ('fingerprints', 'crawl_history'):
+                    self.conn.executemany(f"DELETE FROM {table} WHERE stage = ? AND item_id = ?", [(self.stage, item_id) for item_id in removed])
+            logger.info(f"Change feed [{self.stage}]: {len(removed)} items removed from the listing")
+        return removed
+
+    def append(self, item_id, item_name, content_hash, entry):
+        self.feed.append({
+            'op': entry['op'],
+            'item_id': item_id,
+            'item_name': item_name,
+            'content_hash': content_hash,
+            'changed_at': datetime.now().isoformat(timespec='seconds'),
+            **{key: value for key, value in entry.items() if key != 'op'},
+        })
+
+    def close(self):
+        self.feed.close()
+        with self.lock:
+            self.conn.close()
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description='Print the delta feed of a pipeline stage')
+    parser.add_argument('--stage', required=True, help='Pipeline stage, e.g. fetch_and_parse_items')
+    parser.add_argument('--since', help='Only print changes at or after this ISO timestamp')
+    parser.add_argument('--summary', action='store_true', help='Only print the number of changes per operation')
+    parser.add_argument('--changes-dir', default=CHANGES_DIR, help='Directory of the delta feeds')
+    args = parser.parse_args()
+
+    feed = JsonlSink(os.path.join(args.changes_dir, f"{args.stage}.jsonl"))
+    counts = {}
+    for entry in feed:
+        if args.since and entry.get('changed_at', '') < args.since:
+            continue
+        counts[entry['op']] = counts.get(entry['op'], 0) + 1
+        if not args.summary:
+            print(json.dumps(entry, ensure_ascii=False))
+    if args.summary:
+        for op, count in sorted(counts.items()):
+            print(f"{op}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+import argparse
+import json
+import logging
+import os
+import time
+import tracemalloc
+
+from stat_parser import STAT_SOURCES, parse_stat, parse_item_level
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:
+    # Optional: without pyarrow the crawlers skip the columnar files
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+PARQUET_DIR = os.path.join("scraped_data", "parquet")
+FORMATS = {'.parquet': 'parquet', '.feather': 'feather', '.arrow': 'feather'}
+# Top-level fields that differ for every item are plain strings; every other
+# string (category_name, item_grade, class names, monster areas, stat keys, ...)
+# is dictionary-encoded, so the schema does not depend on the data
+PLAIN_STRING_FIELDS = {'item_id', 'item_name', 'item_url', 'item_image'}
+
+def available():
+    return pa is not None
+
+def string_array(values, dictionary=True):
+    array = pa.array(values, type=pa.string())
+    return array.dictionary_encode() if dictionary else array
+
+def to_arrow(values, dictionary=True):
+    """
+    Build an Arrow array from a column of JSON values
+
+    Lists become list columns and dicts struct columns (fields in first-seen
+    order), recursively; None stays null. Columns mixing strings with other
+    scalars are stored as strings.
+    """
+    present = [value for value in values if value is not None]
+    if not present:
+        return pa.nulls(len(values), pa.string())
+    if all(isinstance(value, list) for value in present):
+        offsets = [0]
+        flat = []
+        for value in values:
+            flat.extend(value or [])
+            offsets.append(len(flat))
+        mask = pa.array([value is None for value in values])
+        return pa.ListArray.from_arrays(pa.array(offsets, type=pa.int32()), to_arrow(flat), mask=mask)
+    if all(isinstance(value, dict) for value in present):
+        fields = list(dict.fromkeys(key for value in present for key in value))
+        children = [to_arrow([value.get(field) if value is not None else None for value in values]) for field in fields]
+        mask = pa.array([value is None for value in values])
+        return pa.StructArray.from_arrays(children, names=fields, mask=mask)
+    if all(isinstance(value, str) for value in present):
+        return string_array(values, dictionary)
+    if all(isinstance(value, bool) for value in present):
+        return pa.array(values, type=pa.bool_())
+    if all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in present):
+        return pa.array(values, type=pa.float64() if any(isinstance(value, float) for value in present) else pa.int64())
+    return string_array([json.dumps(value, ensure_ascii=False) if isinstance(value, (list, dict)) else
+                         None if value is None else str(value) for value in values], dictionary)
+
+def parsed_columns(records):
+    """
+    Return typed columns derived with stat_parser: dmg_small, dmg_large, ac and the parsed stat list
+    """
+    damage = [parse_item_level(record.get('item_level')) for record in records]
+    stats = []
+    for record in records:
+        parsed = []
+        for source in STAT_SOURCES:
+            for text in record.get(source) or []:
+                stat = parse_stat(text)
+                parsed.append({'source': source, 'key': stat.key, 'value': stat.value, 'unit': stat.unit, 'proc': stat.proc})
+        stats.append(parsed)
+    return {
+        'dmg_small': [small for small, _, _ in damage],
+        'dmg_large': [large for _, large, _ in damage],
+        'ac': [ac for _, _, ac in damage],
+        'parsed_stats': stats,
+    }
+
+def catalog_table(records, parse_stats=True):
+    """
+    Build an Arrow table with one row per item record
+
+    Args:
+        records: Item records (final.json, all_items.json)
+        parse_stats: Add dmg_small, dmg_large, ac and parsed_stats
+            (list of source/key/value/unit/proc) from stat_parser
+    """
+    fields = list(dict.fromkeys(field for record in records for field in record))
+    columns = {field: to_arrow([record.get(field) for record in records], field not in PLAIN_STRING_FIELDS) for field in fields}
+    if parse_stats:
+        for name, values in parsed_columns(records).items():
+            if name not in columns:
+                columns[name] = pa.array(values, type=pa.float64()) if name != 'parsed_stats' else to_arrow(values)
+    return pa.table(columns)
+
+def write_catalog(records, path, parse_stats=True):
+    """
+    Write item records as Parquet (.parquet) or Arrow IPC/Feather (.feather, .arrow)
+
+    Returns:
+        Number of rows written, or None when pyarrow is not installed
+    """
+    if not available():
+        logger.warning(f"pyarrow is not installed, skipping {path}")
+        return None
+    file_format = FORMATS.get(os.path.splitext(path)[1])
+    if file_format is None:
+        raise ValueError(f"Unknown columnar format for {path}: use one of {', '.join(FORMATS)}")
+    table = catalog_table(records, parse_stats)
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    tmp_path = f"{path}.tmp"
+    if file_format == 'parquet':
+        pq.write_table(table, tmp_path, compression='zstd')
+    else:
+        feather.write_feather(table, tmp_path, compression='zstd')
+    os.replace(tmp_path, path)
+    logger.info(f"Wrote {table.num_rows} items x {table.num_columns} columns to {path}")
+    return table.num_rows
+
+def export(input_path="final.json", output_path=None, parse_stats=True):
+    """
+    Write a JSON item file as a columnar file next to it (final.json -> final.parquet)
+    """
+    with open(input_path, 'r', encoding='utf-8') as f:
+        records = json.load(f)
+    return write_catalog(records, output_path or f"{os.path.splitext(input_path)[0]}.parquet", parse_stats)
+
+def read_catalog(path, columns=None):
+    """
+    Load a columnar catalog into pandas; dictionary columns become Categorical
+    """
+    if FORMATS.get(os.path.splitext(path)[1]) == 'parquet':
+        return pq.read_table(path, columns=columns).to_pandas()
+    return feather.read_table(path, columns=columns).to_pandas()
+
+def measure(load):
+    """
+    Return (seconds, MiB held) for a load callable: Python heap (tracemalloc) plus Arrow buffers
+    """
+    arrow_before = pa.total_allocated_bytes()
+    tracemalloc.start()
+    start = time.perf_counter()
+    data = load()
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    held = current + pa.total_allocated_bytes() - arrow_before
+    del data
+    return elapsed, held / 1024 / 1024
+
+def compare(json_path, columnar_path, excel_path=None):
+    """
+    Return file size, load time and memory of the JSON, columnar (Arrow table and pandas) and Excel versions
+    """
+    def load_json():
+        with open(json_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    file_format = FORMATS.get(os.path.splitext(columnar_path)[1])
+    read_table = pq.read_table if file_format == 'parquet' else feather.read_table
+    loads = [
+        ('json', json_path, load_json),
+        ('arrow table', columnar_path, lambda: read_table(columnar_path)),
+        ('pandas', columnar_path, lambda: read_catalog(columnar_path)),
+    ]
+    if excel_path:
+        import pandas as pd
+        loads.append(('excel', excel_path, lambda: pd.read_excel(excel_path)))
+    report = {}
+    for name, path, load in loads:
+        seconds, mib = measure(load)
+        report[name] = {'bytes': os.path.getsize(path), 'load_seconds': seconds, 'memory_mib': mib}
+    return report
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description='Export the item catalog as Parquet or Arrow IPC/Feather')
+    parser.add_argument('command', choices=['export', 'compare', 'schema'])
+    parser.add_argument('--input', default='final.json', help='JSON item file')
+    parser.add_argument('--output', help='Columnar file: .parquet, .feather or .arrow (default: next to the input)')
+    parser.add_argument('--no-parsed-stats', action='store_true', help='export: leave out the stat_parser columns')
+    parser.add_argument('--excel', help='compare: also time reading this Excel file, e.g. scraped_data/excel/all_items.xlsx')
+    args = parser.parse_args()
+
+    if not available():
+        parser.error("pyarrow is required: pip install pyarrow")
+    output = args.output or f"{os.path.splitext(args.input)[0]}.parquet"
+
+    if args.command == 'export':
+        export(args.input, output, not args.no_parsed_stats)
+    elif args.command == 'schema':
+        schema = pq.read_schema(output) if FORMATS.get(os.path.splitext(output)[1]) == 'parquet' else feather.read_table(output).schema
+        print(schema)
+    else:
+        for name, stats in compare(args.input, output, args.excel).items():
+            print(f"{name:12} {stats['bytes'] / 1024:9.0f} KiB  load {stats['load_seconds'] * 1000:8.1f} ms  memory {stats['memory_mib']:6.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+import argparse
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CRAWL_FRONTIER_DB = "crawl_frontier.db"
+
+PENDING = 'pending'
+IN_FLIGHT = 'in_flight'
+DONE = 'done'
+FAILED = 'failed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS frontier (
+    stage TEXT NOT NULL,
+    url TEXT NOT NULL,
+    item_id TEXT,
+    seq INTEGER NOT NULL,
+    payload TEXT,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    lease_owner TEXT,
+    lease_expires REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (stage, url)
+);
+CREATE INDEX IF NOT EXISTS idx_frontier_state ON frontier (stage, state, seq);
+"""
+
+class CrawlFrontier:
+    def __init__(self, stage, db_path=CRAWL_FRONTIER_DB, lease_seconds=300, max_attempts=3):
+        """
+        Durable crawl frontier for one pipeline stage, stored in SQLite
+
+        Each URL moves pending -> in_flight -> done / failed. A worker leases a
+        batch of pending URLs for lease_seconds; leases that expire (crashed
+        worker) are handed out again, so several workers or processes can share
+        one frontier and a restart resumes where the last run stopped.
+
+        Args:
+            stage: Pipeline stage name, e.g. 'fetch_and_parse_items'
+            db_path: SQLite database file
+            lease_seconds: How long a leased URL stays reserved for its worker
+            max_attempts: Attempts before a URL is marked failed
+        """
+        self.stage = stage
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.owner = f"{socket.gethostname()}-{os.getpid()}"
+        self.lock = threading.Lock()
+
+        self.conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def is_empty(self):
+        """
+        Check whether this stage has no URLs yet
+        """
+        with self.lock:
+            row = self.conn.execute("SELECT 1 FROM frontier WHERE stage = ? LIMIT 1", (self.stage,)).fetchone()
+        return row is None
+
+    def seed(self, items, done_ids=None):
+        """
+        Add items (dicts with item_url) as pending; URLs already known are left unchanged
+
+        Args:
+            items: Item dicts to crawl, in crawl order
+            done_ids: Item IDs to record as already done (when migrating an existing output)
+        """
+        done_ids = done_ids or set()
+        now = time.time()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute("SELECT COALESCE(MAX(seq), -1) FROM frontier WHERE stage = ?", (self.stage,)).fetchone()
+                seq = row[0] + 1
+                added = 0
+                for item in items:
+                    item_url = item.get('item_url')
+                    if not item_url:
+                        continue
+                    state = DONE if item.get('item_id') in done_ids else PENDING
+                    cursor = self.conn.execute(
+                        "INSERT OR IGNORE INTO frontier (stage, url, item_id, seq, payload, state, created_at, updated_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (self.stage, item_url, item.get('item_id'), seq, json.dumps(item, ensure_ascii=False), state, now, now)
+                    )
+                    if cursor.rowcount:
+                        seq += 1
+                        added += 1
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        logger.info(f"Frontier [{self.stage}]: added {added} new URLs")
+        return added
+
+    def lease(self, limit, owner=None, urls=None):
+        """
+        Lease up to `limit` URLs for this worker and return their items in crawl order
+
+        Pending URLs and in-flight URLs whose lease has expired are eligible;
+        with `urls` only those URLs are (e.g. a selected range of items).
+        """
+        owner = owner or self.owner
+        now = time.time()
+        sql = ("SELECT url, payload FROM frontier WHERE stage = ? AND "
+               "(state = ? OR (state = ? AND lease_expires < ?))")
+        params = [self.stage, PENDING, IN_FLIGHT, now]
+        if urls is not None:
+            urls = list(urls)
+            if not urls:
+                return []
+            sql += f" AND url IN ({', '.join('?' for _ in urls)})"
+            params.extend(urls)
+        sql += " ORDER BY seq LIMIT ?"
+        params.append(limit)
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self.conn.execute(sql, params).fetchall()
+                self.conn.executemany(
+                    "UPDATE frontier SET state = ?, lease_owner = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ? "
+                    "WHERE stage = ? AND url = ?",
+                    [(IN_FLIGHT, owner, now + self.lease_seconds, now, self.stage, url) for url, _ in rows]
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return [json.loads(payload) for _, payload in rows]
+
+    def complete(self, url):
+        """
+        Mark a URL as done
+        """
+        with self.lock:
+            self.conn.execute(
+                "UPDATE frontier SET state = ?, lease_owner = NULL, lease_expires = NULL, last_error = NULL, updated_at = ? "
+                "WHERE stage = ? AND url = ?",
+                (DONE, time.time(), self.stage, url)
+            )
+
+    def fail(self, url, error=None):
+        """
+        Record a failed attempt; the URL returns to pending until max_attempts is reached
+        """
+        with self.lock:
+            row = self.conn.execute("SELECT attempts FROM frontier WHERE stage = ? AND url = ?", (self.stage, url)).fetchone()
+            attempts = row[0] if row else self.max_attempts
+            state = FAILED if attempts >= self.max_attempts else PENDING
+            self.conn.execute(
+                "UPDATE frontier SET state = ?, lease_owner = NULL, lease_expires = NULL, last_error = ?, updated_at = ? "
+                "WHERE stage = ? AND url = ?",
+                (state, str(error) if error else None, time.time(), self.stage, url)
+            )
+
+    def release(self, owner=None, urls=None):
+        """
+        Return URLs leased by this worker to pending without counting the attempt
+
+        Releases every leased URL (e.g. on Ctrl-C), or only the given URLs
+        (e.g. requests refused by an open circuit).
+        """
+        owner = owner or self.owner
+        sql = ("UPDATE frontier SET state = ?, lease_owner = NULL, lease_expires = NULL, attempts = MAX(attempts - 1, 0), updated_at = ? "
+               "WHERE stage = ? AND state = ? AND lease_owner = ?")
+        params = [PENDING, time.time(), self.stage, IN_FLIGHT, owner]
+        if urls is not None:
+            urls = list(urls)
+            if not urls:
+                return 0
+            sql += f" AND url IN ({', '.join('?' for _ in urls)})"
+            params.extend(urls)
+        with self.lock:
+            cursor = self.conn.execute(sql, params)
+        if cursor.rowcount:
+            logger.info(f"Frontier [{self.stage}]: released {cursor.rowcount} leased URLs")
+        return cursor.rowcount
+
+    def reset(self, states=(FAILED,)):
+        """
+        Move URLs in the given states back to pending with a fresh attempt count
+        """
+        placeholders = ', '.join('?' for _ in states)
+        with self.lock:
+            cursor = self.conn.execute(
+                f"UPDATE frontier SET state = ?, attempts = 0, lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+                f"WHERE stage = ? AND state IN ({placeholders})",
+                (PENDING, time.time(), self.stage, *states)
+            )
+        return cursor.rowcount
+
+    def requeue(self, item_ids=(), urls=()):
+        """
+        Move the URLs of the given items (or the given URLs) back to pending, unless they are leased right now
+        """
+        now = time.time()
+        params = [(PENDING, now, self.stage, str(item_id), IN_FLIGHT) for item_id in item_ids]
+        url_params = [(PENDING, now, self.stage, url, IN_FLIGHT) for url in urls]
+        sql = "UPDATE frontier SET state = ?, attempts = 0, last_error = NULL, updated_at = ? WHERE stage = ? AND {} = ? AND state != ?"
+        requeued = 0
+        with self.lock:
+            if params:
+                requeued += self.conn.executemany(sql.format('item_id'), params).rowcount
+            if url_params:
+                requeued += self.conn.executemany(sql.format('url'), url_params).rowcount
+        return requeued
+
+    def remove(self, item_ids):
+        """
+        Drop the URLs of items that are no longer listed
+        """
+        with self.lock:
+            cursor = self.conn.executemany(
+                "DELETE FROM frontier WHERE stage = ? AND item_id = ?", [(self.stage, str(item_id)) for item_id in item_ids]
+            )
+        return cursor.rowcount
+
+    def counts(self):
+        """
+        Return the number of URLs per state
+        """
+        with self.lock:
+            rows = self.conn.execute("SELECT state, COUNT(*) FROM frontier WHERE stage = ? GROUP BY state", (self.stage,)).fetchall()
+        return dict(rows)
+
+    def close(self):
+        """
+        Close the database connection
+        """
+        with self.lock:
+            self.conn.close()
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description='Inspect or reset the crawl frontier')
+    parser.add_argument('command', choices=['status', 'reset-failed', 'reset-all'])
+    parser.add_argument('--stage', required=True, help='Pipeline stage, e.g. fetch_and_parse_items')
+    parser.add_argument('--db', default=CRAWL_FRONTIER_DB, help='SQLite database file')
+    args = parser.parse_args()
+
+    frontier = CrawlFrontier(args.stage, args.db)
+    if args.command == 'reset-failed':
+        print(f"Reset {frontier.reset((FAILED,))} failed URLs to pending")
+    elif args.command == 'reset-all':
+        print(f"Reset {frontier.reset((FAILED, DONE, IN_FLIGHT))} URLs to pending")
+    for state, count in sorted(frontier.counts().items()):
+        print(f"{state}: {count}")
+    frontier.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from change_feed import UNCHANGED
+from retry_policy import CircuitOpenError, wait_for_circuit
+from fetch_and_parse_items import ItemFetcher
+from item_detail_fetcher import ItemDetailFetcher
+from reparse_items import init_worker, parse_final_record, parse_detail_record
+from parser_backend import PARSER_BACKENDS, DEFAULT_PARSER
+
+logger = logging.getLogger(__name__)
+
+# Writer marker for items refused by an open circuit: back to pending, no attempt counted
+RELEASED = 'released'
+
+class FinalStage:
+    def __init__(self):
+        """
+        Pipeline hooks for final.json (fetch_and_parse_items)
+        """
+        self.fetcher = ItemFetcher()
+        self.frontier = self.fetcher.frontier
+        self.client = self.fetcher.client
+        self.parse = parse_final_record
+
+    def seed(self):
+        return self.fetcher.seed_frontier()
+
+    def fetch(self, item):
+        html_content = self.fetcher.fetch_item_html(item)
+        if html_content:
+            self.fetcher.archive_html(item, html_content)
+        return html_content
+
+    def unchanged(self, item, html_content):
+        return self.fetcher.is_unchanged(item, html_content)
+
+    def skip(self, item):
+        return self.fetcher.skip_unchanged(item)
+
+    def write(self, item, record):
+        # The page was archived by the fetch stage
+        return self.fetcher.add_detailed_item(item, record, None)
+
+    def finish(self):
+        self.fetcher.save_final_data()
+
+
+class DetailStage:
+    def __init__(self, items_json_path):
+        """
+        Pipeline hooks for scraped_items/ (item_detail_fetcher)
+        """
+        self.fetcher = ItemDetailFetcher(items_json_path)
+        self.frontier = self.fetcher.frontier
+        self.client = self.fetcher.client
+        self.parse = parse_detail_record
+
+    def seed(self):
+        return self.fetcher.seed_frontier()
+
+    def fetch(self, item):
+        # Same guard as fetch_item_details: a nameless item cannot be saved
+        if not self.fetcher.crawlable(item):
+            logger.warning(f"Skipping item with no name or URL: {item}")
+            return None
+        return self.fetcher.fetch_item_html(item)
+
+    def unchanged(self, item, html_content):
+        return self.fetcher.is_unchanged(item, html_content)
+
+    def skip(self, item):
+        return self.fetcher.skip_unchanged(item)
+
+    def write(self, item, record):
+        if record and self.fetcher.save_item_to_json(record):
+            self.frontier.complete(item['item_url'])
+            return record
+        return None
+
+    def finish(self):
+        pass
+
+
+class CrawlPipeline:
+    def __init__(self, stage, io_workers=8, parse_workers=None, requests_per_second=4.0, max_pending=None, parser=DEFAULT_PARSER, restrict=False):
+        """
+        Staged crawl: I/O threads fetch pages, a process pool parses them,
+        and a single writer persists the results in lease order
+
+        Fetch threads hand pages to the parser processes, which hand records
+        to the writer queue. A semaphore caps the number of items between
+        lease and write, so the stages never run ahead of each other by more
+        than max_pending items.
+
+        Args:
+            stage: FinalStage or DetailStage
+            io_workers: Number of fetch threads
+            parse_workers: Number of parser processes (defaults to the number of cores)
+            requests_per_second: Global ceiling on request starts per second
+            max_pending: Items allowed between lease and write (default: io_workers + 4 x parse_workers)
+            parser: Parser backend used by the parser processes
+            restrict: Only build the page regions the extractors read
+        """
+        self.stage = stage
+        self.io_workers = io_workers
+        self.parse_workers = parse_workers or os.cpu_count() or 1
+        self.requests_per_second = requests_per_second
+        self.max_pending = max_pending or io_workers + 4 * self.parse_workers
+        self.parser = parser
+        self.restrict = restrict
+
+        self.slots = threading.Semaphore(self.max_pending)
+        self.write_queue = queue.Queue()
+        self.lease_lock = threading.Lock()
+        self.leased = []
+        self.next_index = 0
+        self.in_flight = 0
+        self.stop = threading.Event()
+        self.written = 0
+        self.failed = 0
+        self.unchanged = 0
+
+    def next_item(self):
+        """
+        Return the next (index, item) from the frontier, or None when it is drained
+        """
+        while not self.stop.is_set():
+            with self.lease_lock:
+                if not self.leased:
+                    self.leased = self.stage.frontier.lease(self.max_pending)
+                if self.leased:
+                    item = self.leased.pop(0)
+                    index = self.next_index
+                    self.next_index += 1
+                    self.in_flight += 1
+                    return index, item
+                if self.in_flight == 0:
+                    return None
+            # Failed items may return to pending once in-flight work settles
+            time.sleep(0.2)
+        return None
+
+    def fetch_loop(self, executor):
+        """
+        Fetch pages and submit them to the parser processes
+        """
+        while True:
+            self.slots.acquire()
+            task = self.next_item()
+            if task is None:
+                self.slots.release()
+                return
+            index, item = task
+            try:
+                html_content = self.stage.fetch(item)
+            except CircuitOpenError as e:
+                self.write_queue.put((index, item, RELEASED))
+                wait_for_circuit(e)
+                continue
+            except Exception as e:
+                logger.error(f"Error fetching {item.get('item_name', 'Unknown')}: {e}")
+                html_content = None
+            if not html_content:
+                self.write_queue.put((index, item, None))
+                continue
+            if self.stage.unchanged(item, html_content):
+                # Nothing to parse; the writer marks the item done in order
+                self.write_queue.put((index, item, UNCHANGED))
+                continue
+            future = executor.submit(self.stage.parse, (item, html_content))
+            future.add_done_callback(lambda f, index=index, item=item: self.write_queue.put((index, item, self.parse_result(f, item))))
+
+    def parse_result(self, future, item):
+        """
+        Return a parser result, or None if parsing raised
+        """
+        try:
+            return future.result()
+        except Exception as e:
+            logger.error(f"Error parsing {item.get('item_name', 'Unknown')}: {e}")
+            return None
+
+    def write_loop(self, fetch_threads):
+        """
+        Persist results in lease order until every fetch thread has finished
+        """
+        results = {}
+        next_write = 0
+        while True:
+            try:
+                index, item, record = self.write_queue.get(timeout=0.5)
+            except queue.Empty:
+                if not any(thread.is_alive() for thread in fetch_threads) and self.write_queue.empty():
+                    return
+                continue
+
+            results[index] = (item, record)
+            while next_write in results:
+                item, record = results.pop(next_write)
+                next_write += 1
+                if record == RELEASED:
+                    self.stage.frontier.release(urls=[item['item_url']])
+                elif record == UNCHANGED:
+                    self.stage.skip(item)
+                    self.unchanged += 1
+                elif record and self.stage.write(item, record):
+                    self.written += 1
+                else:
+                    self.stage.frontier.fail(item['item_url'], "fetch or parse failed")
+                    self.failed += 1
+                with self.lease_lock:
+                    self.in_flight -= 1
+                self.slots.release()
+
+                if record != RELEASED and (self.written + self.failed + self.unchanged) % 50 == 0:
+                    logger.info(f"Progress: {self.written} written, {self.unchanged} unchanged, {self.failed} failed")
+
+    def run(self):
+        """
+        Run the pipeline until the frontier is drained
+        """
+        if not self.stage.seed():
+            logger.error("No items found. Exiting.")
+            return
+
+        start = time.time()
+        self.stage.client.ensure_pool_size(self.io_workers)
+        logger.info(f"Starting crawl pipeline ({self.io_workers} fetch threads, {self.parse_workers} parser processes)")
+
+        # The pool starts its processes lazily, once the fetch threads hold locks
+        # (logging, SQLite, the rate limiter); forking then could copy a held lock
+        executor = ProcessPoolExecutor(self.parse_workers, mp_context=multiprocessing.get_context('spawn'),
+                                       initializer=init_worker, initargs=(self.parser, self.restrict))
+        fetch_threads = [threading.Thread(target=self.fetch_loop, args=(executor,), daemon=True) for _ in range(self.io_workers)]
+        try:
+            with self.stage.client.rate_limiter.capped(self.requests_per_second):
+                for thread in fetch_threads:
+                    thread.start()
+                self.write_loop(fetch_threads)
+        except KeyboardInterrupt:
+            logger.warning("Interrupted, returning leased items to the frontier")
+            self.stop.set()
+            self.stage.frontier.release()
+        finally:
+            executor.shutdown(wait=not self.stop.is_set(), cancel_futures=self.stop.is_set())
+            self.stage.finish()
+
+        elapsed = time.time() - start
+        logger.info(f"Crawl pipeline finished: {self.written} written, {self.unchanged} unchanged, {self.failed} failed in {elapsed:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Crawl with separate fetch threads, parser processes and a single writer')
+    parser.add_argument('--stage', choices=['final', 'items'], default='final', help='Build final.json or scraped_items/')
+    parser.add_argument('--io-workers', type=int, default=8, help='Number of fetch threads')
+    parser.add_argument('--parse-workers', type=int, help='Number of parser processes (default: all cores)')
+    parser.add_argument('--rps', type=float, default=4.0, help='Maximum requests per second')
+    parser.add_argument('--parser', choices=PARSER_BACKENDS, default=DEFAULT_PARSER, help='HTML parser backend')
+    parser.add_argument('--restrict', action='store_true', help='Only parse the page regions the extractors read')
+    args = parser.parse_args()
+
+    if args.stage == 'final':
+        stage = FinalStage()
+    else:
+        stage = DetailStage(os.path.join("scraped_data", "json", "all_items.json"))
+
+    CrawlPipeline(stage, args.io_workers, args.parse_workers, args.rps, parser=args.parser, restrict=args.restrict).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import time
+from urllib.request import pathname2url
+
+logger = logging.getLogger(__name__)
+
+DATASET_DB = "dataset.db"
+MONSTERS_PATH = os.path.join("scraped_data", "json", "monsters.json")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    item_id TEXT PRIMARY KEY,
+    item_name TEXT,
+    category_id TEXT,
+    category_name TEXT,
+    item_grade TEXT,
+    item_level TEXT,
+    material TEXT,
+    weight TEXT,
+    store TEXT,
+    trade TEXT,
+    safe_val TEXT,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_items_category ON items (category_id);
+CREATE INDEX IF NOT EXISTS idx_items_grade ON items (item_grade);
+CREATE INDEX IF NOT EXISTS idx_items_name ON items (item_name);
+
+CREATE TABLE IF NOT EXISTS item_classes (
+    item_id TEXT NOT NULL,
+    class_name TEXT NOT NULL,
+    class_level TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_item_classes_class ON item_classes (class_name, item_id);
+CREATE INDEX IF NOT EXISTS idx_item_classes_item ON item_classes (item_id);
+
+CREATE TABLE IF NOT EXISTS monsters (
+    monster_id TEXT PRIMARY KEY,
+    monster_name TEXT,
+    monster_type TEXT,
+    monster_size TEXT,
+    monster_level TEXT,
+    record TEXT NOT NULL,
+    source TEXT NOT NULL DEFAULT 'drops'
+);
+CREATE INDEX IF NOT EXISTS idx_monsters_name ON monsters (monster_name);
+
+CREATE TABLE IF NOT EXISTS monster_areas (
+    monster_id TEXT NOT NULL,
+    area TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_monster_areas_area ON monster_areas (area, monster_id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_monster_areas_monster ON monster_areas (monster_id, area);
+
+CREATE TABLE IF NOT EXISTS item_drops (
+    item_id TEXT NOT NULL,
+    monster_id TEXT NOT NULL,
+    seq INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_item_drops_monster ON item_drops (monster_id, item_id);
+CREATE INDEX IF NOT EXISTS idx_item_drops_item ON item_drops (item_id, seq);
+"""
+
+# Item columns copied from the record; the full record is kept as JSON
+ITEM_COLUMNS = ['item_id', 'item_name', 'category_id', 'category_name', 'item_grade', 'item_level',
+                'material', 'weight', 'store', 'trade', 'safe_val']
+MONSTER_COLUMNS = ['monster_id', 'monster_name', 'monster_type', 'monster_size', 'monster_level']
+# monsters.source: rows built from item drop rows are rebuilt on every item
+# refresh; rows from monsters.json (monster_crawler.py) are only replaced by it
+DROPS = 'drops'
+CRAWLER = 'crawler'
+
+# Filters accepted by DatasetStore.find_items: {name: (join, condition)}
+ITEM_FILTERS = {
+    'category': (None, "items.category_id = ?"),
+    'grade': (None, "items.item_grade = ?"),
+    'name': (None, "items.item_name LIKE '%' || ? || '%'"),
+    'class_name': ("JOIN item_classes ON item_classes.item_id = items.item_id", "item_classes.class_name = ?"),
+    'monster': ("JOIN item_drops ON item_drops.item_id = items.item_id", "item_drops.monster_id = ?"),
+}
+
+# Groupings accepted by DatasetStore.count_by: {name: (select, join)}
+GROUPINGS = {
+    'category': ("items.category_id || ' ' || COALESCE(items.category_name, '')", None),
+    'grade': ("items.item_grade", None),
+    'class': ("item_classes.class_name", "JOIN item_classes ON item_classes.item_id = items.item_id"),
+    'monster': ("item_drops.monster_id || ' ' || COALESCE(monsters.monster_name, '')",
+                "JOIN item_drops ON item_drops.item_id = items.item_id LEFT JOIN monsters ON monsters.monster_id = item_drops.monster_id"),
+    'area': ("monster_areas.area",
+             "JOIN item_drops ON item_drops.item_id = items.item_id JOIN monster_areas ON monster_areas.monster_id = item_drops.monster_id"),
+}
+
+class DatasetStore:
+    def __init__(self, db_path=DATASET_DB):
+        """
+        Indexed SQLite copy of the item and monster data
+
+        Items, their classes, the monsters and item->monster drop links are
+        kept in indexed tables, so filters and aggregates run in SQLite
+        without loading final.json. Every row keeps its full JSON record for
+        output. The pipeline refreshes the store whenever it rewrites
+        final.json or monsters.json; each refresh is one transaction.
+
+        Args:
+            db_path: SQLite database file
+        """
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(monsters)")]
+        if 'source' not in columns:
+            # Stores created before monsters.source: treat every monster as drop-derived
+            self.conn.execute(f"ALTER TABLE monsters ADD COLUMN source TEXT NOT NULL DEFAULT '{DROPS}'")
+
+    def transaction(self, statements):
+        """
+        Run (sql, rows) pairs with executemany inside one transaction
+        """
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            for sql, rows in statements:
+                self.conn.executemany(sql, rows)
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def replace_items(self, records):
+        """
+        Replace every item, class row and drop link with the given item records
+
+        Monsters built from drop rows are rebuilt as well, so monsters that no
+        longer drop anything disappear and changed drop-row data is picked up.
+        Monsters stored from monsters.json are kept as they are.
+
+        Returns:
+            Number of items stored
+        """
+        items = []
+        classes = []
+        drops = []
+        monsters = []
+        areas = []
+        for record in records:
+            item_id = str(record.get('item_id', ''))
+            if not item_id:
+                continue
+            items.append([record.get(column) if column != 'item_id' else item_id for column in ITEM_COLUMNS]
+                         + [json.dumps(record, ensure_ascii=False)])
+            for entry in record.get('item_classes') or []:
+                classes.append((item_id, entry.get('name'), entry.get('level')))
+            for seq, drop in enumerate(record.get('monster_drops') or []):
+                monster_id = str(drop.get('monster_id') or '')
+                if not monster_id:
+                    continue
+                drops.append((item_id, monster_id, seq))
+                monsters.append(self.monster_row(drop, DROPS))
+                areas.extend((monster_id, area, monster_id) for area in drop.get('monster_areas', []))
+
+        placeholders = ', '.join('?' for _ in range(len(ITEM_COLUMNS) + 1))
+        self.transaction([
+            ("DELETE FROM items", [()]),
+            ("DELETE FROM item_classes", [()]),
+            ("DELETE FROM item_drops", [()]),
+            (f"DELETE FROM monster_areas WHERE monster_id IN (SELECT monster_id FROM monsters WHERE source = '{DROPS}')", [()]),
+            (f"DELETE FROM monsters WHERE source = '{DROPS}'", [()]),
+            (f"INSERT OR REPLACE INTO items ({', '.join(ITEM_COLUMNS)}, record) VALUES ({placeholders})", items),
+            ("INSERT INTO item_classes (item_id, class_name, class_level) VALUES (?, ?, ?)", classes),
+            ("INSERT INTO item_drops (item_id, monster_id, seq) VALUES (?, ?, ?)", drops),
+            # Drop rows only fill in monsters that monsters.json has not provided
+            ("INSERT OR IGNORE INTO monsters (monster_id, monster_name, monster_type, monster_size, monster_level, record, source) "
+             "VALUES (?, ?, ?, ?, ?, ?, ?)", monsters),
+            ("INSERT OR IGNORE INTO monster_areas (monster_id, area) "
+             f"SELECT ?, ? WHERE EXISTS (SELECT 1 FROM monsters WHERE monster_id = ? AND source = '{DROPS}')", areas),
+        ])
+        logger.info(f"Dataset store: {len(items)} items, {len(classes)} class rows, {len(drops)} drop links")
+        return len(items)
+
+    def replace_monsters(self, records):
+        """
+        Store monster table records (monster_crawler.py), replacing known monsters
+
+        Returns:
+            Number of monsters stored
+        """
+        monsters = []
+        areas = []
+        for record in records:
+            monster_id = str(record.get('monster_id') or '')
+            if not monster_id:
+                continue
+            monsters.append(self.monster_row(record, CRAWLER))
+            areas.extend((monster_id, area) for area in record.get('monster_areas', []))
+        self.transaction([
+            ("DELETE FROM monster_areas WHERE monster_id = ?", [(row[0],) for row in monsters]),
+            ("INSERT OR REPLACE INTO monsters (monster_id, monster_name, monster_type, monster_size, monster_level, record, source) "
+             "VALUES (?, ?, ?, ?, ?, ?, ?)", monsters),
+            ("INSERT OR IGNORE INTO monster_areas (monster_id, area) VALUES (?, ?)", areas),
+        ])
+        logger.info(f"Dataset store: {len(monsters)} monsters")
+        return len(monsters)
+
+    def monster_row(self, record, source):
+        values = [str(record.get(column) or '') if column == 'monster_id' else record.get(column) for column in MONSTER_COLUMNS]
+        return values + [json.dumps(record, ensure_ascii=False), source]
+
+    def find_items(self, limit=None, **filters):
+        """
+        Return the full records of the items matching every given filter
+
+        Args:
+            limit: Maximum number of records
+            filters: category, grade, name (substring), class_name, monster
+        """
+        joins = []
+        conditions = []
+        params = []
+        for name, value in filters.items():
+            if value is None:
+                continue
+            join, condition = ITEM_FILTERS[name]
+            if join:
+                joins.append(join)
+            conditions.append(condition)
+            params.append(value)
+        sql = f"SELECT DISTINCT items.record FROM items {' '.join(joins)}"
+        if conditions:
+            sql += f" WHERE {' AND '.join(conditions)}"
+        sql += " ORDER BY CAST(items.item_id AS INTEGER)"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return [json.loads(row[0]) for row in self.conn.execute(sql, params)]
+
+    def count_by(self, grouping, **filters):
+        """
+        Return [(group, number of distinct items)] for a grouping, largest first
+        """
+        select, group_join = GROUPINGS[grouping]
+        joins = [group_join] if group_join else []
+        conditions = []
+        params = []
+        for name, value in filters.items():
+            if value is None:
+                continue
+            join, condition = ITEM_FILTERS[name]
+            if join and join not in ' '.join(joins):
+                joins.append(join)
+            conditions.append(condition)
+            params.append(value)
+        sql = f"SELECT {select} AS grp, COUNT(DISTINCT items.item_id) FROM items {' '.join(joins)}"
+        if conditions:
+            sql += f" WHERE {' AND '.join(conditions)}"
+        sql += " GROUP BY grp ORDER BY 2 DESC, grp"
+        return self.conn.execute(sql, params).fetchall()
+
+    def monster(self, monster_id):
+        """
+        Return a monster record with the IDs and names of the items it drops, or None
+        """
+        row = self.conn.execute("SELECT record FROM monsters WHERE monster_id = ?", (str(monster_id),)).fetchone()
+        if not row:
+            return None
+        record = json.loads(row[0])
+        record['dropped_items'] = [
+            {'item_id': item_id, 'item_name': item_name}
+            for item_id, item_name in self.conn.execute(
+                "SELECT items.item_id, items.item_name FROM item_drops JOIN items ON items.item_id = item_drops.item_id "
+                "WHERE item_drops.monster_id = ? ORDER BY CAST(items.item_id AS INTEGER)", (str(monster_id),)
+            )
+        ]
+        return record
+
+    def query(self, sql, params=()):
+        """
+        Run a read-only SQL statement and return (column names, rows)
+
+        The statement runs on a separate read-only connection, so statements
+        that write (including WITH ... DELETE) fail instead of changing the store.
+        """
+        conn = sqlite3.connect(f"file:{pathname2url(os.path.abspath(self.db_path))}?mode=ro", uri=True, timeout=30)
+        try:
+            conn.execute("PRAGMA query_only=ON")
+            cursor = conn.execute(sql, params)
+            if cursor.description is None:
+                return [], []
+            return [column[0] for column in cursor.description], cursor.fetchall()
+        finally:
+            conn.close()
+
+    def close(self):
+        self.conn.close()
+
+
+def refresh_items(final_path="final.json", db_path=DATASET_DB):
+    """
+    Load final.json into the dataset store; called by the pipeline after compacting final.json
+    """
+    with open(final_path, 'r', encoding='utf-8') as f:
+        records = json.load(f)
+    store = DatasetStore(db_path)
+    try:
+        return store.replace_items(records)
+    finally:
+        store.close()
+
+def refresh_monsters(monsters_path=MONSTERS_PATH, db_path=DATASET_DB):
+    """
+    Load the monster table into the dataset store
+    """
+    with open(monsters_path, 'r', encoding='utf-8') as f:
+        records = json.load(f)
+    store = DatasetStore(db_path)
+    try:
+        return store.replace_monsters(records)
+    finally:
+        store.close()
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description='Load and query the indexed SQLite dataset store')
+    parser.add_argument('command', choices=['load', 'items', 'count', 'monster', 'sql'])
+    parser.add_argument('value', nargs='?', help='monster: monster ID; sql: SELECT statement; count: category|grade|class|monster|area')
+    parser.add_argument('--db', default=DATASET_DB, help='SQLite database file')
+    parser.add_argument('--final', default='final.json', help='load: item records')
+    parser.add_argument('--monsters', default=MONSTERS_PATH, help='load: monster table (skipped if missing)')
+    parser.add_argument('--category', help='Filter by category_id')
+    parser.add_argument('--grade', help='Filter by item_grade, e.g. grade05')
+    parser.add_argument('--class', dest='class_name', help='Filter by class name, e.g. 騎士')
+    parser.add_argument('--monster', help='Filter by dropping monster_id')
+    parser.add_argument('--name', help='Filter by item name substring')
+    parser.add_argument('--limit', type=int, default=20, help='items: maximum number of records')
+    parser.add_argument('--json', action='store_true', help='items: print the full records as JSON')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == 'load':
+        print(f"items: {refresh_items(args.final, args.db)}")
+        if os.path.exists(args.monsters):
+            print(f"monsters: {refresh_monsters(args.monsters, args.db)}")
+        print(f"({(time.perf_counter() - start) * 1000:.1f} ms)")
+        return
+
+    store = DatasetStore(args.db)
+    filters = {'category': args.category, 'grade': args.grade, 'class_name': args.class_name,
+               'monster': args.monster, 'name': args.name}
+    if args.command == 'items':
+        records = store.find_items(args.limit, **filters)
+        for record in records:
+            if args.json:
+                print(json.dumps(record, ensure_ascii=False))
+            else:
+                print(f"{record.get('item_id'):>6} {record.get('item_grade', ''):8} {record.get('category_name', ''):8} {record.get('item_name', '')}")
+        count = len(records)
+    elif args.command == 'count':
+        if (args.value or 'category') not in GROUPINGS:
+            parser.error(f"count needs one of {', '.join(GROUPINGS)}")
+        rows = store.count_by(args.value or 'category', **filters)
+        for group, number in rows:
+            print(f"{number:6} {group}")
+        count = len(rows)
+    elif args.command == 'monster':
+        record = store.monster(args.value)
+        print(json.dumps(record, ensure_ascii=False, indent=2) if record else f"Monster {args.value} not found")
+        count = 1 if record else 0
+    else:
+        try:
+            columns, rows = store.query(args.value)
+        except sqlite3.Error as e:
+            store.close()
+            parser.error(f"Query failed: {e}")
+        print('\t'.join(columns))
+        for row in rows:
+            print('\t'.join('' if value is None else str(value) for value in row))
+        count = len(rows)
+    store.close()
+    print(f"({count} rows in {(time.perf_counter() - start) * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+FAILED_ITEMS_PATH = "failed_items.jsonl"
+
+class DeadLetterQueue:
+    def __init__(self, path=FAILED_ITEMS_PATH):
+        """
+        Persisted list of item URLs whose fetch failed after all retries
+
+        Entries are appended to a JSONL file; a later line with
+        "resolved": true removes the (stage, item_url) entry again.
+
+        Args:
+            path: Path of the JSONL file
+        """
+        self.path = path
+        self.lock = threading.Lock()
+
+    def append(self, record):
+        """
+        Append one record to the file
+        """
+        with self.lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def add(self, stage, item, error):
+        """
+        Record a failed item for a pipeline stage
+        """
+        self.append({
+            'stage': stage,
+            'item_id': item.get('item_id', ''),
+            'item_url': item.get('item_url', ''),
+            'item_name': item.get('item_name', ''),
+            'item': item,
+            'error': str(error),
+            'failed_at': time.time()
+        })
+
+    def resolve(self, stage, item_url):
+        """
+        Remove a failed item after it was processed successfully
+        """
+        self.append({'stage': stage, 'item_url': item_url, 'resolved': True})
+
+    def load(self, stage=None):
+        """
+        Return the outstanding failed entries, optionally for one stage only
+        """
+        entries = {}
+        if not os.path.exists(self.path):
+            return []
+        with self.lock:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    key = (record['stage'], record['item_url'])
+                    if record.get('resolved'):
+                        entries.pop(key, None)
+                    else:
+                        entries[key] = record
+        return [entry for entry in entries.values() if stage is None or entry['stage'] == stage]
+
+    def compact(self):
+        """
+        Rewrite the file with only the outstanding entries
+        """
+        entries = self.load()
+        with self.lock:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.path)
+        return len(entries)
+
+
+def replay_fetch_and_parse_items(entries):
+    """
+    Re-run ItemFetcher for failed items and add them to final.json
+    """
+    from fetch_and_parse_items import ItemFetcher
+    fetcher = ItemFetcher()
+    return fetcher.replay_failed(entries)
+
+def replay_item_detail_fetcher(entries):
+    """
+    Re-run ItemDetailFetcher for failed items and save them to scraped_items/
+    """
+    from item_detail_fetcher import ItemDetailFetcher
+    fetcher = ItemDetailFetcher(os.path.join("scraped_data", "json", "all_items.json"))
+    return fetcher.replay_failed(entries)
+
+def replay_update_filtered_items(entries):
+    """
+    Re-run the monster drop update for failed items
+    """
+    from update_filtered_items import replay_failed_items
+    return replay_failed_items(entries)
+
+def replay_monster_crawler(entries):
+    """
+    Re-fetch failed monster pages and add them to monsters.json
+    """
+    from monster_crawler import MonsterCrawler
+    return MonsterCrawler().replay_failed(entries)
+
+def replay_category_pages(entries):
+    """
+    Scrape the categories of failed list pages again and update all_items.json
+    """
+    from item_detail_scraper import ItemDetailScraper
+    scraper = ItemDetailScraper(os.path.join("scraped_data", "equipment_categories.json"))
+    return scraper.replay_failed(entries)
+
+REPLAY_HANDLERS = {
+    'fetch_and_parse_items': replay_fetch_and_parse_items,
+    'item_detail_fetcher': replay_item_detail_fetcher,
+    'update_filtered_items': replay_update_filtered_items,
+    'monster_crawler': replay_monster_crawler,
+    'category_pages': replay_category_pages,
+}
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description='List or replay items whose fetch failed')
+    parser.add_argument('command', choices=['list', 'replay', 'compact'])
+    parser.add_argument('--stage', choices=sorted(REPLAY_HANDLERS), help='Only this pipeline stage')
+    args = parser.parse_args()
+
+    queue = DeadLetterQueue()
+
+    if args.command == 'list':
+        entries = queue.load(args.stage)
+        for entry in entries:
+            print(f"[{entry['stage']}] {entry['item_id']} {entry['item_name']} {entry['item_url']} - {entry['error']}")
+        print(f"{len(entries)} failed items")
+    elif args.command == 'replay':
+        stages = [args.stage] if args.stage else sorted(REPLAY_HANDLERS)
+        for stage in stages:
+            entries = queue.load(stage)
+            if not entries:
+                continue
+            logger.info(f"Replaying {len(entries)} failed items for {stage}")
+            succeeded = REPLAY_HANDLERS[stage](entries)
+            logger.info(f"Recovered {succeeded}/{len(entries)} failed items for {stage}")
+        queue.compact()
+    elif args.command == 'compact':
+        print(f"{queue.compact()} failed items remain")
+
+
+if __name__ == "__main__":
+    main()
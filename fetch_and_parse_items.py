@@ -1,12 +1,25 @@
-import requests
-from bs4 import BeautifulSoup
+import argparse
+import asyncio
 import json
 import os
-import time
 import logging
 import re
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import soupsieve as sv
+from http_client import get_client
+from page_archive import PageArchive
+from failed_items import DeadLetterQueue
+from retry_policy import CircuitOpenError, wait_for_circuit
+from crawl_frontier import CrawlFrontier, PENDING, DONE, FAILED
+from change_feed import ChangeTracker
+from dataset_store import refresh_items
+from stat_index import refresh_stat_index
+from columnar_export import export as export_columnar
+from jsonl_sink import JsonlSink
+from parser_backend import PARSER_BACKENDS, DEFAULT_PARSER, DETAIL_REGIONS, make_soup, parse_tree
+from xpath_extractors import ItemXPathExtractor
 
 # Configure logging
 logging.basicConfig(
@@ -19,18 +32,72 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Selectors and patterns used for every page, compiled once
+BASIC_LABEL_SELECTOR = sv.compile('.basicList .ti')
+DETAIL_LABEL_SELECTOR = sv.compile('.detailInfo .xjList .ti')
+GRADE_SELECTOR = sv.compile('.itemTit .name span')
+CLASS_SELECTOR = sv.compile('.class')
+CONN_SELECTOR = sv.compile('.conn')
+ENHANCE_ROW_SELECTOR = sv.compile('.addList .tbody li')
+COLUMN_SELECTOR = sv.compile('.column')
+MONSTER_SECTION_SELECTOR = sv.compile('.monsterInfo')
+MONSTER_SELECTOR = sv.compile('.monsInfo')
+MONSTER_NAME_SELECTOR = sv.compile('.monsName a')
+MONSTER_TYPE_SELECTOR = sv.compile('.monsType')
+MONSTER_SIZE_SELECTOR = sv.compile('.monsSize')
+MONSTER_LEVEL_SELECTOR = sv.compile('.monsLevel')
+MONSTER_WEAKNESS_SELECTOR = sv.compile('.monsPoint span')
+MONSTER_AREA_SELECTOR = sv.compile('.monsAddr li')
+MONSTER_ID_RE = re.compile(r'id=(\d+)')
+
+# .ti label text -> field, matched like :contains (the label only has to contain the text)
+BASIC_LABELS = {
+    '職業': 'classes',
+    '武器攻擊力': 'attack',
+    '物理防禦(AC)': 'defense',
+    '屬性': 'item_stats',
+    '祝福屬性': 'item_stats2',
+    '材質': 'material',
+    '重量': 'weight',
+}
+DETAIL_LABELS = {
+    '損傷': 'canbedmg',
+    '倉庫': 'store',
+    '交換': 'trade',
+    '安定值': 'safe_val',
+}
+
 class ItemFetcher:
-    def __init__(self):
+    def __init__(self, offline=False, parser=DEFAULT_PARSER, restrict=False):
         """
         Initialize the fetcher with configurations
+        
+        Args:
+            offline: Only parse pages; do not set up the HTTP client or page archive
+            parser: Parser backend, one of PARSER_BACKENDS
+            restrict: Only build the page regions the extractors read (BeautifulSoup backends)
         """
+        self.parser = parser
+        self.regions = DETAIL_REGIONS if restrict else None
+        self.xpath_extractor = ItemXPathExtractor() if parser == 'lxml-xpath' else None
         self.merge_items_path = os.path.join("scraped_data", "json", "merge_items.json")
         self.output_path = "final.json"
-        self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
+        # Records are appended here as they are parsed and compacted into final.json
+        self.records_path = "final.jsonl"
+        self.sink = JsonlSink(self.records_path)
+        self.frontier = None
+        self.changes = None
+        if not offline:
+            self.client = get_client()
+            self.archive = PageArchive()
+            self.dead_letters = DeadLetterQueue()
+            self.frontier = CrawlFrontier('fetch_and_parse_items')
+            self.changes = ChangeTracker('fetch_and_parse_items')
+        # Item IDs already in final.jsonl, and the offsets of their lines (loaded on first use)
+        self.existing_ids = set()
+        self.record_offsets = None
         self.processed_count = 0
-        self.final_data = []
+        self.unchanged_count = 0
         
     def load_merge_items(self):
         """
@@ -59,11 +126,16 @@ class ItemFetcher:
         
         try:
             logger.info(f"Fetching HTML for item: {item_name} from {item_url}")
-            response = requests.get(item_url, headers=self.headers)
+            # A change check must ask the site; a fresh cache entry would log a visit that saw nothing
+            response = self.client.get(item_url, revalidate=self.changes is not None)
             response.raise_for_status()
             return response.text
+        except CircuitOpenError:
+            # The host is down, not the item: the caller waits and retries it
+            raise
         except Exception as e:
             logger.error(f"Error fetching HTML for {item_name}: {e}")
+            self.dead_letters.add('fetch_and_parse_items', item, e)
             return None
     
     def parse_item_html(self, html_content, item):
@@ -73,16 +145,20 @@ class ItemFetcher:
         if not html_content:
             return None
         
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
         # Create a copy of the original item to add detailed information
         detailed_item = item.copy()
         
         # Extract basic information
-        basic_info = self.extract_basic_info(soup)
-        detail_info = self.extract_detail_info(soup)
-        enhance_info = self.extract_enhance_info(soup)
-        monster_drops = self.extract_monster_drops(soup)
+        if self.xpath_extractor:
+            tree = parse_tree(html_content)
+            extractor = self.xpath_extractor
+        else:
+            tree = make_soup(html_content, self.parser, self.regions)
+            extractor = self
+        basic_info = extractor.extract_basic_info(tree)
+        detail_info = extractor.extract_detail_info(tree)
+        enhance_info = extractor.extract_enhance_info(tree)
+        monster_drops = extractor.extract_monster_drops(tree)
         
         # Add extracted information to the detailed_item
         if basic_info:
@@ -107,15 +183,52 @@ class ItemFetcher:
             
         return detailed_item
         
+    def find_labelled_values(self, soup, label_selector, labels, value_selector=None):
+        """
+        Walk the .ti labels matched by label_selector once and dispatch each to its fields
+        
+        For every field, returns the element that
+        `<label_selector>:contains(label) + .con <value_selector>` selects first,
+        without re-scanning the page per label. 'classes' collects all .class
+        elements, like select() does.
+        
+        Args:
+            soup: Parsed page
+            label_selector: Compiled selector for the .ti elements
+            labels: Mapping of label text to field name
+            value_selector: Compiled selector applied inside .con, or None for .con itself
+        
+        Returns:
+            Dict of field name -> element (list of elements for 'classes')
+        """
+        found = {}
+        for label_elem in label_selector.select(soup):
+            value_elem = label_elem.find_next_sibling()
+            if value_elem is None or 'con' not in value_elem.get('class', []):
+                continue
+            
+            label_text = label_elem.get_text()
+            for label, field in labels.items():
+                if label not in label_text:
+                    continue
+                if field == 'classes':
+                    found.setdefault(field, []).extend(CLASS_SELECTOR.select(value_elem))
+                elif field not in found:
+                    element = value_selector.select_one(value_elem) if value_selector else value_elem
+                    if element is not None:
+                        found[field] = element
+        return found
+    
     def extract_basic_info(self, soup):
         """
         Extract basic information about the item
         """
         basic_info = {}
+        values = self.find_labelled_values(soup, BASIC_LABEL_SELECTOR, BASIC_LABELS, CONN_SELECTOR)
         
         # Extract item grade (class name in <span> element)
         try:
-            grade_span = soup.select_one('.itemTit .name span')
+            grade_span = GRADE_SELECTOR.select_one(soup)
             if grade_span and 'class' in grade_span.attrs:
                 basic_info['item_grade'] = grade_span['class'][0]
         except Exception as e:
@@ -123,7 +236,7 @@ class ItemFetcher:
         
         # Extract item classes (职业)
         try:
-            class_elements = soup.select('.basicList .ti:contains("職業") + .con .class')
+            class_elements = values.get('classes')
             if class_elements:
                 item_classes = []
                 for class_elem in class_elements:
@@ -145,7 +258,7 @@ class ItemFetcher:
         
         # Extract weapon attack power (武器攻擊力)
         try:
-            attack_element = soup.select_one('.basicList .ti:contains("武器攻擊力") + .con .conn')
+            attack_element = values.get('attack')
             if attack_element:
                 attack_text = attack_element.text.strip()
                 basic_info['attack'] = attack_text
@@ -155,7 +268,7 @@ class ItemFetcher:
             
         # Extract physical defense (AC)
         try:
-            defense_element = soup.select_one('.basicList .ti:contains("物理防禦(AC)") + .con .conn')
+            defense_element = values.get('defense')
             if defense_element:
                 defense_text = defense_element.text.strip()
                 basic_info['defense'] = defense_text
@@ -164,7 +277,7 @@ class ItemFetcher:
             
         # Extract item stats (属性)
         try:
-            stats_element = soup.select_one('.basicList .ti:contains("屬性") + .con .conn')
+            stats_element = values.get('item_stats')
             if stats_element:
                 stats_text = stats_element.get_text(separator="\n").strip()
                 stats_list = [s.strip() for s in stats_text.split('\n') if s.strip()]
@@ -174,7 +287,7 @@ class ItemFetcher:
             
         # Extract blessed stats (祝福屬性)
         try:
-            blessed_element = soup.select_one('.basicList .ti:contains("祝福屬性") + .con .conn')
+            blessed_element = values.get('item_stats2')
             if blessed_element:
                 blessed_text = blessed_element.get_text(separator="\n").strip()
                 blessed_list = [s.strip() for s in blessed_text.split('\n') if s.strip()]
@@ -184,7 +297,7 @@ class ItemFetcher:
             
         # Extract material (材質)
         try:
-            material_element = soup.select_one('.basicList .ti:contains("材質") + .con .conn')
+            material_element = values.get('material')
             if material_element:
                 material_text = material_element.text.strip()
                 basic_info['material'] = material_text
@@ -193,7 +306,7 @@ class ItemFetcher:
             
         # Extract weight (重量)
         try:
-            weight_element = soup.select_one('.basicList .ti:contains("重量") + .con .conn')
+            weight_element = values.get('weight')
             if weight_element:
                 weight_text = weight_element.text.strip()
                 basic_info['weight'] = weight_text
@@ -207,42 +320,16 @@ class ItemFetcher:
         Extract detailed information about the item
         """
         detail_info = {}
+        values = self.find_labelled_values(soup, DETAIL_LABEL_SELECTOR, DETAIL_LABELS)
         
-        # Extract damage protection (損傷)
-        try:
-            damage_element = soup.select_one('.detailInfo .xjList .ti:contains("損傷") + .con')
-            if damage_element:
-                damage_text = damage_element.text.strip()
-                detail_info['canbedmg'] = damage_text
-        except Exception as e:
-            logger.warning(f"Error extracting damage protection: {e}")
-            
-        # Extract storage (倉庫)
-        try:
-            storage_element = soup.select_one('.detailInfo .xjList .ti:contains("倉庫") + .con')
-            if storage_element:
-                storage_text = storage_element.text.strip()
-                detail_info['store'] = storage_text
-        except Exception as e:
-            logger.warning(f"Error extracting storage info: {e}")
-            
-        # Extract trade (交換)
-        try:
-            trade_element = soup.select_one('.detailInfo .xjList .ti:contains("交換") + .con')
-            if trade_element:
-                trade_text = trade_element.text.strip()
-                detail_info['trade'] = trade_text
-        except Exception as e:
-            logger.warning(f"Error extracting trade info: {e}")
-            
-        # Extract safe value (安定值)
-        try:
-            safe_element = soup.select_one('.detailInfo .xjList .ti:contains("安定值") + .con')
-            if safe_element:
-                safe_text = safe_element.text.strip()
-                detail_info['safe_val'] = safe_text
-        except Exception as e:
-            logger.warning(f"Error extracting safe value: {e}")
+        # Damage protection (損傷), storage (倉庫), trade (交換) and safe value (安定值)
+        for field in DETAIL_LABELS.values():
+            try:
+                element = values.get(field)
+                if element:
+                    detail_info[field] = element.text.strip()
+            except Exception as e:
+                logger.warning(f"Error extracting {field}: {e}")
             
         return detail_info
         
@@ -253,9 +340,9 @@ class ItemFetcher:
         enhance_info = []
         
         try:
-            enhance_elements = soup.select('.addList .tbody li')
+            enhance_elements = ENHANCE_ROW_SELECTOR.select(soup)
             for element in enhance_elements:
-                columns = element.select('.column')
+                columns = COLUMN_SELECTOR.select(element)
                 if len(columns) >= 2:
                     level = columns[0].text.strip()
                     effect = columns[1].text.strip()
@@ -276,14 +363,14 @@ class ItemFetcher:
         
         # Try to find monster drops section - there might be none for this item
         try:
-            monster_section = soup.select_one('.monsterInfo')
+            monster_section = MONSTER_SECTION_SELECTOR.select_one(soup)
             if monster_section:
-                monster_elements = monster_section.select('.monsInfo')
+                monster_elements = MONSTER_SELECTOR.select(monster_section)
                 for monster_elem in monster_elements:
                     monster_info = {}
                     
                     # Extract monster name and URL
-                    name_elem = monster_elem.select_one('.monsName a')
+                    name_elem = MONSTER_NAME_SELECTOR.select_one(monster_elem)
                     if name_elem:
                         monster_info['monster_name'] = name_elem.text.strip()
                         monster_info['monster_url'] = name_elem.get('href', '')
@@ -292,29 +379,29 @@ class ItemFetcher:
                         
                         # Extract monster ID from URL if possible
                         if 'monster_url' in monster_info:
-                            id_match = re.search(r'id=(\d+)', monster_info['monster_url'])
+                            id_match = MONSTER_ID_RE.search(monster_info['monster_url'])
                             if id_match:
                                 monster_info['monster_id'] = id_match.group(1)
                     
                     # Extract monster type
-                    type_elem = monster_elem.select_one('.monsType')
+                    type_elem = MONSTER_TYPE_SELECTOR.select_one(monster_elem)
                     if type_elem:
                         monster_info['monster_type'] = type_elem.get('class', [''])[1] if len(type_elem.get('class', [])) > 1 else ''
                         monster_info['monster_size'] = type_elem.text.strip()
                     
                     # Extract monster size class
-                    size_elem = monster_elem.select_one('.monsSize')
+                    size_elem = MONSTER_SIZE_SELECTOR.select_one(monster_elem)
                     if size_elem:
                         size_class = size_elem.get('class', [''])[0] if size_elem.get('class', []) else ''
                         monster_info['monster_size_class'] = size_class
                     
                     # Extract monster level
-                    level_elem = monster_elem.select_one('.monsLevel')
+                    level_elem = MONSTER_LEVEL_SELECTOR.select_one(monster_elem)
                     if level_elem:
                         monster_info['monster_level'] = level_elem.text.strip()
                     
                     # Extract monster weaknesses
-                    weakness_elements = monster_elem.select('.monsPoint span')
+                    weakness_elements = MONSTER_WEAKNESS_SELECTOR.select(monster_elem)
                     if weakness_elements:
                         weaknesses = []
                         for elem in weakness_elements:
@@ -326,7 +413,7 @@ class ItemFetcher:
                         monster_info['monster_weaknesses'] = weaknesses
                     
                     # Extract monster areas
-                    area_elements = monster_elem.select('.monsAddr li')
+                    area_elements = MONSTER_AREA_SELECTOR.select(monster_elem)
                     if area_elements:
                         areas = [elem.text.strip() for elem in area_elements if elem.text.strip()]
                         monster_info['monster_areas'] = areas
@@ -339,15 +426,32 @@ class ItemFetcher:
         
     def save_final_data(self):
         """
-        Save the final data to final.json
+        Compact final.jsonl into final.json, reload it into the dataset store and the stat index, and write final.parquet
         """
+        if not self.sink.exists():
+            logger.info(f"No records in {self.records_path}, leaving {self.output_path} unchanged")
+            return
         try:
             logger.info(f"Saving final data to {self.output_path}")
-            with open(self.output_path, 'w', encoding='utf-8') as f:
-                json.dump(self.final_data, f, ensure_ascii=False, indent=2)
-            logger.info(f"Successfully saved {len(self.final_data)} items to {self.output_path}")
+            count = self.sink.compact(self.output_path)
+            logger.info(f"Successfully saved {count} items to {self.output_path}")
         except Exception as e:
             logger.error(f"Error saving final data: {e}")
+            return
+        
+        # Keep the indexed dataset store in step with final.json
+        try:
+            refresh_items(self.output_path)
+        except Exception as e:
+            logger.error(f"Error updating the dataset store: {e}")
+        try:
+            refresh_stat_index(self.output_path)
+        except Exception as e:
+            logger.error(f"Error updating the stat index: {e}")
+        try:
+            export_columnar(self.output_path)
+        except Exception as e:
+            logger.error(f"Error writing the columnar export: {e}")
     
     def process_and_update(self, item):
         """
@@ -357,92 +461,291 @@ class ItemFetcher:
         html_content = self.fetch_item_html(item)
         
         if html_content:
+            # Pages whose item content has not changed are neither parsed nor written
+            if self.is_unchanged(item, html_content):
+                return self.skip_unchanged(item)
+            
             # Parse the HTML content
             detailed_item = self.parse_item_html(html_content, item)
-            
-            if detailed_item:
-                # Add to final data
-                self.final_data.append(detailed_item)
-                self.processed_count += 1
-                
-                # Save the final data every 10 items
-                if self.processed_count % 10 == 0:
-                    self.save_final_data()
-                    logger.info(f"Progress: Processed {self.processed_count} items so far")
-                
-                # Save HTML to example folder (optional)
-                self.save_html_example(item, html_content)
-                
-                return detailed_item
+            return self.add_detailed_item(item, detailed_item, html_content)
                 
         return None
     
-    def save_html_example(self, item, html_content):
+    def is_unchanged(self, item, html_content):
         """
-        Save HTML content to example folder for reference
+        Check whether a fetched page has the same content fingerprint as when its record was written
         """
-        if not html_content or not item.get('item_name'):
-            return
+        if not self.changes or not item.get('item_id'):
+            return False
+        unchanged = self.changes.check(item['item_id'], html_content)
+        return unchanged and item['item_id'] in self.existing_ids
+    
+    def skip_unchanged(self, item):
+        """
+        Mark an unchanged item done without touching final.jsonl
+        """
+        self.changes.skip(item['item_id'])
+        self.frontier.complete(item.get('item_url'))
+        self.unchanged_count += 1
+        return item
+    
+    def previous_record(self, item_id):
+        """
+        Return the record final.jsonl held for an item before this run, or None
+        
+        Lines are only ever appended, so the offsets read once stay valid.
+        """
+        if self.record_offsets is None:
+            self.record_offsets = self.sink.offsets('item_id')
+        offset = self.record_offsets.get(item_id)
+        return self.sink.read_at(offset) if offset is not None else None
+    
+    def add_detailed_item(self, item, detailed_item, html_content):
+        """
+        Append a parsed item to final.jsonl and mark it done in the frontier
+        """
+        if not detailed_item:
+            return None
             
-        # Create example directory if it doesn't exist
-        os.makedirs('example', exist_ok=True)
+        old_record = self.previous_record(detailed_item.get('item_id')) if self.changes else None
+        
+        # The record is on disk once appended, so the item is done; a page
+        # that changed outside the parsed fields leaves final.jsonl alone
+        if old_record != detailed_item:
+            self.sink.append(detailed_item)
+        if self.frontier:
+            self.frontier.complete(item.get('item_url'))
+        if self.changes:
+            self.changes.commit(detailed_item.get('item_id'), detailed_item, old_record)
+        self.processed_count += 1
+        
+        if self.processed_count % 10 == 0:
+            logger.info(f"Progress: Processed {self.processed_count} items so far")
         
-        # Create safe filename
-        item_name = item.get('item_name', 'unknown')
-        safe_name = re.sub(r'[\\/*?:"<>|]', '', item_name)
+        # Keep the raw page in the page archive
+        self.archive_html(item, html_content)
         
-        # Save HTML to file
-        file_path = os.path.join('example', f"{safe_name}.html")
+        return detailed_item
+    
+    def archive_html(self, item, html_content):
+        """
+        Save the raw HTML content to the page archive, keyed by item_id
+        """
+        if not html_content or not item.get('item_id'):
+            return
+            
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(html_content)
+            self.archive.put(item['item_id'], html_content, item.get('item_name'), item.get('item_url'))
         except Exception as e:
-            logger.warning(f"Error saving HTML example for {item_name}: {e}")
+            logger.warning(f"Error archiving HTML for {item.get('item_name', 'unknown')}: {e}")
     
-    def run(self):
+    def seed_frontier(self):
         """
-        Run the entire process
-        """
-        logger.info("Starting item fetcher")
+        Load merge_items.json into the crawl frontier
         
+        On the first run, items already present in final.json are recorded as done.
+        """
         # Load the merge_items.json file
         items = self.load_merge_items()
         
         if not items:
-            logger.error("No items found in merge_items.json. Exiting.")
-            return
+            return False
+        
+        # Item IDs already in the output
+        existing_items = self.load_existing_final_data()
+        done_ids = existing_items if self.frontier.is_empty() else set()
+        self.frontier.seed(items, done_ids)
+        self.existing_ids = existing_items
+        removed = self.changes.remove_missing(item.get('item_id') for item in items if item.get('item_id'))
+        self.frontier.remove(removed)
+        
+        counts = self.frontier.counts()
+        logger.info(f"Crawl frontier: {counts.get(PENDING, 0)} pending, {counts.get(DONE, 0)} done, {counts.get(FAILED, 0)} failed")
+        return True
+    
+    def load_existing_final_data(self):
+        """
+        Return the set of item IDs already in the output
         
-        # Check if final.json already exists and load it if it does
-        if os.path.exists(self.output_path):
+        An existing final.json without final.jsonl is converted to final.jsonl first.
+        """
+        if not self.sink.exists() and os.path.exists(self.output_path):
             try:
                 with open(self.output_path, 'r', encoding='utf-8') as f:
-                    self.final_data = json.load(f)
-                logger.info(f"Loaded {len(self.final_data)} items from existing {self.output_path}")
-                
-                # Create a map of existing items by ID
-                existing_items = {item.get('item_id'): True for item in self.final_data if 'item_id' in item}
-                
-                # Filter out items that have already been processed
-                items = [item for item in items if item.get('item_id') not in existing_items]
-                logger.info(f"Found {len(items)} new items to process")
+                    count = self.sink.rewrite(json.load(f))
+                logger.info(f"Converted {count} items from existing {self.output_path} to {self.records_path}")
             except Exception as e:
                 logger.error(f"Error loading existing final.json: {e}")
+                return set()
+        return self.sink.keys('item_id')
+    
+    def replay_failed(self, entries):
+        """
+        Retry items from the failed-items list and add recovered ones to final.json
         
-        # Process each item
-        total_items = len(items)
-        for i, item in enumerate(items):
-            logger.info(f"Processing item {i+1}/{total_items}: {item.get('item_name', 'Unknown')}")
-            self.process_and_update(item)
-            
-            # Add a small delay to avoid overwhelming the server
-            time.sleep(1)
+        Returns:
+            Number of items recovered
+        """
+        existing_items = self.load_existing_final_data()
+        recovered = 0
+        
+        for entry in entries:
+            item = entry['item']
+            try:
+                if item.get('item_id') in existing_items or self.process_and_update(item):
+                    self.dead_letters.resolve('fetch_and_parse_items', entry['item_url'])
+                    recovered += 1
+            except CircuitOpenError as e:
+                logger.error(f"{e}; stopping the replay, the remaining items stay in the failed list")
+                break
         
-        # Save the final data one last time
         self.save_final_data()
+        return recovered
+    
+    def run(self):
+        """
+        Run the entire process
+        """
+        logger.info("Starting item fetcher")
+        
+        if not self.seed_frontier():
+            logger.error("No items found in merge_items.json. Exiting.")
+            return
+        
+        # Process leased items until the frontier is drained
+        try:
+            while True:
+                batch = self.frontier.lease(10)
+                if not batch:
+                    break
+                for position, item in enumerate(batch):
+                    logger.info(f"Processing item {item.get('item_id', '')}: {item.get('item_name', 'Unknown')}")
+                    try:
+                        if not self.process_and_update(item):
+                            self.frontier.fail(item['item_url'], "fetch or parse failed")
+                    except CircuitOpenError as e:
+                        # Hand the rest of the batch back without counting an attempt
+                        self.frontier.release(urls=[entry['item_url'] for entry in batch[position:]])
+                        wait_for_circuit(e)
+                        break
+        except KeyboardInterrupt:
+            logger.warning("Interrupted, returning leased items to the frontier")
+            self.frontier.release()
+        finally:
+            # Compact final.jsonl into final.json
+            self.save_final_data()
         
-        logger.info(f"Completed processing {self.processed_count} items")
+        logger.info(f"Completed processing {self.processed_count} items ({self.unchanged_count} unchanged pages skipped)")
+    
+    def run_async(self, concurrency=8, requests_per_second=4.0):
+        """
+        Run the entire process with concurrent fetches
+        
+        Args:
+            concurrency: Maximum number of requests in flight at once
+            requests_per_second: Global ceiling on request starts per second
+        """
+        logger.info(f"Starting async item fetcher (concurrency={concurrency}, rps={requests_per_second})")
+        
+        if not self.seed_frontier():
+            logger.error("No items found in merge_items.json. Exiting.")
+            return
+        
+        try:
+            asyncio.run(self.process_items_async(concurrency, requests_per_second))
+        except KeyboardInterrupt:
+            logger.warning("Interrupted, returning leased items to the frontier")
+            self.frontier.release()
+        finally:
+            # Compact final.jsonl into final.json
+            self.save_final_data()
+        
+        logger.info(f"Completed processing {self.processed_count} items ({self.unchanged_count} unchanged pages skipped)")
+    
+    async def process_items_async(self, concurrency, requests_per_second):
+        """
+        Fetch and parse items from the frontier concurrently, adding results in lease order
+        
+        Fetching and parsing run on a thread pool; results are appended to
+        final.jsonl on the event loop so the output matches the sequential run.
+        """
+        loop = asyncio.get_running_loop()
+        self.client.ensure_pool_size(concurrency)
+        queue = asyncio.Queue(maxsize=concurrency * 2)
+        results = {}
+        next_index = 0
+        
+        async def worker(executor):
+            nonlocal next_index
+            while True:
+                index, item = await queue.get()
+                try:
+                    logger.info(f"Processing item {item.get('item_id', '')}: {item.get('item_name', 'Unknown')}")
+                    html_content = await loop.run_in_executor(executor, self.fetch_item_html, item)
+                    detailed_item = None
+                    unchanged = bool(html_content) and self.is_unchanged(item, html_content)
+                    if html_content and not unchanged:
+                        detailed_item = await loop.run_in_executor(executor, self.parse_item_html, html_content, item)
+                    results[index] = (item, detailed_item, html_content, unchanged, False)
+                except CircuitOpenError as e:
+                    # Keep the lease while waiting so the item is not handed out again right away
+                    logger.warning(f"{e}; pausing {e.retry_after:.0f}s")
+                    results[index] = (item, None, None, False, True)
+                    await asyncio.sleep(e.retry_after)
+                except Exception as e:
+                    logger.error(f"Error processing {item.get('item_name', 'Unknown')}: {e}")
+                    results[index] = (item, None, None, False, False)
+                finally:
+                    # Add every finished item that is next in lease order
+                    while next_index in results:
+                        done_item, done_detail, done_html, done_unchanged, circuit_open = results.pop(next_index)
+                        if circuit_open:
+                            self.frontier.release(urls=[done_item['item_url']])
+                        elif done_unchanged:
+                            self.skip_unchanged(done_item)
+                        elif not self.add_detailed_item(done_item, done_detail, done_html):
+                            self.frontier.fail(done_item['item_url'], "fetch or parse failed")
+                        next_index += 1
+                    queue.task_done()
+        
+        # The shared adaptive rate limiter paces requests; rps is its ceiling while this run lasts
+        with self.client.rate_limiter.capped(requests_per_second), ThreadPoolExecutor(max_workers=concurrency) as executor:
+            workers = [asyncio.create_task(worker(executor)) for _ in range(concurrency)]
+            index = 0
+            try:
+                while True:
+                    batch = self.frontier.lease(concurrency * 2)
+                    if not batch:
+                        # Failed items may return to pending once in-flight work settles
+                        await queue.join()
+                        batch = self.frontier.lease(concurrency * 2)
+                        if not batch:
+                            break
+                    for item in batch:
+                        await queue.put((index, item))
+                        index += 1
+                await queue.join()
+            finally:
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fetch and parse item detail pages into final.json')
+    parser.add_argument('--async', dest='use_async', action='store_true', help='Fetch items concurrently with asyncio')
+    parser.add_argument('--concurrency', type=int, default=8, help='Maximum number of requests in flight (async mode)')
+    parser.add_argument('--rps', type=float, default=4.0, help='Global requests-per-second ceiling (async mode)')
+    parser.add_argument('--parser', choices=PARSER_BACKENDS, default=DEFAULT_PARSER, help='HTML parser backend')
+    parser.add_argument('--restrict', action='store_true', help='Only parse the page regions the extractors read')
+    args = parser.parse_args()
+    
+    fetcher = ItemFetcher(parser=args.parser, restrict=args.restrict)
+    if args.use_async:
+        fetcher.run_async(concurrency=args.concurrency, requests_per_second=args.rps)
+    else:
+        fetcher.run()
 
 
 if __name__ == "__main__":
-    fetcher = ItemFetcher()
-    fetcher.run()
+    main()
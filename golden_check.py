@@ -0,0 +1,227 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+import warnings
+from collections import Counter
+from multiprocessing import Pool
+
+from change_feed import diff_records
+from item_detail_fetcher import ItemDetailFetcher
+from page_archive import PAGE_ARCHIVE_DIR
+from parser_backend import PARSER_BACKENDS, DEFAULT_PARSER
+from reparse_items import OfflineReparser, init_worker, parse_final_record, parse_detail_record
+
+logger = logging.getLogger(__name__)
+
+def check_final_record(task):
+    """
+    Re-parse one page and diff it against its final.json record
+    """
+    item, html_content, expected = task
+    return item.get('item_id'), item.get('item_name'), item.get('category_name'), diff_records(expected, parse_final_record((item, html_content)))
+
+def check_detail_record(task):
+    """
+    Re-parse one page and diff it against its scraped_items/ file
+    """
+    item, html_content, expected = task
+    return item.get('item_id'), item.get('item_name'), item.get('category_name'), diff_records(expected, parse_detail_record((item, html_content)))
+
+
+class GoldenCheck(OfflineReparser):
+    def __init__(self, source='example', archive_dir=PAGE_ARCHIVE_DIR, example_dir='example', workers=None, parser=DEFAULT_PARSER, restrict=False, limit=None, include_shared=False):
+        """
+        Re-parse stored pages and compare the records with final.json and scraped_items/
+
+        Used as the regression check for parser changes: a faster backend or
+        extractor must reproduce the committed outputs field for field.
+
+        Args:
+            source: 'archive' to read the page archive, 'example' to read the example/ folder
+            archive_dir: Page archive directory
+            example_dir: Folder with <item_name>.html files
+            workers: Number of parser processes (defaults to the number of cores)
+            parser: Parser backend under test
+            restrict: Only build the page regions the extractors read
+            limit: Only check the first N records of each output
+            include_shared: Also check items whose example/ file name is shared
+                with other items (the file holds only one of their pages)
+        """
+        super().__init__(source, archive_dir, example_dir, workers, parser, restrict)
+        self.final_path = "final.json"
+        self.limit = limit
+        self.include_shared = include_shared
+        self.skipped = Counter()
+
+    def is_shared(self, page_source, item):
+        """
+        Check whether an item's stored page is an example/ file several items share
+        """
+        return not self.include_shared and str(item.get('item_id', '')) in getattr(page_source, 'shared_ids', ())
+
+    def final_tasks(self, page_source, items):
+        """
+        Yield (item, html, expected record) for every final.json record with a stored page
+        """
+        items_by_id = {item.get('item_id'): item for item in items}
+        for expected in self.load_json(self.final_path)[:self.limit]:
+            item = items_by_id.get(expected.get('item_id'))
+            html_content = page_source.get_text(expected.get('item_id', '')) if item else None
+            if html_content and self.is_shared(page_source, item):
+                self.skipped['final'] += 1
+            elif html_content:
+                yield item, html_content, expected
+
+    def detail_tasks(self, page_source):
+        """
+        Yield (item, html, expected record) for every scraped_items/ file with a stored page
+        """
+        fetcher = ItemDetailFetcher(self.all_items_path, offline=True)
+        seen_urls = set()
+        checked = 0
+        for item in fetcher.load_items():
+            item_url = item.get('item_url')
+            if not item_url or not item.get('item_name') or item_url in seen_urls:
+                continue
+            seen_urls.add(item_url)
+            path = os.path.join(fetcher.output_dir, fetcher.output_filename(item))
+            if not os.path.exists(path):
+                continue
+            html_content = page_source.get_text(item.get('item_id', ''))
+            if not html_content:
+                continue
+            if self.is_shared(page_source, item):
+                self.skipped['items'] += 1
+                continue
+            with open(path, 'r', encoding='utf-8') as f:
+                expected = json.load(f)
+            yield item, html_content, expected
+            checked += 1
+            if self.limit and checked >= self.limit:
+                return
+
+    def check(self, pool, check_record, tasks):
+        """
+        Run one comparison and summarize the mismatches
+
+        Returns:
+            Dict with checked/mismatched counts, mismatches per field and per
+            category, and up to three examples per field
+        """
+        checked = 0
+        mismatched = []
+        by_field = Counter()
+        by_category = Counter()
+        examples = {}
+        for item_id, item_name, category, diffs in pool.imap(check_record, tasks, self.chunksize):
+            checked += 1
+            if not diffs:
+                continue
+            mismatched.append(item_id)
+            by_category[category or ''] += 1
+            for field, expected, actual in diffs:
+                by_field[field] += 1
+                field_examples = examples.setdefault(field, [])
+                if len(field_examples) < 3:
+                    field_examples.append({
+                        'item_id': item_id,
+                        'item_name': item_name,
+                        'expected': expected,
+                        'actual': actual,
+                    })
+        return {
+            'checked': checked,
+            'mismatched': len(mismatched),
+            'mismatched_items': mismatched[:50],
+            'by_field': dict(by_field.most_common()),
+            'by_category': dict(by_category.most_common()),
+            'examples': examples,
+        }
+
+    def run(self, final=True, scraped_items=True):
+        """
+        Compare re-parsed records against final.json and/or scraped_items/
+
+        Returns:
+            Dict of {output: summary}
+        """
+        start = time.time()
+        items = self.load_json(self.merge_items_path)
+        page_source = self.open_source(items)
+        restrict = ', restrict' if self.restrict else ''
+        logger.info(f"Checking parser output against stored results from {self.source} with {self.workers} workers ({self.parser}{restrict})")
+
+        report = {}
+        with Pool(self.workers, initializer=init_worker, initargs=(self.parser, self.restrict)) as pool:
+            if final:
+                report['final'] = self.check(pool, check_final_record, self.final_tasks(page_source, items))
+            if scraped_items:
+                report['items'] = self.check(pool, check_detail_record, self.detail_tasks(page_source))
+        page_source.close()
+
+        for output, summary in report.items():
+            summary['skipped_shared'] = self.skipped[output]
+            logger.info(f"{output}: {summary['mismatched']} of {summary['checked']} records differ")
+        logger.info(f"Golden check completed in {time.time() - start:.1f}s")
+        return report
+
+
+def print_report(report):
+    for output, summary in report.items():
+        print(f"\n{output}: {summary['mismatched']} of {summary['checked']} records differ")
+        if summary.get('skipped_shared'):
+            print(f"  {summary['skipped_shared']} items skipped: their example/ file name is shared with other items (--include-shared to check them)")
+        if summary['by_field']:
+            print("  by field:")
+            for field, count in summary['by_field'].items():
+                print(f"    {field:30} {count}")
+        if summary['by_category']:
+            print("  by category:")
+            for category, count in summary['by_category'].items():
+                print(f"    {category:30} {count}")
+        for field, examples in summary['examples'].items():
+            for example in examples:
+                expected = json.dumps(example['expected'], ensure_ascii=False)[:120]
+                actual = json.dumps(example['actual'], ensure_ascii=False)[:120]
+                print(f"  {field} [{example['item_name']} / {example['item_id']}]\n    expected: {expected}\n    actual:   {actual}")
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    # soupsieve warns about :contains on every page
+    warnings.filterwarnings('ignore', category=FutureWarning)
+
+    parser = argparse.ArgumentParser(description='Check re-parsed pages against final.json and scraped_items/')
+    parser.add_argument('--source', choices=['archive', 'example'], default='example', help='Where to read stored pages from')
+    parser.add_argument('--archive', default=PAGE_ARCHIVE_DIR, help='Page archive directory')
+    parser.add_argument('--example-dir', default='example', help='Folder with <item_name>.html files')
+    parser.add_argument('--workers', type=int, help='Number of parser processes (default: all cores)')
+    parser.add_argument('--only', choices=['final', 'items'], help='Only check final.json or only scraped_items/')
+    parser.add_argument('--parser', choices=PARSER_BACKENDS, default=DEFAULT_PARSER, help='HTML parser backend')
+    parser.add_argument('--restrict', action='store_true', help='Only parse the page regions the extractors read')
+    parser.add_argument('--limit', type=int, help='Only check the first N records of each output')
+    parser.add_argument('--include-shared', action='store_true', help='Also check items whose example/ file name other items share')
+    parser.add_argument('--max-mismatches', type=int, default=0, help='Exit with status 1 when more records than this differ')
+    parser.add_argument('--output', help='Write the report as JSON to this file')
+    args = parser.parse_args()
+
+    checker = GoldenCheck(args.source, args.archive, args.example_dir, args.workers, args.parser, args.restrict, args.limit, args.include_shared)
+    report = checker.run(final=args.only != 'items', scraped_items=args.only != 'final')
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    mismatched = sum(summary['mismatched'] for summary in report.values())
+    if mismatched > args.max_mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+HTTP_CACHE_DIR = "http_cache"
+
+# Freshness TTL (seconds) per URL pattern, first match wins.
+# Within the TTL a cached body is served without touching the network;
+# after it expires the entry is revalidated with a conditional request.
+DEFAULT_TTL_RULES = [
+    (r'/equip/detail\.html\?id=\d+', 7 * 24 * 3600),
+    (r'/monster/detail\.html\?id=\d+', 7 * 24 * 3600),
+    (r'/equip\?type_name=', 24 * 3600),
+    (r'/equip\.html', 24 * 3600),
+]
+DEFAULT_TTL = 3600
+
+class HttpCache:
+    def __init__(self, cache_dir=HTTP_CACHE_DIR, ttl_rules=None, default_ttl=DEFAULT_TTL):
+        """
+        URL-keyed on-disk response cache with conditional revalidation
+
+        Args:
+            cache_dir: Directory holding cached bodies and metadata
+            ttl_rules: List of (regex, ttl_seconds) pairs, first match wins
+            default_ttl: TTL for URLs that match no rule
+        """
+        self.cache_dir = cache_dir
+        rules = DEFAULT_TTL_RULES if ttl_rules is None else ttl_rules
+        self.ttl_rules = [(re.compile(pattern), ttl) for pattern, ttl in rules]
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.counter_lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def ttl_for(self, url):
+        """
+        Return the freshness TTL in seconds for a URL
+        """
+        for pattern, ttl in self.ttl_rules:
+            if pattern.search(url):
+                return ttl
+        return self.default_ttl
+
+    def entry_paths(self, url):
+        """
+        Return the (metadata, body) file paths for a URL
+        """
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        directory = os.path.join(self.cache_dir, key[:2])
+        return os.path.join(directory, f"{key}.json"), os.path.join(directory, f"{key}.body")
+
+    def load(self, url):
+        """
+        Load the cached metadata for a URL, or None if not cached
+        """
+        meta_path, body_path = self.entry_paths(url)
+        if not os.path.exists(meta_path) or not os.path.exists(body_path):
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable cache entry for {url}: {e}")
+            return None
+
+    def is_fresh(self, meta):
+        """
+        Check whether a cached entry is still within its TTL
+        """
+        return time.time() - meta.get('validated_at', 0) < self.ttl_for(meta['url'])
+
+    def conditional_headers(self, meta):
+        """
+        Build If-None-Match / If-Modified-Since headers for revalidation
+        """
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def build_response(self, meta):
+        """
+        Rebuild a requests.Response from a cached entry
+        """
+        _, body_path = self.entry_paths(meta['url'])
+        with open(body_path, 'rb') as f:
+            content = f.read()
+
+        response = requests.Response()
+        response.status_code = meta.get('status_code', 200)
+        response.url = meta['url']
+        response.headers = CaseInsensitiveDict(meta.get('headers', {}))
+        response.encoding = meta.get('encoding')
+        response._content = content
+        response.from_cache = True
+        return response
+
+    def store(self, url, response):
+        """
+        Store a successful response body and its validators
+        """
+        meta_path, body_path = self.entry_paths(url)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        now = time.time()
+        meta = {
+            'url': url,
+            'status_code': response.status_code,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'headers': {'Content-Type': response.headers.get('Content-Type', '')},
+            'encoding': response.encoding,
+            'fetched_at': now,
+            'validated_at': now
+        }
+        try:
+            self.write_atomic(body_path, response.content)
+            self.write_atomic(meta_path, json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+        except Exception as e:
+            logger.warning(f"Error writing cache entry for {url}: {e}")
+
+    def touch(self, meta):
+        """
+        Mark a cached entry as revalidated now (after a 304 response)
+        """
+        meta_path, _ = self.entry_paths(meta['url'])
+        meta['validated_at'] = time.time()
+        try:
+            self.write_atomic(meta_path, json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+        except Exception as e:
+            logger.warning(f"Error updating cache entry for {meta['url']}: {e}")
+
+    def write_atomic(self, path, data):
+        """
+        Write bytes to path via a temporary file so readers never see partial data
+        """
+        # Unique per thread: two threads may store the same URL at once
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def fetch(self, url, send, revalidate=False, **kwargs):
+        """
+        Serve a GET from the cache, revalidating or fetching as needed
+
+        Args:
+            url: URL to fetch
+            send: Callable (url, **kwargs) that performs the real GET request
+            revalidate: Send a conditional request even if the entry is still fresh
+        """
+        meta = self.load(url)
+        if meta and not revalidate and self.is_fresh(meta):
+            with self.counter_lock:
+                self.hits += 1
+            return self.build_response(meta)
+
+        if meta:
+            headers = dict(kwargs.pop('headers', None) or {})
+            headers.update(self.conditional_headers(meta))
+            kwargs['headers'] = headers
+
+        response = send(url, **kwargs)
+
+        if meta and response.status_code == 304:
+            with self.counter_lock:
+                self.revalidated += 1
+            self.touch(meta)
+            return self.build_response(meta)
+
+        with self.counter_lock:
+            self.misses += 1
+        if response.status_code == 200:
+            self.store(url, response)
+        response.from_cache = False
+        return response
+
+    def stats(self):
+        """
+        Return hit / revalidation / miss counters
+        """
+        with self.counter_lock:
+            return {'hits': self.hits, 'revalidated': self.revalidated, 'misses': self.misses}
@@ -0,0 +1,175 @@
+import threading
+import logging
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from http_cache import HttpCache
+from rate_limiter import AdaptiveRateLimiter
+from retry_policy import CircuitBreaker, RetryPolicy
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = "https://www.gametsg.net"
+
+# (connect timeout, read timeout) in seconds
+DEFAULT_TIMEOUT = (10, 30)
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'zh-TW,zh;q=0.9,en-US;q=0.5',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+}
+
+class HttpClient:
+    def __init__(self, pool_connections=4, pool_maxsize=10, timeout=DEFAULT_TIMEOUT, headers=None, cache=None,
+                 rate_limiter=None, retry_policy=None, circuit_breaker=None):
+        """
+        Keep-alive HTTP client shared by all scraper stages
+
+        Args:
+            pool_connections: Number of per-host connection pools to keep
+            pool_maxsize: Maximum number of open connections per host
+            timeout: Default timeout applied to every request
+            headers: Extra headers merged over DEFAULT_HEADERS
+            cache: Optional HttpCache used for GET requests
+            rate_limiter: Optional AdaptiveRateLimiter applied to every network request
+            retry_policy: Optional RetryPolicy for transient failures
+            circuit_breaker: Optional per-host CircuitBreaker
+        """
+        self.timeout = timeout
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.lock = threading.Lock()
+
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        if headers:
+            self.session.headers.update(headers)
+        self.mount_adapters()
+
+    def mount_adapters(self):
+        """
+        Mount pooled adapters for http and https, closing the ones they replace
+
+        Connections still checked out of a closed pool are dropped when
+        their request returns them instead of going back to the pool.
+        """
+        replaced = []
+        for prefix in ('https://', 'http://'):
+            old = self.session.adapters.get(prefix)
+            if old is not None and old not in replaced:
+                replaced.append(old)
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=True
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        for old in replaced:
+            old.close()
+
+    def ensure_pool_size(self, pool_maxsize):
+        """
+        Grow the per-host pool so that pool_maxsize requests can run at once
+        """
+        with self.lock:
+            if pool_maxsize > self.pool_maxsize:
+                logger.info(f"Resizing HTTP connection pool from {self.pool_maxsize} to {pool_maxsize} per host")
+                self.pool_maxsize = pool_maxsize
+                self.mount_adapters()
+
+    def request(self, method, url, **kwargs):
+        """
+        Send a request through the shared session with the default timeout
+        
+        Connection errors, timeouts, 429 and 5xx responses are retried with
+        jittered exponential backoff when a retry policy is set. The last
+        response is returned (or the last error raised) once attempts run out.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        policy = self.retry_policy
+        attempt = 1
+        while True:
+            try:
+                response = self.send(method, url, **kwargs)
+            except requests.RequestException as e:
+                if policy is None or attempt >= policy.max_attempts or not policy.is_retryable_error(e):
+                    raise
+                logger.warning(f"Attempt {attempt} for {url} failed: {e}")
+            else:
+                if policy is None or attempt >= policy.max_attempts or not policy.is_retryable_status(response.status_code):
+                    return response
+                logger.warning(f"Attempt {attempt} for {url} returned HTTP {response.status_code}")
+            time.sleep(policy.delay_for(attempt))
+            attempt += 1
+
+    def send(self, method, url, **kwargs):
+        """
+        Send a single attempt, honouring the circuit breaker and rate limiter
+        """
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.before_request(url)
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(url)
+
+        start = time.monotonic()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.RequestException:
+            if self.rate_limiter is not None:
+                self.rate_limiter.record(url, None, time.monotonic() - start)
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.record_failure(url)
+            raise
+
+        if self.rate_limiter is not None:
+            self.rate_limiter.record(url, response.status_code, time.monotonic() - start, response.headers.get('Retry-After'))
+        if self.circuit_breaker is not None:
+            if response.status_code == 429 or response.status_code >= 500:
+                self.circuit_breaker.record_failure(url)
+            else:
+                self.circuit_breaker.record_success(url)
+        return response
+
+    def get(self, url, use_cache=True, revalidate=False, **kwargs):
+        """
+        Send a GET request, going through the response cache when enabled
+
+        With revalidate a fresh cache entry is not served as is: the site is
+        asked with a conditional request (304 keeps the cached body).
+        """
+        if self.cache is not None and use_cache:
+            return self.cache.fetch(url, lambda u, **kw: self.request('GET', u, **kw), revalidate, **kwargs)
+        return self.request('GET', url, **kwargs)
+
+    def close(self):
+        """
+        Close all pooled connections
+        """
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """
+    Return the process-wide shared HttpClient, creating it on first use
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient(
+                cache=HttpCache(),
+                rate_limiter=AdaptiveRateLimiter(),
+                retry_policy=RetryPolicy(),
+                circuit_breaker=CircuitBreaker()
+            )
+        return _client
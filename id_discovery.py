@@ -0,0 +1,312 @@
+import argparse
+import html
+import json
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from http_client import BASE_URL, get_client
+from page_archive import PageArchive
+
+logger = logging.getLogger(__name__)
+
+ID_BITMAP_PATH = "item_id_bitmap.bin"
+DISCOVERED_ITEMS_PATH = os.path.join("scraped_data", "json", "discovered_items.json")
+ITEM_URL = BASE_URL + "/equip/detail.html?id={}"
+DB_TITLE_RE = re.compile(r'<h2 class="dbTitle">\s*([^<]*?)\s*</h2>')
+
+# Two bits per item ID
+UNKNOWN = 0   # never probed, or the last probe failed
+FOUND = 1     # the detail page exists
+MISSING = 2   # no item behind this ID
+DEAD = 3      # listed by a category or found before, but the page is gone now
+STATE_NAMES = {UNKNOWN: 'unknown', FOUND: 'found', MISSING: 'missing', DEAD: 'dead'}
+
+class IdBitmap:
+    MAGIC = b"IDB1"
+
+    def __init__(self, path=ID_BITMAP_PATH):
+        """
+        Compact per-ID probe state, two bits per item ID
+
+        The whole ID space up to the highest probed ID fits in a few hundred
+        bytes, so it is loaded and rewritten in one piece.
+
+        Args:
+            path: File the bitmap is stored in
+        """
+        self.path = path
+        self.bits = bytearray()
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                data = f.read()
+            if data[:len(self.MAGIC)] == self.MAGIC:
+                self.bits = bytearray(data[len(self.MAGIC):])
+            else:
+                logger.warning(f"Ignoring {path}: not an ID bitmap")
+
+    def get(self, item_id):
+        """
+        Return the state of an item ID
+        """
+        index, slot = divmod(item_id, 4)
+        if index >= len(self.bits):
+            return UNKNOWN
+        return (self.bits[index] >> (slot * 2)) & 3
+
+    def set(self, item_id, state):
+        """
+        Record the state of an item ID
+        """
+        index, slot = divmod(item_id, 4)
+        if index >= len(self.bits):
+            self.bits.extend(bytes(index + 1 - len(self.bits)))
+        shift = slot * 2
+        self.bits[index] = (self.bits[index] & ~(3 << shift)) | (state << shift)
+
+    def ids(self, state):
+        """
+        Yield the item IDs in a state, in ascending order
+        """
+        for index, byte in enumerate(self.bits):
+            if byte == 0 and state != UNKNOWN:
+                continue
+            for slot in range(4):
+                if (byte >> (slot * 2)) & 3 == state:
+                    yield index * 4 + slot
+
+    def max_id(self, state=FOUND):
+        """
+        Return the highest item ID in a state, or 0
+        """
+        highest = 0
+        for item_id in self.ids(state):
+            highest = item_id
+        return highest
+
+    def counts(self):
+        """
+        Return the number of probed IDs per state
+        """
+        counts = {STATE_NAMES[state]: 0 for state in (FOUND, MISSING, DEAD)}
+        for byte in self.bits:
+            if byte:
+                for slot in range(4):
+                    state = (byte >> (slot * 2)) & 3
+                    if state != UNKNOWN:
+                        counts[STATE_NAMES[state]] += 1
+        return counts
+
+    def save(self):
+        """
+        Write the bitmap to disk
+        """
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(self.MAGIC)
+            f.write(self.bits)
+        os.replace(tmp_path, self.path)
+
+
+class IdDiscovery:
+    def __init__(self, bitmap_path=ID_BITMAP_PATH, workers=8, requests_per_second=4.0, beyond=200):
+        """
+        Probe the detail.html?id=N range to find every item ID the site serves
+
+        Only IDs that were never probed (or whose last probe failed) are
+        requested, so repeated scans cost a handful of requests. The scan
+        keeps going until `beyond` IDs past the highest found ID came back
+        missing.
+
+        Every probe is a GET: the site answers unknown IDs with an empty
+        detail template and status 200, so only the page title tells a real
+        item from a missing one (a HEAD probe would count every ID as found).
+
+        Args:
+            bitmap_path: File that keeps the per-ID state between runs
+            workers: Number of probes in flight
+            requests_per_second: Global ceiling on request starts per second
+            beyond: How many IDs past the highest found ID to probe
+        """
+        self.bitmap = IdBitmap(bitmap_path)
+        self.workers = workers
+        self.requests_per_second = requests_per_second
+        self.beyond = beyond
+        self.client = get_client()
+        self.archive = PageArchive()
+        self.item_paths = [
+            os.path.join("scraped_data", "json", "all_items.json"),
+            os.path.join("scraped_data", "json", "merge_items.json"),
+        ]
+        self.names = {}
+
+    def listed_ids(self):
+        """
+        Return the item IDs exposed by the category listings (all_items.json / merge_items.json)
+        """
+        listed = set()
+        for path in self.item_paths:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    items = json.load(f)
+            except Exception as e:
+                logger.warning(f"Could not read {path}: {e}")
+                continue
+            listed.update(int(item['item_id']) for item in items if str(item.get('item_id', '')).isdigit())
+        return listed
+
+    def probe(self, item_id):
+        """
+        Request one detail page
+
+        Returns:
+            (item_id, FOUND / MISSING or None if the probe failed, item name or None)
+        """
+        url = ITEM_URL.format(item_id)
+        try:
+            # The bitmap decides what to probe again, so a cached empty page must not answer a recheck
+            response = self.client.get(url, use_cache=False)
+        except Exception as e:
+            logger.warning(f"Probe for ID {item_id} failed: {e}")
+            return item_id, None, None
+
+        if response.status_code in (404, 410):
+            return item_id, MISSING, None
+        if response.status_code != 200:
+            logger.warning(f"Probe for ID {item_id} returned HTTP {response.status_code}")
+            return item_id, None, None
+        # Unknown IDs are served as an empty detail template (or a redirect), so look for a title
+        match = DB_TITLE_RE.search(response.text)
+        if not match or not match.group(1):
+            return item_id, MISSING, None
+        item_name = html.unescape(match.group(1))
+        self.archive.put(item_id, response.text, item_name, url)
+        return item_id, FOUND, item_name
+
+    def record(self, item_id, state, item_name, listed):
+        """
+        Store a probe result; a listed or previously found ID that is now missing is dead
+        """
+        if state is None:
+            return
+        previous = self.bitmap.get(item_id)
+        if state == MISSING and (item_id in listed or previous in (FOUND, DEAD)):
+            state = DEAD
+        self.bitmap.set(item_id, state)
+        if item_name:
+            self.names[item_id] = item_name
+
+    def scan(self, start=1, end=None, recheck=()):
+        """
+        Probe unknown IDs (and IDs in the recheck states) from start up to end
+
+        Without an explicit end the range grows while new IDs keep turning up.
+        """
+        listed = self.listed_ids()
+        auto_end = end is None
+        high = end if end is not None else max(max(listed, default=0), self.bitmap.max_id(FOUND)) + self.beyond
+        recheck = set(recheck)
+
+        self.client.ensure_pool_size(self.workers)
+
+        pending = [item_id for item_id in range(start, high + 1)
+                   if self.bitmap.get(item_id) == UNKNOWN or self.bitmap.get(item_id) in recheck]
+        probed = 0
+        logger.info(f"Probing {len(pending)} IDs between {start} and {high}")
+        with self.client.rate_limiter.capped(self.requests_per_second), ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while pending:
+                futures = [executor.submit(self.probe, item_id) for item_id in pending]
+                try:
+                    for future in as_completed(futures):
+                        self.record(*future.result(), listed)
+                        probed += 1
+                        if probed % 200 == 0:
+                            self.bitmap.save()
+                            logger.info(f"Probed {probed} IDs: {self.bitmap.counts()}")
+                except KeyboardInterrupt:
+                    logger.warning("Interrupted, saving the ID bitmap")
+                    for future in futures:
+                        future.cancel()
+                    self.bitmap.save()
+                    raise
+
+                new_high = self.bitmap.max_id(FOUND) + self.beyond
+                if not auto_end or new_high <= high:
+                    break
+                pending = [item_id for item_id in range(high + 1, new_high + 1) if self.bitmap.get(item_id) == UNKNOWN]
+                logger.info(f"Found IDs near the end of the range, extending the scan to {new_high}")
+                high = new_high
+
+        self.bitmap.save()
+        logger.info(f"Probed {probed} IDs: {self.bitmap.counts()}")
+        return self.report(listed)
+
+    def report(self, listed=None):
+        """
+        Return the state counts, the found IDs no listing exposes and the dead IDs
+        """
+        listed = self.listed_ids() if listed is None else listed
+        unlisted = [item_id for item_id in self.bitmap.ids(FOUND) if item_id not in listed]
+        never_probed = [item_id for item_id in sorted(listed) if self.bitmap.get(item_id) == UNKNOWN]
+        return {
+            'counts': self.bitmap.counts(),
+            'listed': len(listed),
+            'listed_not_probed': len(never_probed),
+            'unlisted': unlisted,
+            'dead': list(self.bitmap.ids(DEAD)),
+        }
+
+    def save_discovered(self, unlisted, output_path=DISCOVERED_ITEMS_PATH):
+        """
+        Write the unlisted IDs as item stubs (item_id, item_name, item_url)
+        """
+        items = []
+        for item_id in unlisted:
+            entry = self.archive.entry(item_id) or {}
+            items.append({
+                'item_id': str(item_id),
+                'item_name': self.names.get(item_id) or entry.get('item_name') or '',
+                'item_url': ITEM_URL.format(item_id),
+            })
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(items, f, ensure_ascii=False, indent=2)
+        logger.info(f"Saved {len(items)} unlisted items to {output_path}")
+        return items
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description='Discover item IDs by probing detail.html?id=N')
+    parser.add_argument('command', choices=['scan', 'status'])
+    parser.add_argument('--bitmap', default=ID_BITMAP_PATH, help='ID bitmap file')
+    parser.add_argument('--start', type=int, default=1, help='First ID to probe')
+    parser.add_argument('--end', type=int, help='Last ID to probe (default: keep going past the highest found ID)')
+    parser.add_argument('--beyond', type=int, default=200, help='IDs to probe past the highest found ID')
+    parser.add_argument('--workers', type=int, default=8, help='Number of probes in flight')
+    parser.add_argument('--rps', type=float, default=4.0, help='Maximum requests per second')
+    parser.add_argument('--recheck', nargs='+', choices=['found', 'missing', 'dead'], default=[], help='Probe IDs in these states again')
+    parser.add_argument('--output', default=DISCOVERED_ITEMS_PATH, help='Where to write the unlisted items')
+    args = parser.parse_args()
+
+    discovery = IdDiscovery(args.bitmap, args.workers, args.rps, args.beyond)
+    if args.command == 'scan':
+        states = {name: state for state, name in STATE_NAMES.items()}
+        report = discovery.scan(args.start, args.end, [states[name] for name in args.recheck])
+        discovery.save_discovered(report['unlisted'], args.output)
+    else:
+        report = discovery.report()
+
+    for state, count in report['counts'].items():
+        print(f"{state}: {count}")
+    print(f"listed by categories: {report['listed']} ({report['listed_not_probed']} not probed yet)")
+    print(f"found but not listed: {len(report['unlisted'])} {report['unlisted'][:50]}")
+    print(f"dead: {len(report['dead'])} {report['dead'][:50]}")
+
+
+if __name__ == "__main__":
+    main()
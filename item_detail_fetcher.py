@@ -1,12 +1,17 @@
-import requests
-from bs4 import BeautifulSoup
 import json
 import os
-import time
 import re
 from datetime import datetime
 import logging
 import unicodedata
+from http_client import BASE_URL, get_client
+from page_archive import PageArchive
+from failed_items import DeadLetterQueue
+from retry_policy import CircuitOpenError, wait_for_circuit
+from crawl_frontier import CrawlFrontier, PENDING, DONE, FAILED
+from change_feed import ChangeTracker, UNCHANGED
+from parser_backend import DEFAULT_PARSER, DETAIL_REGIONS, make_soup, parse_tree
+from xpath_extractors import DetailXPathExtractor
 
 # Configure logging
 logging.basicConfig(
@@ -19,16 +24,31 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+WHITESPACE_RE = re.compile(r'\s+')
+
 class ItemDetailFetcher:
-    def __init__(self, items_json_path):
+    def __init__(self, items_json_path, offline=False, parser=DEFAULT_PARSER, restrict=False):
         """
         Initialize the fetcher with the path to the items JSON file
+        
+        Args:
+            items_json_path: Path to the items JSON file
+            offline: Only parse pages; do not set up the HTTP client or page archive
+            parser: Parser backend, one of parser_backend.PARSER_BACKENDS
+            restrict: Only build the page regions the extractors read (BeautifulSoup backends)
         """
         self.items_json_path = items_json_path
-        self.base_url = "https://www.gametsg.net"
-        self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
+        self.base_url = BASE_URL
+        self.parser = parser
+        self.regions = DETAIL_REGIONS if restrict else None
+        self.xpath_extractor = DetailXPathExtractor(self) if parser == 'lxml-xpath' else None
+        self.changes = None
+        if not offline:
+            self.client = get_client()
+            self.archive = PageArchive()
+            self.dead_letters = DeadLetterQueue()
+            self.frontier = CrawlFrontier('item_detail_fetcher')
+            self.changes = ChangeTracker('item_detail_fetcher')
         
         # Create output directory if it doesn't exist
         self.output_dir = "scraped_items"
@@ -55,7 +75,7 @@ class ItemDetailFetcher:
         """
         if text is None:
             return ""
-        return re.sub(r'\s+', ' ', text).strip()
+        return WHITESPACE_RE.sub(' ', text).strip()
     
     def sanitize_filename(self, filename):
         """
@@ -321,14 +341,27 @@ class ItemDetailFetcher:
             logger.error(f"Error extracting monster drop info for {item_data.get('item_name', '')}: {str(e)}")
             return monster_drops
     
-    def fetch_item_details(self, item):
+    def crawlable(self, item):
+        """
+        Check whether an item has the URL and name needed to fetch and save its details
+        
+        The output file is named after item_name, so a nameless item is never fetched.
+        """
+        return bool(item.get('item_url') and item.get('item_name'))
+    
+    def fetch_item_details(self, item, skip_unchanged=False):
         """
         Fetch detailed information for a single item
+        
+        Args:
+            item: Item from the items JSON file
+            skip_unchanged: Return UNCHANGED instead of parsing when the page
+                fingerprint matches the one stored with the saved file
         """
         item_name = item.get('item_name', '')
         item_url = item.get('item_url', '')
         
-        if not item_url or not item_name:
+        if not self.crawlable(item):
             logger.warning(f"Skipping item with no name or URL: {item}")
             return None
         
@@ -337,112 +370,264 @@ class ItemDetailFetcher:
             logger.info(f"Skipping already processed item: {item_name}")
             return None
         
-        logger.info(f"Fetching details for item: {item_name} (URL: {item_url})")
+        html_content = self.fetch_item_html(item)
+        if not html_content:
+            return None
+        
+        if skip_unchanged and self.is_unchanged(item, html_content):
+            self.processed_items.add(item_url)
+            return UNCHANGED
         
         try:
-            response = requests.get(item_url, headers=self.headers)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Combine original item data with detailed information
-            detailed_item = item.copy()
-            
-            # Extract information sections
-            basic_info = self.extract_basic_info(soup, item)
-            detail_info = self.extract_detail_info(soup, item)
-            enhance_info = self.extract_enhance_info(soup, item)
-            craft_materials = self.extract_craft_materials(soup, item)
-            monster_drops = self.extract_monster_drops(soup, item)
-            
-            detailed_item['basic_info'] = basic_info
-            detailed_item['detail_info'] = detail_info
-            detailed_item['enhance_info'] = enhance_info
-            detailed_item['craft_materials'] = craft_materials
-            detailed_item['monster_drops'] = monster_drops
+            detailed_item = self.parse_item_details(html_content, item)
             
             # Mark as processed
             self.processed_items.add(item_url)
             
             return detailed_item
         
+        except Exception as e:
+            logger.error(f"Error parsing details for {item_name}: {str(e)}")
+            self.dead_letters.add('item_detail_fetcher', item, e)
+            return None
+    
+    def fetch_item_html(self, item):
+        """
+        Fetch an item's detail page and keep it in the page archive
+        """
+        item_name = item.get('item_name', '')
+        item_url = item.get('item_url', '')
+        
+        logger.info(f"Fetching details for item: {item_name} (URL: {item_url})")
+        
+        try:
+            # A change check must ask the site; a fresh cache entry would log a visit that saw nothing
+            response = self.client.get(item_url, revalidate=self.changes is not None)
+            response.raise_for_status()
+            
+            # Keep the raw page in the page archive
+            item_id = item.get('item_id', '')
+            if item_id:
+                self.archive.put(item_id, response.text, item_name, item_url)
+            
+            return response.text
+        
+        except CircuitOpenError:
+            # The host is down, not the item: the caller waits and retries it
+            raise
         except Exception as e:
             logger.error(f"Error fetching details for {item_name}: {str(e)}")
+            self.dead_letters.add('item_detail_fetcher', item, e)
             return None
     
+    def is_unchanged(self, item, html_content):
+        """
+        Check whether a fetched page has the same content fingerprint as when its file was saved
+        """
+        if not self.changes or not item.get('item_id'):
+            return False
+        unchanged = self.changes.check(item['item_id'], html_content)
+        return unchanged and os.path.exists(os.path.join(self.output_dir, self.output_filename(item)))
+    
+    def skip_unchanged(self, item):
+        """
+        Mark an unchanged item done without rewriting its file
+        """
+        self.changes.skip(item['item_id'])
+        self.frontier.complete(item['item_url'])
+        return item
+    
+    def parse_item_details(self, html_content, item):
+        """
+        Parse an item detail page into the detailed item record
+        """
+        # Combine original item data with detailed information
+        detailed_item = item.copy()
+        
+        # Extract information sections
+        if self.xpath_extractor:
+            tree = parse_tree(html_content)
+            extractor = self.xpath_extractor
+        else:
+            tree = make_soup(html_content, self.parser, self.regions)
+            extractor = self
+        basic_info = extractor.extract_basic_info(tree, item)
+        detail_info = extractor.extract_detail_info(tree, item)
+        enhance_info = extractor.extract_enhance_info(tree, item)
+        craft_materials = extractor.extract_craft_materials(tree, item)
+        monster_drops = extractor.extract_monster_drops(tree, item)
+        
+        detailed_item['basic_info'] = basic_info
+        detailed_item['detail_info'] = detail_info
+        detailed_item['enhance_info'] = enhance_info
+        detailed_item['craft_materials'] = craft_materials
+        detailed_item['monster_drops'] = monster_drops
+        
+        return detailed_item
+    
+    def output_filename(self, item_data):
+        """
+        Return the JSON filename used for an item in the output directory
+        """
+        item_name = item_data.get('item_name', 'unnamed_item')
+        safe_filename = self.sanitize_filename(item_name)
+        
+        # Add an ID to filename to ensure uniqueness
+        item_id = item_data.get('item_id', '')
+        if item_id:
+            return f"{safe_filename}_{item_id}.json"
+        return f"{safe_filename}.json"
+    
     def save_item_to_json(self, item_data):
         """
         Save a single item's data to a JSON file
         """
         try:
-            item_name = item_data.get('item_name', 'unnamed_item')
-            safe_filename = self.sanitize_filename(item_name)
+            filepath = os.path.join(self.output_dir, self.output_filename(item_data))
+            old_record = self.load_saved_item(filepath) if self.changes else None
             
-            # Add an ID to filename to ensure uniqueness
-            item_id = item_data.get('item_id', '')
-            if item_id:
-                filename = f"{safe_filename}_{item_id}.json"
-            else:
-                filename = f"{safe_filename}.json"
-                
-            filepath = os.path.join(self.output_dir, filename)
+            # A page that changed outside the parsed fields keeps its file
+            if old_record != item_data:
+                with open(filepath, 'w', encoding='utf-8') as f:
+                    json.dump(item_data, f, ensure_ascii=False, indent=2)
+                    
+                logger.info(f"Saved item data to {filepath}")
             
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(item_data, f, ensure_ascii=False, indent=2)
-                
-            logger.info(f"Saved item data to {filepath}")
+            if self.changes and item_data.get('item_id'):
+                self.changes.commit(item_data['item_id'], item_data, old_record)
             
             return filepath
         except Exception as e:
             logger.error(f"Error saving item data: {str(e)}")
             return None
     
-    def process_all_items(self, max_items=None, delay=1):
+    def load_saved_item(self, filepath):
         """
-        Process all items from the JSON file
+        Return the record previously saved at filepath, or None
+        """
+        if not os.path.exists(filepath):
+            return None
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"Could not read previous {filepath}: {str(e)}")
+            return None
+    
+    def replay_failed(self, entries):
+        """
+        Retry items from the failed-items list and save recovered ones
         
-        Args:
-            max_items: Maximum number of items to process (None for all)
-            delay: Delay between requests in seconds
+        Returns:
+            Number of items recovered
+        """
+        recovered = 0
+        for entry in entries:
+            try:
+                detailed_item = self.fetch_item_details(entry['item'])
+            except CircuitOpenError as e:
+                logger.error(f"{e}; stopping the replay, the remaining items stay in the failed list")
+                break
+            if detailed_item and self.save_item_to_json(detailed_item):
+                self.dead_letters.resolve('item_detail_fetcher', entry['item_url'])
+                recovered += 1
+        return recovered
+    
+    def seed_frontier(self):
+        """
+        Load the items JSON file into the crawl frontier
+        
+        On the first run, items that already have an output file are recorded as done.
         """
         items = self.load_items()
         if not items:
-            logger.error("No items found to process")
-            return
+            return False
         
         logger.info(f"Loaded {len(items)} items from {self.items_json_path}")
         
-        # Process items with URLs
+        # Process items with URLs; nameless ones can never be saved, so they stay out of the frontier
         items_with_url = [item for item in items if item.get('item_url')]
-        logger.info(f"Found {len(items_with_url)} items with URLs to process")
+        crawlable = [item for item in items_with_url if self.crawlable(item)]
+        logger.info(f"Found {len(crawlable)} items with URLs to process")
+        if len(crawlable) < len(items_with_url):
+            logger.warning(f"Skipping {len(items_with_url) - len(crawlable)} items with a URL but no item_name")
+        
+        done_ids = set()
+        if self.frontier.is_empty():
+            existing_files = set(os.listdir(self.output_dir))
+            done_ids = {item.get('item_id') for item in crawlable if self.output_filename(item) in existing_files}
+        self.frontier.seed(crawlable, done_ids)
+        # Frontiers seeded by earlier runs may still hold nameless items
+        crawlable_ids = {item.get('item_id') for item in crawlable}
+        self.frontier.remove({item.get('item_id') for item in items_with_url
+                              if item.get('item_id') and item.get('item_id') not in crawlable_ids})
+        removed = self.changes.remove_missing(item.get('item_id') for item in items_with_url if item.get('item_id'))
+        self.frontier.remove(removed)
+        
+        counts = self.frontier.counts()
+        logger.info(f"Crawl frontier: {counts.get(PENDING, 0)} pending, {counts.get(DONE, 0)} done, {counts.get(FAILED, 0)} failed")
+        return True
+    
+    def process_all_items(self, max_items=None, delay=None):
+        """
+        Process all items from the JSON file
         
-        if max_items:
-            items_with_url = items_with_url[:max_items]
-            logger.info(f"Limiting processing to {max_items} items")
+        Request pacing is handled by the shared client's adaptive rate limiter.
         
+        Args:
+            max_items: Maximum number of items to process (None for all)
+            delay: Minimum delay between requests in seconds (caps the adaptive rate)
+        """
         processed_count = 0
         success_count = 0
+        unchanged_count = 0
         
-        for item in items_with_url:
-            # Fetch detailed information
-            detailed_item = self.fetch_item_details(item)
-            
-            if detailed_item:
-                # Save to JSON file
-                if self.save_item_to_json(detailed_item):
-                    success_count += 1
+        with self.client.rate_limiter.capped(1.0 / delay if delay else None):
+            if not self.seed_frontier():
+                logger.error("No items found to process")
+                return
             
-            processed_count += 1
+            if max_items:
+                logger.info(f"Limiting processing to {max_items} items")
             
-            # Print progress
-            if processed_count % 10 == 0:
-                logger.info(f"Progress: {processed_count}/{len(items_with_url)} items processed")
-            
-            # Be nice to the server
-            time.sleep(delay)
+            try:
+                while not max_items or processed_count < max_items:
+                    batch_size = min(10, max_items - processed_count) if max_items else 10
+                    batch = self.frontier.lease(batch_size)
+                    if not batch:
+                        break
+                    
+                    for position, item in enumerate(batch):
+                        # Fetch detailed information
+                        try:
+                            detailed_item = self.fetch_item_details(item, skip_unchanged=True)
+                        except CircuitOpenError as e:
+                            # Hand the rest of the batch back without counting an attempt
+                            self.frontier.release(urls=[entry['item_url'] for entry in batch[position:]])
+                            wait_for_circuit(e)
+                            break
+                        
+                        # Save to JSON file; an unchanged page keeps its existing file
+                        if detailed_item == UNCHANGED:
+                            self.skip_unchanged(item)
+                            unchanged_count += 1
+                        elif detailed_item and self.save_item_to_json(detailed_item):
+                            self.frontier.complete(item['item_url'])
+                            success_count += 1
+                        else:
+                            self.frontier.fail(item['item_url'], "fetch or save failed")
+                        
+                        processed_count += 1
+                        
+                        # Print progress
+                        if processed_count % 10 == 0:
+                            logger.info(f"Progress: {processed_count} items processed")
+            except KeyboardInterrupt:
+                logger.warning("Interrupted, returning leased items to the frontier")
+                self.frontier.release()
         
         logger.info(f"Completed processing. Total items processed: {processed_count}")
-        logger.info(f"Successfully saved details for {success_count} items")
+        logger.info(f"Successfully saved details for {success_count} items ({unchanged_count} unchanged pages skipped)")
         logger.info(f"Item details saved to directory: {os.path.abspath(self.output_dir)}")
 
 # Entry point
@@ -458,7 +643,7 @@ if __name__ == "__main__":
     
     # Process items (optionally limit the number for testing)
     # Set max_items=None to process all items
-    fetcher.process_all_items(max_items=None, delay=1)
+    fetcher.process_all_items(max_items=None)
     
     end_time = datetime.now()
     logger.info(f"Fetching completed at {end_time}")
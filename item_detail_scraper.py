@@ -1,27 +1,35 @@
-import requests
-from bs4 import BeautifulSoup
 import pandas as pd
 import json
 import os
 import re
-import time
 from datetime import datetime
+from http_client import BASE_URL, get_client
+from parser_backend import DEFAULT_PARSER, make_soup
+from columnar_export import write_catalog
+from category_crawler import DEFAULT_CATEGORY_WORKERS, DEFAULT_CATEGORY_RPS, FailedPages, crawl_categories, crawl_pages, pagination_links
+
+WHITESPACE_RE = re.compile(r'\s+')
 
 class ItemDetailScraper:
-    def __init__(self, categories_json_path):
+    def __init__(self, categories_json_path, parser=DEFAULT_PARSER):
         """
         Initialize the scraper with the path to equipment categories JSON file
+        
+        Args:
+            categories_json_path: Path to the equipment categories JSON file
+            parser: Parser backend, one of parser_backend.PARSER_BACKENDS
         """
         self.categories_json_path = categories_json_path
-        self.base_url = "https://www.gametsg.net"
-        self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
+        self.parser = parser
+        self.base_url = BASE_URL
+        self.client = get_client()
+        self.failed_pages = FailedPages()
         
         # Create output directories if they don't exist
         self.output_dir = "scraped_data"
         self.json_dir = os.path.join(self.output_dir, "json")
         self.excel_dir = os.path.join(self.output_dir, "excel")
+        self.parquet_dir = os.path.join(self.output_dir, "parquet")
         
         for directory in [self.output_dir, self.json_dir, self.excel_dir]:
             if not os.path.exists(directory):
@@ -44,7 +52,7 @@ class ItemDetailScraper:
         """
         if text is None:
             return ""
-        return re.sub(r'\s+', ' ', text).strip()
+        return WHITESPACE_RE.sub(' ', text).strip()
     
     def extract_item_data(self, li_element):
         """
@@ -122,50 +130,62 @@ class ItemDetailScraper:
         except Exception as e:
             print(f"Error extracting item data: {str(e)}")
             return {}
-    def scrape_category_page(self, category):
+    def parse_category_page(self, category, page_url):
         """
-        Scrape items from a category page
+        Scrape the items on one page of a category list
+        
+        Returns:
+            (items, URLs of the other list pages linked from this page)
         """
-        category_id = category["type_id"]
         category_name = category["category_name"]
-        category_url = category["url"]
-        
-        print(f"\nScraping items for category: {category_name} (URL: {category_url})")
-        
         try:
-            response = requests.get(category_url, headers=self.headers)
+            response = self.client.get(page_url)
             response.raise_for_status()
+            self.failed_pages.resolve(page_url)
             
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = make_soup(response.text, self.parser)
+            links = pagination_links(soup, page_url)
             
             # Find the itemList div
             item_list_div = soup.find('div', class_='itemList')
             if not item_list_div:
-                print(f"No itemList div found for category: {category_name}")
-                return []
-            
-            # Find all li elements in the itemList div
-            li_elements = item_list_div.find_all('li')
-            if not li_elements:
-                print(f"No items found in category: {category_name}")
-                return []
+                print(f"No itemList div found for category: {category_name} ({page_url})")
+                return [], links
             
             items = []
-            for li in li_elements:
+            # Find all li elements in the itemList div
+            for li in item_list_div.find_all('li'):
                 item_data = self.extract_item_data(li)
                 if item_data:
                     # Add category information
-                    item_data["category_id"] = category_id
+                    item_data["category_id"] = category["type_id"]
                     item_data["category_name"] = category_name
                     items.append(item_data)
-                    print(f"  - Scraped item: {item_data['item_name']}")
-            
-            print(f"  Total items scraped: {len(items)}")
-            return items
+            return items, links
             
         except Exception as e:
-            print(f"Error scraping category {category_name}: {str(e)}")
-            return []
+            print(f"Error scraping category {category_name} ({page_url}): {str(e)}")
+            self.failed_pages.add(category, page_url, e)
+            return [], []
+    
+    def scrape_category_page(self, category):
+        """
+        Scrape items from a category, following its pager
+        """
+        category_name = category["category_name"]
+        category_url = category["url"]
+        
+        print(f"Scraping items for category: {category_name} (URL: {category_url})")
+        items = crawl_pages(
+            category_url,
+            lambda page_url: self.parse_category_page(category, page_url),
+            lambda item: item.get("item_id") or item.get("item_url")
+        )
+        if not items:
+            print(f"No items found in category: {category_name}")
+        else:
+            print(f"  {category_name}: {len(items)} items")
+        return items
     
     def sanitize_filename(self, filename):
         """
@@ -247,9 +267,36 @@ class ItemDetailScraper:
         df.to_excel(filepath, index=False, engine='openpyxl')
         print(f"Saved {len(data)} records to {filepath}")
     
-    def scrape_all_categories(self):
+    def save_to_parquet(self, data, filename):
+        """
+        Save data to a Parquet file with list columns and dictionary-encoded categories
+        """
+        filepath = os.path.join(self.parquet_dir, self.sanitize_filename(filename))
+        try:
+            if write_catalog(data, filepath) is not None:
+                print(f"Saved {len(data)} records to {filepath}")
+        except Exception as e:
+            print(f"Error saving {filepath}: {e}")
+    
+    def save_category(self, category, items):
+        """
+        Save one category's items to its JSON and Excel files
+        """
+        category_name = self.sanitize_filename(category['category_name'])
+        category_filename = f"items_{category['type_id']}_{category_name}"
+        self.save_to_json(items, f"{category_filename}.json")
+        self.save_to_excel(items, f"{category_filename}.xlsx")
+    
+    def scrape_all_categories(self, workers=DEFAULT_CATEGORY_WORKERS, requests_per_second=DEFAULT_CATEGORY_RPS):
         """
         Scrape items from all categories
+        
+        Categories are fetched concurrently under a shared rate limit and
+        each category's files are written on a background thread.
+        
+        Args:
+            workers: Number of categories fetched at once
+            requests_per_second: Global ceiling on request starts per second
         """
         categories = self.load_categories()
         if not categories:
@@ -257,29 +304,62 @@ class ItemDetailScraper:
             return
         
         print(f"Loaded {len(categories)} categories from {self.categories_json_path}")
-        all_items = []
+        results = crawl_categories(self.client, categories, self.scrape_category_page, self.save_category,
+                                   workers, requests_per_second)
         
-        for category in categories:
-            items = self.scrape_category_page(category)
-            if items:
-                # Save category items to separate files
-                category_name = self.sanitize_filename(category['category_name'])
-                category_filename = f"items_{category['type_id']}_{category_name}"
-                self.save_to_json(items, f"{category_filename}.json")
-                self.save_to_excel(items, f"{category_filename}.xlsx")
-                
-                # Add to all items list
-                all_items.extend(items)
-            
-            # Be nice to the server
-            time.sleep(1)
-          # Save all items to combined files
+        # Combined files keep the category order
+        all_items = [item for items in results for item in items]
         if all_items:
             self.save_to_json(all_items, "all_items.json")
             self.save_to_excel(all_items, "all_items.xlsx")
+            self.save_to_parquet(all_items, "all_items.parquet")
         
         print(f"\nCompleted scraping. Total items collected: {len(all_items)}")
 
+    def replay_failed(self, entries):
+        """
+        Scrape the categories of failed list pages again
+        
+        A list page only makes sense as part of its category's pager, so the
+        whole category is crawled again. Its file is rewritten and its items
+        replace the old ones in all_items.json; pages fetched this time are
+        resolved by parse_category_page.
+        
+        Returns:
+            Number of failed pages recovered
+        """
+        categories = {str(category['type_id']): category for category in self.load_categories()}
+        all_items_path = os.path.join(self.json_dir, "all_items.json")
+        try:
+            with open(all_items_path, 'r', encoding='utf-8') as f:
+                all_items = json.load(f)
+        except Exception as e:
+            print(f"Error loading {all_items_path}: {str(e)}")
+            all_items = None
+        
+        updated = False
+        for type_id in dict.fromkeys(str(entry['item_id']) for entry in entries):
+            category = categories.get(type_id)
+            if category is None:
+                print(f"Category {type_id} is not in {self.categories_json_path}, leaving its failed pages")
+                continue
+            items = self.scrape_category_page(category)
+            if not items:
+                continue
+            self.save_category(category, items)
+            if all_items is not None:
+                positions = [index for index, item in enumerate(all_items) if str(item.get('category_id')) == type_id]
+                start = positions[0] if positions else len(all_items)
+                all_items = [item for item in all_items if str(item.get('category_id')) != type_id]
+                all_items[start:start] = items
+                updated = True
+        
+        if updated:
+            self.save_to_json(all_items, "all_items.json")
+            self.save_to_excel(all_items, "all_items.xlsx")
+            self.save_to_parquet(all_items, "all_items.parquet")
+        return sum(1 for entry in entries if entry['item_url'] not in self.failed_pages.outstanding)
+
 # Entry point
 if __name__ == "__main__":
     start_time = datetime.now()
@@ -0,0 +1,166 @@
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+class JsonlSink:
+    def __init__(self, path):
+        """
+        Append-only JSON Lines file for pipeline output
+
+        Each record is written once as a single line and flushed, so a crash
+        loses at most the record being written. compact() turns the lines into
+        the usual pretty-printed JSON array; when a key is written more than
+        once, the last record wins and keeps the position of the first.
+
+        Args:
+            path: Path of the .jsonl file
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = None
+
+    def append(self, record):
+        """
+        Write one record and flush it to disk
+        """
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self.lock:
+            if self.file is None:
+                self.drop_partial_line()
+                self.file = open(self.path, 'a', encoding='utf-8')
+            self.file.write(line)
+            self.file.flush()
+
+    def drop_partial_line(self):
+        """
+        Truncate a partial last line left by an interrupted write
+        """
+        if not self.exists():
+            return
+        with open(self.path, 'rb+') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            end = size
+            while end > 0:
+                start = max(0, end - 65536)
+                f.seek(start)
+                newline = f.read(end - start).rfind(b"\n")
+                if newline != -1:
+                    end = start + newline + 1
+                    break
+                end = start
+            if end != size:
+                logger.warning(f"Dropping {size - end} bytes of partial line at the end of {self.path}")
+                f.truncate(end)
+
+    def close(self):
+        """
+        Close the file handle used for appending
+        """
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+    def exists(self):
+        """
+        Check whether the sink file has been created
+        """
+        return os.path.exists(self.path)
+
+    def iter_lines(self):
+        """
+        Yield (byte offset, record) for every complete line in the file
+        """
+        if not self.exists():
+            return
+        with open(self.path, 'rb') as f:
+            offset = 0
+            for raw in f:
+                line_offset = offset
+                offset += len(raw)
+                if not raw.endswith(b"\n"):
+                    # Partial line from an interrupted write
+                    break
+                try:
+                    yield line_offset, json.loads(raw)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping corrupt line at byte {line_offset} in {self.path}")
+
+    def __iter__(self):
+        for _, record in self.iter_lines():
+            yield record
+
+    def keys(self, key='item_id'):
+        """
+        Return the set of key values present in the file
+        """
+        return {record.get(key) for record in self if key in record}
+
+    def offsets(self, key='item_id'):
+        """
+        Return {key value: byte offset of its latest line}, in first-seen key order
+        """
+        latest = {}
+        for offset, record in self.iter_lines():
+            # Re-assigning keeps the key's first position in the dict
+            latest[record.get(key, offset)] = offset
+        return latest
+
+    def read_at(self, offset):
+        """
+        Return the record on the line starting at a byte offset
+        """
+        with self.lock:
+            if self.file is not None:
+                self.file.flush()
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def rewrite(self, records):
+        """
+        Replace the file with the given records
+        """
+        self.close()
+        tmp_path = f"{self.path}.tmp"
+        count = 0
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                count += 1
+        os.replace(tmp_path, self.path)
+        return count
+
+    def compact(self, output_path, key='item_id'):
+        """
+        Write the latest record per key as a JSON array (indent=2) to output_path
+
+        Only the byte offset of each key's latest line is kept in memory; the
+        records themselves are streamed from the file.
+
+        Returns:
+            Number of records written
+        """
+        with self.lock:
+            if self.file is not None:
+                self.file.flush()
+
+        latest = self.offsets(key)
+        order = list(latest)
+
+        tmp_path = f"{output_path}.tmp"
+        with open(self.path, 'rb') as source, open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write("[" if order else "[]")
+            for index, record_key in enumerate(order):
+                source.seek(latest[record_key])
+                record = json.loads(source.readline())
+                text = json.dumps(record, ensure_ascii=False, indent=2)
+                f.write(("\n" if index == 0 else ",\n") + "\n".join("  " + line for line in text.split("\n")))
+            if order:
+                f.write("\n]")
+        os.replace(tmp_path, output_path)
+        return len(order)
@@ -1,15 +1,14 @@
-import requests
-from bs4 import BeautifulSoup
 import pandas as pd
 import time
 import os
+from http_client import BASE_URL, get_client
+from parser_backend import DEFAULT_PARSER, make_soup
 
 class LineageMScraper:
-    def __init__(self):
-        self.base_url = "https://www.gametsg.net"
-        self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
+    def __init__(self, parser=DEFAULT_PARSER):
+        self.base_url = BASE_URL
+        self.parser = parser
+        self.client = get_client()
         self.item_list = []
 
     def get_equipment_categories(self):
@@ -18,10 +17,10 @@ class LineageMScraper:
         """
         try:
             url = f"{self.base_url}/equip.html"
-            response = requests.get(url, headers=self.headers)
+            response = self.client.get(url)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = make_soup(response.text, self.parser)
             
             # Find all links that contain "/equip?type_name="
             links = soup.find_all('a', href=lambda href: href and '/equip?type_name=' in href)
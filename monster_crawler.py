@@ -0,0 +1,333 @@
+import argparse
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from http_client import BASE_URL, get_client
+from page_archive import PageArchive, PAGE_ARCHIVE_DIR
+from failed_items import DeadLetterQueue
+from retry_policy import CircuitOpenError, wait_for_circuit
+from crawl_frontier import CrawlFrontier, PENDING, DONE, FAILED
+from jsonl_sink import JsonlSink
+from parser_backend import DEFAULT_PARSER, make_soup
+from dataset_store import refresh_monsters
+
+logger = logging.getLogger(__name__)
+
+MONSTER_URL = BASE_URL + "/monster/detail.html?id={}"
+MONSTERS_PATH = os.path.join("scraped_data", "json", "monsters.json")
+# Monster IDs overlap item IDs, so monster pages get their own archive
+MONSTER_ARCHIVE_DIR = os.path.join(PAGE_ARCHIVE_DIR, "monsters")
+ITEM_SOURCES = ["final.json", "scraped_items"]
+
+# Monster columns carried by the drop rows of item pages
+DROP_ROW_FIELDS = ['monster_type', 'monster_size', 'monster_size_class', 'monster_level', 'monster_weaknesses']
+
+def load_item_records(sources=ITEM_SOURCES):
+    """
+    Yield item records with monster_drops from JSON array files and folders of per-item JSON files
+    """
+    for source in sources:
+        if os.path.isdir(source):
+            paths = [os.path.join(source, name) for name in sorted(os.listdir(source)) if name.endswith('.json')]
+        elif os.path.exists(source):
+            paths = [source]
+        else:
+            logger.warning(f"Item source {source} not found")
+            continue
+        for path in paths:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except Exception as e:
+                logger.warning(f"Could not read {path}: {e}")
+                continue
+            for record in data if isinstance(data, list) else [data]:
+                if isinstance(record, dict) and record.get('monster_drops'):
+                    yield record
+
+def collect_monsters(records):
+    """
+    Merge the monster drop rows of all items into one entry per monster ID
+
+    Returns:
+        ({monster_id: monster}, number of item-monster pairs seen); each
+        monster carries the union of its areas and the items that drop it
+    """
+    monsters = {}
+    seen_items = set()
+    pairs = 0
+    for record in records:
+        item_id = str(record.get('item_id', ''))
+        if item_id in seen_items:
+            continue
+        seen_items.add(item_id)
+        for drop in record.get('monster_drops', []):
+            monster_id = str(drop.get('monster_id') or '')
+            if not monster_id:
+                continue
+            pairs += 1
+            monster = monsters.get(monster_id)
+            if monster is None:
+                monster = monsters[monster_id] = {
+                    'monster_id': monster_id,
+                    'monster_name': drop.get('monster_name', ''),
+                    'monster_url': MONSTER_URL.format(monster_id),
+                    **{field: drop.get(field) for field in DROP_ROW_FIELDS},
+                    'monster_areas': [],
+                    'drop_items': [],
+                }
+            for area in drop.get('monster_areas', []):
+                if area not in monster['monster_areas']:
+                    monster['monster_areas'].append(area)
+            monster['drop_items'].append({
+                'item_id': item_id,
+                'item_name': record.get('item_name', ''),
+                'item_url': record.get('item_url', ''),
+            })
+    return monsters, pairs
+
+def extract_labelled_values(soup, selector):
+    """
+    Return {label: value} for the <li><div class="ti">/<div class="con"> rows matched by selector
+
+    Values made of several parts (spans, <br> separated lines) are joined with ', '.
+    """
+    values = {}
+    for row in soup.select(selector):
+        label = row.select_one('div.ti')
+        value = row.select_one('div.con')
+        if label and value:
+            values[label.get_text(strip=True)] = ', '.join(value.stripped_strings)
+    return values
+
+def extract_drop_items(soup):
+    """
+    Return the items linked from the page content (the monster's drop list)
+    """
+    content = soup.select_one('div.container1') or soup
+    drops = []
+    seen = set()
+    for link in content.select('a[href*="/equip/detail.html?id="]'):
+        item_id = link['href'].split('id=')[-1].split('&')[0]
+        if not item_id or item_id in seen:
+            continue
+        seen.add(item_id)
+        drops.append({
+            'item_id': item_id,
+            'item_name': link.get('title') or link.get_text(strip=True),
+            'item_url': f"{BASE_URL}{link['href']}" if link['href'].startswith('/') else link['href'],
+        })
+    return drops
+
+def parse_monster_html(html_content, monster, parser=DEFAULT_PARSER):
+    """
+    Parse a monster detail page and merge it with the monster's drop row data
+
+    The page's drop list is merged with the items known to drop the
+    monster, so drop_items covers both.
+    """
+    soup = make_soup(html_content, parser)
+    record = dict(monster)
+
+    title = soup.select_one('h2.dbTitle')
+    if title and title.get_text(strip=True):
+        record['monster_name'] = title.get_text(strip=True)
+    image = soup.select_one('div.itemTit div.thumb img')
+    record['monster_image'] = f"{BASE_URL}{image['src']}" if image and image.get('src', '').startswith('/') else (image.get('src', '') if image else '')
+    record['basic_info'] = extract_labelled_values(soup, 'ul.basicList li')
+    record['detail_info'] = extract_labelled_values(soup, 'ul.xjList li')
+
+    drop_items = extract_drop_items(soup)
+    page_ids = {drop['item_id'] for drop in drop_items}
+    drop_items.extend(drop for drop in monster.get('drop_items', []) if drop['item_id'] not in page_ids)
+    record['drop_items'] = drop_items
+    return record
+
+
+class MonsterCrawler:
+    def __init__(self, item_sources=ITEM_SOURCES, output_path=MONSTERS_PATH, workers=8, requests_per_second=4.0, parser=DEFAULT_PARSER):
+        """
+        Fetch every distinct monster detail page once and build the monster table
+
+        Monster IDs are collected from the monster_drops of all item records,
+        so the number of requests follows the number of distinct monsters,
+        not the number of item-monster pairs. Progress is kept in the crawl
+        frontier (stage 'monster_crawler'), pages go through the shared HTTP
+        cache, and records are appended to monsters.jsonl as they are parsed
+        and compacted into monsters.json.
+
+        Args:
+            item_sources: JSON array files and folders of per-item JSON files to read monster IDs from
+            output_path: Monster table (JSON array)
+            workers: Number of pages fetched at once
+            requests_per_second: Global ceiling on request starts per second
+            parser: Parser backend for BeautifulSoup
+        """
+        self.item_sources = item_sources
+        self.output_path = output_path
+        self.sink = JsonlSink(f"{os.path.splitext(output_path)[0]}.jsonl")
+        self.workers = workers
+        self.requests_per_second = requests_per_second
+        self.parser = parser
+        self.client = get_client()
+        self.archive = PageArchive(MONSTER_ARCHIVE_DIR)
+        self.dead_letters = DeadLetterQueue()
+        self.frontier = CrawlFrontier('monster_crawler')
+        self.monsters = {}
+
+    def seed_frontier(self):
+        """
+        Collect the distinct monsters from the item records and add them to the frontier
+
+        On the first run, monsters already in the output are recorded as done.
+        """
+        self.monsters, pairs = collect_monsters(load_item_records(self.item_sources))
+        if not self.monsters:
+            return False
+        logger.info(f"Found {len(self.monsters)} distinct monsters in {pairs} item drop rows")
+
+        if not self.sink.exists() and os.path.exists(self.output_path):
+            with open(self.output_path, 'r', encoding='utf-8') as f:
+                self.sink.rewrite(json.load(f))
+        done_ids = self.sink.keys('monster_id') if self.frontier.is_empty() else set()
+        self.frontier.seed([self.frontier_item(monster) for monster in self.monsters.values()], done_ids)
+
+        counts = self.frontier.counts()
+        logger.info(f"Crawl frontier: {counts.get(PENDING, 0)} pending, {counts.get(DONE, 0)} done, {counts.get(FAILED, 0)} failed")
+        return True
+
+    def frontier_item(self, monster):
+        """
+        Return the item-shaped dict the frontier and the failed-items list expect
+        """
+        return {'item_id': monster['monster_id'], 'item_name': monster['monster_name'], 'item_url': monster['monster_url']}
+
+    def fetch_monster(self, item):
+        """
+        Fetch and parse one monster page
+
+        Returns:
+            (frontier item, monster record or None)
+        """
+        monster = self.monsters.get(item['item_id']) or {
+            'monster_id': item['item_id'], 'monster_name': item.get('item_name', ''), 'monster_url': item['item_url']
+        }
+        try:
+            response = self.client.get(item['item_url'])
+            response.raise_for_status()
+            self.archive.put(item['item_id'], response.text, item.get('item_name'), item['item_url'])
+            return item, parse_monster_html(response.text, monster, self.parser)
+        except CircuitOpenError:
+            # The host is down, not the monster: the caller waits and retries it
+            raise
+        except Exception as e:
+            logger.error(f"Error fetching monster {item.get('item_name', '')} ({item['item_url']}): {e}")
+            self.dead_letters.add('monster_crawler', item, e)
+            return item, None
+
+    def run(self):
+        """
+        Fetch the pending monsters concurrently and compact the monster table
+        """
+        if not self.seed_frontier():
+            logger.error("No monster drops found in the item records. Exiting.")
+            return
+
+        self.client.ensure_pool_size(self.workers)
+        written = 0
+        try:
+            with self.client.rate_limiter.capped(self.requests_per_second), ThreadPoolExecutor(max_workers=self.workers) as executor:
+                while True:
+                    batch = self.frontier.lease(self.workers * 4)
+                    if not batch:
+                        break
+                    futures = {executor.submit(self.fetch_monster, item): item for item in batch}
+                    circuit_error = None
+                    for future in as_completed(futures):
+                        try:
+                            item, record = future.result()
+                        except CircuitOpenError as e:
+                            # Not a failed attempt: return the monster and wait once the batch settles
+                            self.frontier.release(urls=[futures[future]['item_url']])
+                            circuit_error = e
+                            continue
+                        if record:
+                            self.sink.append(record)
+                            self.frontier.complete(item['item_url'])
+                            written += 1
+                        else:
+                            self.frontier.fail(item['item_url'], "fetch or parse failed")
+                    logger.info(f"Progress: {written} monsters saved")
+                    if circuit_error:
+                        wait_for_circuit(circuit_error)
+        except KeyboardInterrupt:
+            logger.warning("Interrupted, returning leased monsters to the frontier")
+            self.frontier.release()
+        finally:
+            self.save_monsters()
+
+        logger.info(f"Completed: {written} monster pages fetched for {len(self.monsters)} distinct monsters")
+
+    def save_monsters(self):
+        """
+        Compact monsters.jsonl into the monster table
+        """
+        if not self.sink.exists():
+            return
+        count = self.sink.compact(self.output_path, key='monster_id')
+        logger.info(f"Saved {count} monsters to {self.output_path}")
+        try:
+            refresh_monsters(self.output_path)
+        except Exception as e:
+            logger.error(f"Error updating the dataset store: {e}")
+
+    def replay_failed(self, entries):
+        """
+        Retry monsters from the failed-items list
+
+        Returns:
+            Number of monsters recovered
+        """
+        self.monsters, _ = collect_monsters(load_item_records(self.item_sources))
+        recovered = 0
+        for entry in entries:
+            try:
+                item, record = self.fetch_monster(entry['item'])
+            except CircuitOpenError as e:
+                logger.error(f"{e}; stopping the replay, the remaining monsters stay in the failed list")
+                break
+            if record:
+                self.sink.append(record)
+                self.frontier.complete(item['item_url'])
+                self.dead_letters.resolve('monster_crawler', entry['item_url'])
+                recovered += 1
+        self.save_monsters()
+        return recovered
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description='Fetch each distinct monster page once and build the monster table')
+    parser.add_argument('--items', nargs='+', default=ITEM_SOURCES, help='Item JSON files or folders to read monster IDs from')
+    parser.add_argument('--output', default=MONSTERS_PATH, help='Monster table (JSON)')
+    parser.add_argument('--workers', type=int, default=8, help='Number of pages fetched at once')
+    parser.add_argument('--rps', type=float, default=4.0, help='Maximum requests per second')
+    parser.add_argument('--dry-run', action='store_true', help='Only count the distinct monsters and drop rows')
+    args = parser.parse_args()
+
+    if args.dry_run:
+        monsters, pairs = collect_monsters(load_item_records(args.items))
+        print(f"{len(monsters)} distinct monsters in {pairs} item drop rows")
+        return
+
+    MonsterCrawler(args.items, args.output, args.workers, args.rps).run()
+
+
+if __name__ == "__main__":
+    main()
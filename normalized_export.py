@@ -0,0 +1,300 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+from change_feed import diff_records
+
+logger = logging.getLogger(__name__)
+
+NORMALIZED_DIR = os.path.join("scraped_data", "normalized")
+TABLES = ['items', 'monsters', 'areas', 'drops', 'enhance_tables', 'class_sets']
+
+# Fields of a monster_drops row that belong to the monster itself
+MONSTER_FIELDS = ['monster_name', 'monster_url', 'monster_type', 'monster_size', 'monster_size_class', 'monster_level', 'monster_weaknesses']
+
+# Item fields whose values repeat across many items: {field: (table, reference field)}.
+# enhance_info is over a third of final.json but has fewer than 200 distinct tables.
+SHARED_FIELDS = {
+    'enhance_info': ('enhance_tables', 'enhance_id'),
+    'item_classes': ('class_sets', 'class_set_id'),
+}
+
+def normalize(records):
+    """
+    Split nested item records into items, monsters, areas and drop link tables
+
+    Each monster and each area is stored once. A drop link is one
+    (item_id, monster_id) row in the item's drop order; if a drop row
+    disagrees with the monster's first-seen data, the differing fields are
+    kept on the link, so NormalizedData gives back the input exactly.
+    Enhancement tables and class lists (SHARED_FIELDS) are stored once
+    each and referenced from the item by ID.
+
+    Returns:
+        Dict of {table name: list of rows}
+    """
+    items = []
+    monsters = {}
+    areas = {}
+    drops = []
+    shared = {table: {} for table, _ in SHARED_FIELDS.values()}
+    for record in records:
+        item = {}
+        for field, value in record.items():
+            if field in SHARED_FIELDS:
+                table, reference = SHARED_FIELDS[field]
+                values = shared[table]
+                key = json.dumps(value, ensure_ascii=False)
+                if key not in values:
+                    values[key] = (len(values) + 1, value)
+                item[reference] = values[key][0]
+            else:
+                item[field] = value
+        monster_drops = item.pop('monster_drops', None)
+        if not monster_drops:
+            # Keep an empty list as it was
+            if monster_drops is not None:
+                item['monster_drops'] = monster_drops
+            items.append(item)
+            continue
+        items.append(item)
+        for drop in monster_drops:
+            area_ids = []
+            for area in drop.get('monster_areas', []):
+                if area not in areas:
+                    areas[area] = len(areas) + 1
+                area_ids.append(areas[area])
+            monster_id = drop.get('monster_id', '')
+            monster = monsters.get(monster_id)
+            if monster is None:
+                monster = monsters[monster_id] = {
+                    'monster_id': monster_id,
+                    **{field: drop[field] for field in MONSTER_FIELDS if field in drop},
+                    'area_ids': area_ids,
+                }
+            link = {'item_id': item.get('item_id'), 'monster_id': monster_id}
+            overrides = {field: value for field, value in drop.items()
+                         if field not in ('monster_id', 'monster_areas') and (field not in monster or monster[field] != value)}
+            missing = [field for field in MONSTER_FIELDS if field in monster and field not in drop]
+            if overrides:
+                link['fields'] = overrides
+            if missing:
+                link['missing'] = missing
+            if 'monster_areas' not in drop:
+                link['area_ids'] = None
+            elif area_ids != monster['area_ids']:
+                link['area_ids'] = area_ids
+            drops.append(link)
+    return {
+        'items': items,
+        'monsters': list(monsters.values()),
+        'areas': [{'area_id': area_id, 'area_name': name} for name, area_id in areas.items()],
+        'drops': drops,
+        **{table: [{'id': value_id, 'value': value} for value_id, value in values.values()]
+           for table, values in shared.items()},
+    }
+
+
+class NormalizedData:
+    def __init__(self, tables):
+        """
+        Normalized item tables with on-demand nesting
+
+        Only the flat tables are kept in memory; item() and items() rebuild
+        the nested final.json view for the records a caller asks for.
+        Shared values (enhancement tables, class lists) are the same objects
+        in every rebuilt record, so copy them before changing them.
+
+        Args:
+            tables: Dict of {table name: list of rows}, as returned by normalize()
+        """
+        self.item_rows = tables['items']
+        self.shared = {table: {row['id']: row['value'] for row in tables[table]} for table, _ in SHARED_FIELDS.values()}
+        self.references = {reference: (field, table) for field, (table, reference) in SHARED_FIELDS.items()}
+        self.monsters = {monster['monster_id']: monster for monster in tables['monsters']}
+        self.areas = {area['area_id']: area['area_name'] for area in tables['areas']}
+        self.item_index = {}
+        for index, item in enumerate(self.item_rows):
+            self.item_index.setdefault(item.get('item_id'), index)
+        self.drops_by_item = {}
+        self.drops_by_monster = {}
+        for link in tables['drops']:
+            self.drops_by_item.setdefault(link['item_id'], []).append(link)
+            self.drops_by_monster.setdefault(link['monster_id'], []).append(link['item_id'])
+
+    @classmethod
+    def load(cls, directory=NORMALIZED_DIR):
+        """
+        Load the tables written by export()
+        """
+        tables = {}
+        for table in TABLES:
+            with open(os.path.join(directory, f"{table}.json"), 'r', encoding='utf-8') as f:
+                tables[table] = json.load(f)
+        return cls(tables)
+
+    def monster_drop(self, link):
+        """
+        Rebuild one monster_drops row from a drop link
+        """
+        monster = self.monsters.get(link['monster_id'], {'monster_id': link['monster_id']})
+        missing = set(link.get('missing', ()))
+        drop = {field: monster[field] for field in MONSTER_FIELDS[:2] if field in monster and field not in missing}
+        drop['monster_id'] = link['monster_id']
+        drop.update({field: monster[field] for field in MONSTER_FIELDS[2:] if field in monster and field not in missing})
+        drop.update(link.get('fields', {}))
+        area_ids = link.get('area_ids', monster.get('area_ids', []))
+        if area_ids is not None:
+            drop['monster_areas'] = [self.areas[area_id] for area_id in area_ids]
+        return drop
+
+    def nest(self, item):
+        """
+        Return an item row with its shared values and monster_drops filled in
+        """
+        nested = {}
+        for field, value in item.items():
+            if field in self.references:
+                field, table = self.references[field]
+                value = self.shared[table][value]
+            nested[field] = value
+        links = self.drops_by_item.get(item.get('item_id'))
+        if links:
+            nested['monster_drops'] = [self.monster_drop(link) for link in links]
+        return nested
+
+    def item(self, item_id):
+        """
+        Return the nested record of one item, or None
+        """
+        index = self.item_index.get(item_id)
+        return self.nest(self.item_rows[index]) if index is not None else None
+
+    def items(self):
+        """
+        Yield every nested item record in the original order
+        """
+        for item in self.item_rows:
+            yield self.nest(item)
+
+    def items_dropped_by(self, monster_id):
+        """
+        Return the IDs of the items a monster drops
+        """
+        return list(self.drops_by_monster.get(monster_id, []))
+
+
+def export(input_path="final.json", output_dir=NORMALIZED_DIR):
+    """
+    Write the normalized tables of a nested item file, one compact JSON file per table
+
+    Returns:
+        Dict of {table name: row count}
+    """
+    with open(input_path, 'r', encoding='utf-8') as f:
+        tables = normalize(json.load(f))
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    for table, rows in tables.items():
+        path = os.path.join(output_dir, f"{table}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, path)
+    counts = {table: len(rows) for table, rows in tables.items()}
+    logger.info(f"Exported {input_path} to {output_dir}: {counts}")
+    return counts
+
+def verify(input_path="final.json", directory=NORMALIZED_DIR):
+    """
+    Compare the rebuilt nested view with the input file
+
+    Returns:
+        List of (item_id, field, expected, actual) for every difference
+    """
+    with open(input_path, 'r', encoding='utf-8') as f:
+        records = json.load(f)
+    rebuilt = list(NormalizedData.load(directory).items())
+    if len(rebuilt) != len(records):
+        return [(None, '<count>', len(records), len(rebuilt))]
+    return [(expected.get('item_id'), field, old, new)
+            for expected, actual in zip(records, rebuilt)
+            for field, old, new in diff_records(expected, actual)]
+
+def measure(load):
+    """
+    Return (seconds, traced MiB still allocated) for a load callable
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    data = load()
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del data
+    return elapsed, current / 1024 / 1024
+
+def compare(input_path="final.json", directory=NORMALIZED_DIR):
+    """
+    Return file size, load time and memory of the nested file and the normalized tables
+    """
+    def load_nested():
+        with open(input_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    nested_seconds, nested_mib = measure(load_nested)
+    normalized_seconds, normalized_mib = measure(lambda: NormalizedData.load(directory))
+    return {
+        'nested': {
+            'bytes': os.path.getsize(input_path),
+            'load_seconds': nested_seconds,
+            'memory_mib': nested_mib,
+        },
+        'normalized': {
+            'bytes': sum(os.path.getsize(os.path.join(directory, f"{table}.json")) for table in TABLES),
+            'load_seconds': normalized_seconds,
+            'memory_mib': normalized_mib,
+        },
+    }
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description='Export final.json as normalized item/monster/area/drop tables')
+    parser.add_argument('command', choices=['export', 'verify', 'nest', 'compare'])
+    parser.add_argument('--input', default='final.json', help='Nested item file')
+    parser.add_argument('--dir', default=NORMALIZED_DIR, help='Directory of the normalized tables')
+    parser.add_argument('--output', help='nest: write the rebuilt nested records to this file')
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        for table, count in export(args.input, args.dir).items():
+            print(f"{table}: {count}")
+    elif args.command == 'verify':
+        diffs = verify(args.input, args.dir)
+        for item_id, field, expected, actual in diffs[:20]:
+            print(f"{item_id} {field}: {json.dumps(expected, ensure_ascii=False)[:80]} != {json.dumps(actual, ensure_ascii=False)[:80]}")
+        print(f"{len(diffs)} differences")
+        if diffs:
+            sys.exit(1)
+    elif args.command == 'nest':
+        records = list(NormalizedData.load(args.dir).items())
+        with open(args.output or 'final_nested.json', 'w', encoding='utf-8') as f:
+            json.dump(records, f, ensure_ascii=False, indent=2)
+        print(f"Wrote {len(records)} records")
+    else:
+        report = compare(args.input, args.dir)
+        for name, stats in report.items():
+            print(f"{name:11} {stats['bytes'] / 1024:9.0f} KiB  load {stats['load_seconds'] * 1000:7.1f} ms  memory {stats['memory_mib']:6.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,371 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows: there the archive is safe for one process only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+PAGE_ARCHIVE_DIR = "page_archive"
+
+# Start a new shard file once the current one grows past this size
+SHARD_MAX_BYTES = 64 * 1024 * 1024
+
+class PageArchive:
+    def __init__(self, archive_dir=PAGE_ARCHIVE_DIR, shard_max_bytes=SHARD_MAX_BYTES):
+        """
+        Content-addressed, compressed, append-only store for raw item pages
+
+        Pages are zlib-compressed and appended to shard files. An append-only
+        index (index.jsonl) maps each item_id to the SHA-1 of the page and the
+        (shard, offset, length) of its compressed bytes; the last line for an
+        item_id wins. Identical pages are stored once.
+
+        Several instances (threads or processes) may write to the same
+        directory: appends happen under an fcntl lock on index.lock, and each
+        writer first reads the index lines the others added. Without fcntl
+        (Windows) only one process may write at a time.
+
+        Args:
+            archive_dir: Directory holding shard files and the index
+            shard_max_bytes: Size after which a new shard file is started
+        """
+        self.archive_dir = archive_dir
+        self.shard_max_bytes = shard_max_bytes
+        self.index_path = os.path.join(archive_dir, "index.jsonl")
+        self.lock_path = os.path.join(archive_dir, "index.lock")
+        self.lock = threading.Lock()
+
+        # item_id -> index entry, sha1 -> (shard, offset, length)
+        self.items = {}
+        self.blobs = {}
+        self.read_handles = {}
+        self.current_shard = 0
+        # Bytes of index.jsonl already loaded
+        self.index_offset = 0
+
+        os.makedirs(self.archive_dir, exist_ok=True)
+        self.load_index()
+
+    def shard_path(self, shard):
+        """
+        Return the file path of a shard number
+        """
+        return os.path.join(self.archive_dir, f"shard_{shard:05d}.dat")
+
+    def load_index(self):
+        """
+        Load the index into memory
+        """
+        self.load_index_tail()
+        logger.info(f"Loaded page archive index with {len(self.items)} items and {len(self.blobs)} unique pages")
+
+    def load_index_tail(self):
+        """
+        Load the complete index lines written since the last call (by this or another writer)
+        """
+        if not os.path.exists(self.index_path) or os.path.getsize(self.index_path) <= self.index_offset:
+            return
+        with open(self.index_path, 'rb') as f:
+            f.seek(self.index_offset)
+            data = f.read()
+        # A line still being written is picked up on the next call
+        data = data[:data.rfind(b"\n") + 1]
+        self.index_offset += len(data)
+        for line in data.decode('utf-8').splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # A torn last line after a crash; everything before it is valid
+                logger.warning(f"Skipping corrupt index line in {self.index_path}")
+                continue
+            self.items[entry['item_id']] = entry
+            self.blobs[entry['sha1']] = (entry['shard'], entry['offset'], entry['length'])
+            self.current_shard = max(self.current_shard, entry['shard'])
+
+    @contextmanager
+    def write_lock(self):
+        """
+        Hold the archive's cross-process write lock
+        """
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def put(self, item_id, html, item_name=None, item_url=None):
+        """
+        Store the raw page of an item and return its content hash
+
+        Args:
+            item_id: Item ID the page belongs to
+            html: Page content as str or bytes
+            item_name: Optional item name kept in the index for reference
+            item_url: Optional source URL kept in the index for reference
+        """
+        data = html.encode('utf-8') if isinstance(html, str) else html
+        sha1 = hashlib.sha1(data).hexdigest()
+        item_id = str(item_id)
+
+        with self.lock, self.write_lock():
+            self.load_index_tail()
+            current = self.items.get(item_id)
+            if current and current['sha1'] == sha1:
+                return sha1
+
+            if sha1 not in self.blobs:
+                compressed = zlib.compress(data, 6)
+                shard_path = self.shard_path(self.current_shard)
+                if os.path.exists(shard_path) and os.path.getsize(shard_path) + len(compressed) > self.shard_max_bytes:
+                    self.current_shard += 1
+                    shard_path = self.shard_path(self.current_shard)
+                with open(shard_path, 'ab') as f:
+                    offset = f.tell()
+                    f.write(compressed)
+                self.blobs[sha1] = (self.current_shard, offset, len(compressed))
+
+            shard, offset, length = self.blobs[sha1]
+            entry = {
+                'item_id': item_id,
+                'sha1': sha1,
+                'shard': shard,
+                'offset': offset,
+                'length': length,
+                'size': len(data),
+                'item_name': item_name or '',
+                'item_url': item_url or '',
+                'stored_at': time.time()
+            }
+            line = (json.dumps(entry, ensure_ascii=False) + "\n").encode('utf-8')
+            if os.path.exists(self.index_path) and os.path.getsize(self.index_path) > self.index_offset:
+                # End the torn line a crashed writer left behind instead of appending to it
+                line = b"\n" + line
+            with open(self.index_path, 'ab') as f:
+                f.write(line)
+                self.index_offset = f.tell()
+            self.items[item_id] = entry
+            return sha1
+
+    def read_blob(self, shard, offset, length):
+        """
+        Read and decompress one stored page
+        """
+        with self.lock:
+            handle = self.read_handles.get(shard)
+            if handle is None:
+                handle = open(self.shard_path(shard), 'rb')
+                self.read_handles[shard] = handle
+            handle.seek(offset)
+            compressed = handle.read(length)
+        return zlib.decompress(compressed)
+
+    def get(self, item_id):
+        """
+        Return the raw page bytes stored for an item, or None
+        """
+        entry = self.items.get(str(item_id))
+        if entry is None:
+            # It may have been stored by another writer since the index was loaded
+            with self.lock:
+                self.load_index_tail()
+            entry = self.items.get(str(item_id))
+            if entry is None:
+                return None
+        return self.read_blob(entry['shard'], entry['offset'], entry['length'])
+
+    def get_text(self, item_id):
+        """
+        Return the page stored for an item decoded as UTF-8, or None
+        """
+        data = self.get(item_id)
+        return data.decode('utf-8') if data is not None else None
+
+    def get_by_hash(self, sha1):
+        """
+        Return the raw page bytes stored under a content hash, or None
+        """
+        location = self.blobs.get(sha1)
+        if location is None:
+            return None
+        return self.read_blob(*location)
+
+    def __contains__(self, item_id):
+        return str(item_id) in self.items
+
+    def __len__(self):
+        return len(self.items)
+
+    def item_ids(self):
+        """
+        Return all archived item IDs
+        """
+        return list(self.items.keys())
+
+    def entry(self, item_id):
+        """
+        Return the index entry for an item, or None
+        """
+        return self.items.get(str(item_id))
+
+    def close(self):
+        """
+        Close open shard read handles
+        """
+        with self.lock:
+            for handle in self.read_handles.values():
+                handle.close()
+            self.read_handles = {}
+
+    def import_directory(self, source_dir, items):
+        """
+        Import loose <item_name>.html files (the old example/ folder)
+
+        Args:
+            source_dir: Directory with <item_name>.html files
+            items: List of item dicts (e.g. merge_items.json)
+        """
+        imported = 0
+        for item, path in match_example_pages(source_dir, items):
+            with open(path, 'rb') as f:
+                data = f.read()
+            self.put(item['item_id'], data, item.get('item_name'), item.get('item_url'))
+            imported += 1
+
+        logger.info(f"Imported {imported} pages from {source_dir}")
+        return imported
+
+    def stats(self):
+        """
+        Return size statistics for the archive
+        """
+        shard_bytes = 0
+        for shard in range(self.current_shard + 1):
+            path = self.shard_path(shard)
+            if os.path.exists(path):
+                shard_bytes += os.path.getsize(path)
+        raw_bytes = sum(entry['size'] for entry in self.items.values())
+        return {
+            'items': len(self.items),
+            'unique_pages': len(self.blobs),
+            'shards': self.current_shard + 1,
+            'raw_bytes': raw_bytes,
+            'stored_bytes': shard_bytes
+        }
+
+
+def match_example_pages(source_dir, items, shared=None):
+    """
+    Match loose <item_name>.html files to items and return (item, path) pairs
+
+    File names only carry the item name, so each file is matched back to
+    an item_id through the items list. When several items share a name,
+    the one whose item_image matches the page thumbnail is used, falling
+    back to the last one in list order (the one that overwrote the file).
+
+    Args:
+        source_dir: Directory with <item_name>.html files
+        items: List of item dicts (e.g. merge_items.json)
+        shared: Optional set that receives the item IDs matched to a file
+            several items share, whose page may belong to another of them
+    """
+    by_name = {}
+    for item in items:
+        item_name = item.get('item_name', '')
+        if not item_name or not item.get('item_id'):
+            continue
+        # Pages were saved either with invalid characters stripped or replaced by '_'
+        for safe_name in {re.sub(r'[\\/*?:"<>|]', '', item_name), re.sub(r'[\\/*?:"<>|]', '_', item_name)}:
+            by_name.setdefault(safe_name, []).append(item)
+
+    matches = []
+    unmatched = 0
+    for filename in sorted(os.listdir(source_dir)):
+        if not filename.endswith('.html'):
+            continue
+        candidates = by_name.get(filename[:-5])
+        if not candidates:
+            unmatched += 1
+            logger.warning(f"No item matches page {filename}")
+            continue
+        path = os.path.join(source_dir, filename)
+
+        item = candidates[-1]
+        if len(candidates) > 1:
+            if shared is not None:
+                shared.update(str(candidate['item_id']) for candidate in candidates)
+            with open(path, 'rb') as f:
+                thumb = re.search(rb'<div class="thumb">\s*<img src="([^"]+)"', f.read())
+            if thumb:
+                src = thumb.group(1).decode('utf-8', 'replace')
+                for candidate in candidates:
+                    if candidate.get('item_image', '').endswith(src):
+                        item = candidate
+                        break
+
+        matches.append((item, path))
+
+    if unmatched:
+        logger.warning(f"{unmatched} pages in {source_dir} did not match any item")
+    return matches
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description='Manage the compressed raw-page archive')
+    parser.add_argument('--archive', default=PAGE_ARCHIVE_DIR, help='Archive directory')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help='Import loose HTML files into the archive')
+    import_parser.add_argument('--source', default='example', help='Directory with <item_name>.html files')
+    import_parser.add_argument('--items', default=os.path.join('scraped_data', 'json', 'merge_items.json'), help='Items JSON used to map names to item IDs')
+
+    get_parser = subparsers.add_parser('get', help='Print the archived page of an item')
+    get_parser.add_argument('item_id')
+
+    subparsers.add_parser('stats', help='Show archive statistics')
+
+    args = parser.parse_args()
+    archive = PageArchive(args.archive)
+
+    if args.command == 'import':
+        with open(args.items, 'r', encoding='utf-8') as f:
+            items = json.load(f)
+        archive.import_directory(args.source, items)
+        print(json.dumps(archive.stats(), indent=2))
+    elif args.command == 'get':
+        text = archive.get_text(args.item_id)
+        if text is None:
+            print(f"Item {args.item_id} is not in the archive")
+        else:
+            print(text)
+    elif args.command == 'stats':
+        print(json.dumps(archive.stats(), indent=2))
+
+    archive.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+import argparse
+import json
+import logging
+import os
+import time
+import tracemalloc
+import warnings
+
+import lxml.html
+from bs4 import BeautifulSoup, SoupStrainer
+
+logger = logging.getLogger(__name__)
+
+# 'lxml-xpath' skips BeautifulSoup and runs the XPath extractors on an lxml.html tree;
+# code without XPath extractors uses BeautifulSoup with the lxml tree builder instead
+PARSER_BACKENDS = ('html.parser', 'lxml', 'lxml-xpath')
+DEFAULT_PARSER = 'html.parser'
+
+# Classes of the regions the item extractors read. An element with any of these
+# classes is kept with its whole subtree; navigation, scripts, sidebars and the
+# comment section are never built. div.tbody is listed on its own because the
+# detail fetcher reaches the monster table with find_next('div', class_='tbody')
+# from the h5.infoTit heading, so every div.tbody has to stay in document order.
+DETAIL_REGION_CLASSES = frozenset([
+    'dbTitle', 'itemTit', 'basicList', 'detailInfo', 'xjList', 'addList',
+    'craftInfo', 'monsterInfo', 'monsterList1', 'infoTit', 'tbody',
+])
+
+def in_detail_region(class_value):
+    """
+    SoupStrainer class rule: match if any class token is a region class
+
+    Newer bs4 releases pass the whole class attribute, so it is split here.
+    """
+    return bool(class_value) and not DETAIL_REGION_CLASSES.isdisjoint(class_value.split())
+
+DETAIL_REGIONS = SoupStrainer(class_=in_detail_region)
+
+def make_soup(html_content, parser=DEFAULT_PARSER, regions=None):
+    """
+    Build a BeautifulSoup tree with the tree builder for a parser backend
+
+    Args:
+        html_content: Page HTML
+        parser: Parser backend
+        regions: Optional SoupStrainer; only matching elements (and their subtrees) are built
+    """
+    return BeautifulSoup(html_content, 'html.parser' if parser == 'html.parser' else 'lxml', parse_only=regions)
+
+def parse_tree(html_content):
+    """
+    Build an lxml.html document tree
+    """
+    try:
+        return lxml.html.document_fromstring(html_content)
+    except ValueError:
+        # lxml refuses str input that carries an XML encoding declaration
+        return lxml.html.document_fromstring(html_content.encode('utf-8'))
+
+def has_class(name):
+    """
+    XPath predicate matching elements whose class attribute contains `name`
+    """
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+def classes(element):
+    """
+    Return the class list of an lxml element, as BeautifulSoup would
+    """
+    return element.get('class', '').split()
+
+def text_of(element):
+    """
+    Return the text content of an lxml element (BeautifulSoup's .text)
+    """
+    return element.xpath('string()')
+
+def joined_text(element, separator):
+    """
+    Join the text nodes of an lxml element (BeautifulSoup's get_text(separator))
+    """
+    return separator.join(element.xpath('.//text()'))
+
+def first(elements):
+    """
+    Return the first element of an XPath result, or None
+    """
+    return elements[0] if elements else None
+
+
+def load_example_pages(example_dir='example', limit=None):
+    """
+    Read the example/ corpus as (item, html) pairs, matched to merge_items.json
+    """
+    from page_archive import match_example_pages
+
+    with open(os.path.join("scraped_data", "json", "merge_items.json"), 'r', encoding='utf-8') as f:
+        items = json.load(f)
+    pages = []
+    for item, path in match_example_pages(example_dir, items)[:limit]:
+        with open(path, 'r', encoding='utf-8') as f:
+            pages.append((item, f.read()))
+    return pages
+
+def tree_memory(pages, parser, regions=None):
+    """
+    Return the mean and max peak memory (KiB) of building one page tree
+    """
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _, html_content in pages:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            tree = parse_tree(html_content) if parser == 'lxml-xpath' else make_soup(html_content, parser, regions)
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+            del tree
+    finally:
+        tracemalloc.stop()
+    if not peaks:
+        return None, None
+    return round(sum(peaks) / len(peaks) / 1024, 1), round(max(peaks) / 1024, 1)
+
+def compare_backends(example_dir='example', limit=None, memory_pages=200):
+    """
+    Parse the example/ corpus with every backend and compare against html.parser
+
+    BeautifulSoup backends are also run with restrict=True (region-restricted
+    parsing). Tree memory is measured with tracemalloc on the first
+    memory_pages pages; lxml allocates its tree outside the Python heap, so
+    the lxml-xpath figure only covers the Python-side objects.
+
+    Returns:
+        Dict of {output: {backend: {'pages_per_sec', 'diffs', 'diff_items', 'tree_kib', 'tree_kib_max'}}}
+    """
+    from fetch_and_parse_items import ItemFetcher
+    from item_detail_fetcher import ItemDetailFetcher
+
+    pages = load_example_pages(example_dir, limit)
+    logger.info(f"Comparing parser backends on {len(pages)} pages from {example_dir}/")
+
+    variants = [(parser, False) for parser in PARSER_BACKENDS]
+    variants += [(parser, True) for parser in PARSER_BACKENDS if parser != 'lxml-xpath']
+    memory = {}
+    for parser, restrict in variants:
+        memory[(parser, restrict)] = tree_memory(pages[:memory_pages], parser, DETAIL_REGIONS if restrict else None)
+
+    outputs = {
+        'final': lambda parser, restrict: ItemFetcher(offline=True, parser=parser, restrict=restrict).parse_item_html,
+        'items': lambda parser, restrict: ItemDetailFetcher(None, offline=True, parser=parser, restrict=restrict).parse_item_details,
+    }
+    report = {}
+    for output, make_parse in outputs.items():
+        reference = None
+        report[output] = {}
+        for parser, restrict in variants:
+            name = f"{parser}+restrict" if restrict else parser
+            parse = make_parse(parser, restrict)
+            start = time.perf_counter()
+            records = [parse(html_content, item) for item, html_content in pages]
+            elapsed = time.perf_counter() - start
+            if reference is None:
+                reference = records
+            diff_items = [item.get('item_id') for (item, _), record, expected in zip(pages, records, reference) if record != expected]
+            tree_kib, tree_kib_max = memory[(parser, restrict)]
+            report[output][name] = {
+                'pages_per_sec': round(len(pages) / elapsed, 1) if elapsed else None,
+                'diffs': len(diff_items),
+                'diff_items': diff_items[:20],
+                'tree_kib': tree_kib,
+                'tree_kib_max': tree_kib_max,
+            }
+            logger.info(f"{output} / {name}: {report[output][name]['pages_per_sec']} pages/sec, {len(diff_items)} records differ from html.parser")
+    return report
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    # soupsieve warns about :contains on every page
+    warnings.filterwarnings('ignore', category=FutureWarning)
+
+    parser = argparse.ArgumentParser(description='Compare parser backends (and region-restricted parsing) on the example/ corpus')
+    parser.add_argument('--example-dir', default='example', help='Folder with <item_name>.html files')
+    parser.add_argument('--limit', type=int, help='Only compare the first N pages')
+    parser.add_argument('--memory-pages', type=int, default=200, help='Pages to measure tree memory on')
+    parser.add_argument('--output', help='Write the report as JSON to this file')
+    args = parser.parse_args()
+
+    report = compare_backends(args.example_dir, args.limit, args.memory_pages)
+    for output, backends in report.items():
+        print(f"\n{output}")
+        for backend, result in backends.items():
+            print(f"  {backend:20} {result['pages_per_sec']:>8} pages/sec  {result['tree_kib']:>8} KiB/tree (max {result['tree_kib_max']})  {result['diffs']} diffs")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
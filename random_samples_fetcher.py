@@ -1,11 +1,11 @@
-import requests
 import json
 import os
 import random
-import time
 from collections import defaultdict
 import logging
 from pathlib import Path
+from http_client import get_client
+from page_archive import PageArchive, PAGE_ARCHIVE_DIR
 
 # Configure logging
 logging.basicConfig(
@@ -19,24 +19,19 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 class RandomSamplesFetcher:
-    def __init__(self, json_file_path, output_folder, samples_per_category=3):
+    def __init__(self, json_file_path, archive_dir=PAGE_ARCHIVE_DIR, samples_per_category=3):
         """
-        Initialize the fetcher with the path to the items JSON file and output folder
+        Initialize the fetcher with the path to the items JSON file and page archive
         
         Args:
             json_file_path: Path to the merge_items.json file
-            output_folder: Path to the example folder where HTML files will be saved
+            archive_dir: Path to the page archive where HTML pages will be saved
             samples_per_category: Number of random samples to select per category
         """
         self.json_file_path = json_file_path
-        self.output_folder = output_folder
         self.samples_per_category = samples_per_category
-        self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
-        
-        # Ensure output folder exists
-        os.makedirs(output_folder, exist_ok=True)
+        self.client = get_client()
+        self.archive = PageArchive(archive_dir)
 
     def load_json_data(self):
         """
@@ -84,55 +79,37 @@ class RandomSamplesFetcher:
         
     def fetch_and_save_html(self, samples):
         """
-        Fetch HTML content for each sample and save to file
+        Fetch HTML content for each sample and save it to the page archive
         """
         for item in samples:
             item_name = item.get('item_name', '')
             item_url = item.get('item_url', '')
+            item_id = item.get('item_id', '')
             
-            if not item_url or not item_name:
-                logger.warning(f"Skipping item with no name or URL: {item}")
+            if not item_url or not item_name or not item_id:
+                logger.warning(f"Skipping item with no name, URL or ID: {item}")
                 continue
-                
-            # Create a valid filename from item_name
-            safe_filename = self.create_safe_filename(item_name)
-            output_path = os.path.join(self.output_folder, f"{safe_filename}.html")
             
             logger.info(f"Fetching HTML for item: {item_name} (URL: {item_url})")
             
             try:
-                # Check if the file already exists
-                if os.path.exists(output_path):
-                    logger.info(f"File already exists: {output_path}, skipping")
+                # Check if the page is already archived
+                if item_id in self.archive:
+                    logger.info(f"Page already archived for item {item_id}, skipping")
                     continue
                     
                 # Fetch the HTML content
-                response = requests.get(item_url, headers=self.headers)
+                response = self.client.get(item_url)
                 response.raise_for_status()
                 
-                # Save the HTML content to file
-                with open(output_path, 'w', encoding='utf-8') as f:
-                    f.write(response.text)
+                # Save the HTML content to the archive
+                self.archive.put(item_id, response.text, item_name, item_url)
                     
-                logger.info(f"Successfully saved HTML to {output_path}")
-                
-                # Add a small delay to avoid overwhelming the server
-                time.sleep(1)
+                logger.info(f"Successfully archived HTML for item {item_id}")
                 
             except Exception as e:
                 logger.error(f"Error fetching or saving HTML for {item_name}: {e}")
     
-    def create_safe_filename(self, filename):
-        """
-        Create a safe filename from the item name
-        """
-        # Remove or replace invalid characters
-        invalid_chars = '<>:"/\\|?*'
-        for char in invalid_chars:
-            filename = filename.replace(char, '_')
-            
-        return filename
-    
     def run(self):
         """
         Run the entire process
@@ -154,6 +131,7 @@ class RandomSamplesFetcher:
         # Fetch and save HTML for each sample
         self.fetch_and_save_html(random_samples)
         
+        self.archive.close()
         logger.info("Completed fetching random samples")
 
 
@@ -161,12 +139,12 @@ if __name__ == "__main__":
     # Path to the merge_items.json file
     json_file_path = os.path.join("scraped_data", "json", "merge_items.json")
     
-    # Path to the example folder
-    output_folder = "example"
+    # Path to the page archive
+    archive_dir = PAGE_ARCHIVE_DIR
     
     # Number of samples per category
     samples_per_category = 3
     
     # Run the fetcher
-    fetcher = RandomSamplesFetcher(json_file_path, output_folder, samples_per_category)
+    fetcher = RandomSamplesFetcher(json_file_path, archive_dir, samples_per_category)
     fetcher.run()
@@ -0,0 +1,197 @@
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+class HostBucket:
+    def __init__(self, rate, burst):
+        """
+        Token-bucket state for a single host
+        """
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.last_refill = time.monotonic()
+        self.blocked_until = 0.0
+        self.latency_ewma = None
+        self.baseline_latency = None
+        self.last_latency_cut = 0.0
+
+    def refill(self, now):
+        """
+        Add tokens for the time elapsed since the last refill
+        """
+        self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+
+class AdaptiveRateLimiter:
+    def __init__(self, initial_rate=1.0, min_rate=0.2, max_rate=8.0, burst=1,
+                 increase_step=0.25, decrease_factor=0.5, latency_factor=2.0,
+                 baseline_drift=0.02, latency_window=5.0):
+        """
+        Per-host token-bucket rate limiter with AIMD adaptation
+
+        The request rate grows additively while responses are 2xx and latency
+        stays near its baseline, and is cut multiplicatively on 429/5xx,
+        Retry-After or when latency rises above latency_factor x baseline.
+
+        The baseline follows the lowest smoothed latency but drifts up towards
+        the current one, so a single fast response early on does not leave
+        every later request looking congested. Latency cuts happen at most
+        once per latency_window seconds, giving the server time to respond to
+        the lower rate.
+
+        Args:
+            initial_rate: Starting requests per second for a new host
+            min_rate: Lowest rate the limiter backs off to
+            max_rate: Highest rate the limiter ramps up to
+            burst: Maximum number of tokens a bucket can hold
+            increase_step: Requests per second added after each healthy response
+            decrease_factor: Multiplier applied to the rate on 429/5xx
+            latency_factor: Latency above baseline x this factor counts as congestion
+            baseline_drift: Fraction of the gap to the smoothed latency the baseline rises per response
+            latency_window: Minimum seconds between two latency-triggered cuts
+        """
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.latency_factor = latency_factor
+        self.baseline_drift = baseline_drift
+        self.latency_window = latency_window
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket_for(self, url):
+        """
+        Return the bucket for the host of a URL, creating it on first use
+        """
+        host = urlparse(url).netloc
+        bucket = self.buckets.get(host)
+        if bucket is None:
+            bucket = HostBucket(min(self.initial_rate, self.max_rate), self.burst)
+            self.buckets[host] = bucket
+        return bucket
+
+    def set_max_rate(self, max_rate):
+        """
+        Change the requests-per-second ceiling for all hosts
+        """
+        with self.lock:
+            self.max_rate = max_rate
+            self.min_rate = min(self.min_rate, max_rate)
+            for bucket in self.buckets.values():
+                bucket.rate = min(bucket.rate, max_rate)
+
+    @contextmanager
+    def capped(self, max_rate):
+        """
+        Apply a requests-per-second ceiling for the duration of a with block
+
+        The limiter is shared by every crawler in the process, so the previous
+        max_rate and min_rate are restored afterwards; host rates then ramp
+        back up on their own. None, or a rate of zero or less (--rps 0),
+        leaves the ceiling unchanged.
+        """
+        if max_rate is None or max_rate <= 0:
+            yield
+            return
+        with self.lock:
+            previous = (self.max_rate, self.min_rate)
+        self.set_max_rate(max_rate)
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.max_rate, self.min_rate = previous
+
+    def reserve(self, url):
+        """
+        Take a token for the URL's host and return how long to wait before sending
+        """
+        with self.lock:
+            bucket = self.bucket_for(url)
+            now = time.monotonic()
+            bucket.refill(now)
+            bucket.tokens -= 1
+            wait = -bucket.tokens / bucket.rate if bucket.tokens < 0 else 0.0
+            return max(wait, bucket.blocked_until - now)
+
+    def acquire(self, url):
+        """
+        Block until a request to the URL's host may be sent
+        """
+        wait = self.reserve(url)
+        if wait > 0:
+            time.sleep(wait)
+
+    def record(self, url, status_code, latency, retry_after=None):
+        """
+        Adapt the host's rate from the outcome of a request
+
+        Args:
+            url: Requested URL
+            status_code: HTTP status code, or None when the request failed
+            latency: Seconds the request took
+            retry_after: Value of the Retry-After response header, if any
+        """
+        with self.lock:
+            bucket = self.bucket_for(url)
+            old_rate = bucket.rate
+
+            if bucket.latency_ewma is None:
+                bucket.latency_ewma = latency
+            else:
+                bucket.latency_ewma = 0.7 * bucket.latency_ewma + 0.3 * latency
+            if bucket.baseline_latency is None or bucket.latency_ewma < bucket.baseline_latency:
+                bucket.baseline_latency = bucket.latency_ewma
+            else:
+                bucket.baseline_latency += self.baseline_drift * (bucket.latency_ewma - bucket.baseline_latency)
+
+            retry_seconds = self.parse_retry_after(retry_after)
+            if retry_seconds:
+                bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + retry_seconds)
+
+            if status_code is None or status_code == 429 or status_code >= 500 or retry_seconds:
+                bucket.rate = max(self.min_rate, bucket.rate * self.decrease_factor)
+            elif bucket.latency_ewma > bucket.baseline_latency * self.latency_factor:
+                # Latency is climbing: back off gently before the server starts failing,
+                # then hold the rate until the window has passed
+                now = time.monotonic()
+                if now - bucket.last_latency_cut >= self.latency_window:
+                    bucket.rate = max(self.min_rate, bucket.rate * 0.8)
+                    bucket.last_latency_cut = now
+            elif 200 <= status_code < 400:
+                bucket.rate = min(self.max_rate, bucket.rate + self.increase_step)
+
+            if bucket.rate < old_rate:
+                logger.info(f"Rate limit for {urlparse(url).netloc} lowered to {bucket.rate:.2f} req/s (status={status_code}, latency={latency:.2f}s)")
+
+    def parse_retry_after(self, retry_after):
+        """
+        Convert a Retry-After header (seconds or HTTP date) to seconds
+        """
+        if not retry_after:
+            return 0
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+        except Exception:
+            return 0
+
+    def current_rate(self, url):
+        """
+        Return the current requests-per-second for the URL's host
+        """
+        with self.lock:
+            return self.bucket_for(url).rate
@@ -0,0 +1,215 @@
+import argparse
+import json
+import logging
+import math
+import sqlite3
+import time
+
+from change_feed import SCHEMA as CHANGE_FEED_SCHEMA
+from crawl_frontier import CrawlFrontier, CRAWL_FRONTIER_DB, PENDING, IN_FLIGHT
+
+logger = logging.getLogger(__name__)
+
+DAY = 86400.0
+# Refresh interval assumed for a stage before any change has been observed
+DEFAULT_INTERVAL_DAYS = 30.0
+MIN_INTERVAL_DAYS = 0.5
+MAX_INTERVAL_DAYS = 365.0
+
+class RecrawlScheduler:
+    def __init__(self, stage, db_path=CRAWL_FRONTIER_DB, prior_changes=1.0,
+                 default_interval_days=DEFAULT_INTERVAL_DAYS, min_interval_days=MIN_INTERVAL_DAYS, max_interval_days=MAX_INTERVAL_DAYS):
+        """
+        Spend a recrawl's request budget on the items most likely to have changed
+
+        Each item's changes are treated as a Poisson process. The rate is
+        estimated from crawl_history (written by change_feed.ChangeTracker)
+        as (changes + a) / (observed time + a / r), where r is the stage-wide
+        rate and a is prior_changes: an item with a short history starts near
+        the average and follows its own record as visits accumulate. The
+        probability that the stored copy is stale is
+        1 - exp(-rate * time since the last visit).
+
+        Args:
+            stage: Pipeline stage name, e.g. 'fetch_and_parse_items'
+            db_path: SQLite database with the frontier and the crawl history
+            prior_changes: Weight of the stage-wide rate in each item's estimate
+            default_interval_days: Stage-wide interval assumed before any change is seen
+            min_interval_days: Shortest refresh interval an item is given
+            max_interval_days: Longest refresh interval an item is given
+        """
+        self.stage = stage
+        self.frontier = CrawlFrontier(stage, db_path)
+        self.prior_changes = prior_changes
+        self.default_interval = default_interval_days * DAY
+        self.min_interval = min_interval_days * DAY
+        self.max_interval = max_interval_days * DAY
+
+        self.conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        self.conn.executescript(CHANGE_FEED_SCHEMA)
+
+    def history(self):
+        """
+        Return {item_id: (first visit, last visit, visits, changes)} from crawl_history
+        """
+        rows = self.conn.execute(
+            "SELECT item_id, MIN(checked_at), MAX(checked_at), COUNT(*), SUM(changed) "
+            "FROM crawl_history WHERE stage = ? GROUP BY item_id", (self.stage,)
+        ).fetchall()
+        return {row[0]: row[1:] for row in rows}
+
+    def candidates(self):
+        """
+        Return (item_id, item_name, state) for every item in the frontier, in crawl order
+        """
+        rows = self.conn.execute(
+            "SELECT item_id, payload, state FROM frontier WHERE stage = ? AND item_id IS NOT NULL ORDER BY seq", (self.stage,)
+        ).fetchall()
+        return [(item_id, json.loads(payload).get('item_name', '') if payload else '', state) for item_id, payload, state in rows]
+
+    def stage_rate(self, history):
+        """
+        Return the stage-wide change rate (changes per second)
+        """
+        changes = sum(entry[3] for entry in history.values())
+        observed = sum(entry[1] - entry[0] for entry in history.values())
+        # One assumed change per default interval keeps the rate sane on the first recrawls
+        return (changes + 1) / (observed + self.default_interval)
+
+    def change_rate(self, entry, stage_rate):
+        """
+        Return an item's estimated change rate (changes per second)
+        """
+        first, last, visits, changes = entry
+        prior_time = self.prior_changes / stage_rate
+        rate = (changes + self.prior_changes) / (last - first + prior_time)
+        return min(max(rate, 1 / self.max_interval), 1 / self.min_interval)
+
+    def plan(self, budget, now=None):
+        """
+        Rank the items by the probability that their stored copy is stale
+
+        Items already pending (new listings, reset failures) are fetched by
+        the next run anyway, so they come first and use up budget. Items
+        without history have never been fingerprinted and count as stale.
+
+        Returns:
+            List of up to `budget` dicts with item_id, item_name, state,
+            stale_probability, interval_days, last_checked, visits and changes
+        """
+        now = now or time.time()
+        history = self.history()
+        stage_rate = self.stage_rate(history)
+
+        ranked = []
+        for order, (item_id, item_name, state) in enumerate(self.candidates()):
+            if state == IN_FLIGHT:
+                continue
+            entry = history.get(item_id)
+            if entry:
+                rate = self.change_rate(entry, stage_rate)
+                probability = 1 - math.exp(-rate * max(now - entry[1], 0))
+            else:
+                rate = stage_rate
+                probability = 1.0
+            ranked.append({
+                'item_id': item_id,
+                'item_name': item_name,
+                'state': state,
+                'stale_probability': probability,
+                'interval_days': 1 / rate / DAY,
+                'last_checked': entry[1] if entry else None,
+                'visits': entry[2] if entry else 0,
+                'changes': entry[3] if entry else 0,
+                'order': order,
+            })
+        ranked.sort(key=lambda item: (item['state'] != PENDING, -item['stale_probability'], item['order']))
+        for item in ranked:
+            del item['order']
+        return ranked[:budget]
+
+    def schedule(self, budget, now=None):
+        """
+        Move the planned items back to pending in the frontier
+
+        The next run of the stage (fetch_and_parse_items.py, item_detail_fetcher.py
+        or crawl_pipeline.py) then fetches exactly these items.
+
+        Returns:
+            The plan
+        """
+        planned = self.plan(budget, now)
+        requeued = self.frontier.requeue(item['item_id'] for item in planned if item['state'] != PENDING)
+        expected = sum(item['stale_probability'] for item in planned)
+        logger.info(f"Scheduled {len(planned)} items for {self.stage} ({requeued} requeued, about {expected:.0f} expected to have changed)")
+        return planned
+
+    def stats(self, now=None):
+        """
+        Return the number of items per refresh interval bucket and the history totals
+        """
+        now = now or time.time()
+        history = self.history()
+        stage_rate = self.stage_rate(history)
+        buckets = {'< 1d': 0, '1-7d': 0, '7-30d': 0, '30-90d': 0, '>= 90d': 0}
+        for entry in history.values():
+            days = 1 / self.change_rate(entry, stage_rate) / DAY
+            if days < 1:
+                buckets['< 1d'] += 1
+            elif days < 7:
+                buckets['1-7d'] += 1
+            elif days < 30:
+                buckets['7-30d'] += 1
+            elif days < 90:
+                buckets['30-90d'] += 1
+            else:
+                buckets['>= 90d'] += 1
+        return {
+            'items_with_history': len(history),
+            'visits': sum(entry[2] for entry in history.values()),
+            'changes': sum(entry[3] for entry in history.values()),
+            'stage_interval_days': 1 / stage_rate / DAY,
+            'interval_buckets': buckets,
+        }
+
+    def close(self):
+        self.conn.close()
+        self.frontier.close()
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description='Plan a recrawl from the change history within a request budget')
+    parser.add_argument('command', choices=['plan', 'schedule', 'stats'])
+    parser.add_argument('--stage', required=True, help='Pipeline stage, e.g. fetch_and_parse_items')
+    parser.add_argument('--db', default=CRAWL_FRONTIER_DB, help='SQLite database file')
+    parser.add_argument('--budget', type=int, help='Number of requests to spend (default: rps x hours)')
+    parser.add_argument('--rps', type=float, default=4.0, help='Requests per second the crawl may use')
+    parser.add_argument('--hours', type=float, default=1.0, help='Length of the crawl window in hours')
+    parser.add_argument('--show', type=int, default=30, help='Number of planned items to print')
+    args = parser.parse_args()
+
+    scheduler = RecrawlScheduler(args.stage, args.db)
+    if args.command == 'stats':
+        stats = scheduler.stats()
+        print(f"items with history: {stats['items_with_history']} ({stats['visits']} visits, {stats['changes']} changes)")
+        print(f"stage-wide refresh interval: {stats['stage_interval_days']:.1f} days")
+        for bucket, count in stats['interval_buckets'].items():
+            print(f"  {bucket:8} {count}")
+    else:
+        budget = args.budget if args.budget is not None else int(args.rps * args.hours * 3600)
+        planned = scheduler.schedule(budget) if args.command == 'schedule' else scheduler.plan(budget)
+        expected = sum(item['stale_probability'] for item in planned)
+        print(f"{len(planned)} items within a budget of {budget} requests, about {expected:.0f} expected to have changed")
+        for item in planned[:args.show]:
+            print(f"  {item['item_id']:>6} {item['stale_probability']:6.3f} every {item['interval_days']:6.1f}d "
+                  f"{item['changes']}/{item['visits']} changed  [{item['state']}] {item['item_name']}")
+    scheduler.close()
+
+
+if __name__ == "__main__":
+    main()
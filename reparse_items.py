@@ -0,0 +1,209 @@
+import argparse
+import json
+import logging
+import os
+import time
+from multiprocessing import Pool
+
+from fetch_and_parse_items import ItemFetcher
+from item_detail_fetcher import ItemDetailFetcher
+from page_archive import PageArchive, PAGE_ARCHIVE_DIR, match_example_pages
+from parser_backend import PARSER_BACKENDS, DEFAULT_PARSER
+
+logger = logging.getLogger(__name__)
+
+class ExamplePageSource:
+    def __init__(self, example_dir, items):
+        """
+        Read pages from the loose example/<item_name>.html folder
+
+        shared_ids holds the items whose file name other items share too.
+        """
+        self.shared_ids = set()
+        self.paths = {item['item_id']: path for item, path in match_example_pages(example_dir, items, self.shared_ids)}
+
+    def get_text(self, item_id):
+        """
+        Return the page stored for an item, or None
+        """
+        path = self.paths.get(str(item_id))
+        if not path:
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def close(self):
+        pass
+
+
+# Parsers owned by each worker process, created once by init_worker
+item_fetcher = None
+detail_fetcher = None
+
+def init_worker(parser=DEFAULT_PARSER, restrict=False):
+    """
+    Create the offline parsers in a worker process
+    """
+    global item_fetcher, detail_fetcher
+    item_fetcher = ItemFetcher(offline=True, parser=parser, restrict=restrict)
+    detail_fetcher = ItemDetailFetcher(None, offline=True, parser=parser, restrict=restrict)
+
+def parse_final_record(task):
+    """
+    Parse one page into a final.json record
+    """
+    item, html_content = task
+    return item_fetcher.parse_item_html(html_content, item)
+
+def parse_detail_record(task):
+    """
+    Parse one page into a scraped_items/<name>_<id>.json record
+    """
+    item, html_content = task
+    return detail_fetcher.parse_item_details(html_content, item)
+
+
+class OfflineReparser:
+    def __init__(self, source='archive', archive_dir=PAGE_ARCHIVE_DIR, example_dir='example', workers=None, parser=DEFAULT_PARSER, restrict=False):
+        """
+        Rebuild final.json and scraped_items/*.json from stored pages, with no network
+
+        Args:
+            source: 'archive' to read the page archive, 'example' to read the example/ folder
+            archive_dir: Page archive directory
+            example_dir: Folder with <item_name>.html files
+            workers: Number of parser processes (defaults to the number of cores)
+            parser: Parser backend, one of PARSER_BACKENDS
+            restrict: Only build the page regions the extractors read
+        """
+        self.source = source
+        self.archive_dir = archive_dir
+        self.example_dir = example_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.parser = parser
+        self.restrict = restrict
+        self.merge_items_path = os.path.join("scraped_data", "json", "merge_items.json")
+        self.all_items_path = os.path.join("scraped_data", "json", "all_items.json")
+        self.chunksize = 16
+
+    def load_json(self, path):
+        """
+        Load a JSON list, returning an empty list on error
+        """
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Error loading {path}: {e}")
+            return []
+
+    def open_source(self, items):
+        """
+        Open the configured page source
+        """
+        if self.source == 'example':
+            return ExamplePageSource(self.example_dir, items)
+        return PageArchive(self.archive_dir)
+
+    def collect_tasks(self, page_source, items):
+        """
+        Pair each item with its stored page; return (tasks, items without a page)
+        """
+        tasks = []
+        missing = []
+        for item in items:
+            html_content = page_source.get_text(item.get('item_id', ''))
+            if html_content:
+                tasks.append((item, html_content))
+            else:
+                missing.append(item)
+        return tasks, missing
+
+    def rebuild_final(self, pool, page_source, items):
+        """
+        Regenerate final.json, keeping existing records for items with no stored page
+        """
+        fetcher = ItemFetcher(offline=True)
+        fetcher.load_existing_final_data()
+        existing = {record.get('item_id'): record for record in fetcher.sink}
+
+        tasks, missing = self.collect_tasks(page_source, items)
+        logger.info(f"Re-parsing {len(tasks)} pages for {fetcher.output_path} ({len(missing)} items have no stored page)")
+
+        parsed = {}
+        for (item, _), record in zip(tasks, pool.imap(parse_final_record, tasks, self.chunksize)):
+            if record:
+                parsed[item.get('item_id')] = record
+
+        kept = 0
+        records = []
+        for item in items:
+            item_id = item.get('item_id')
+            if item_id in parsed:
+                records.append(parsed[item_id])
+            elif item_id in existing:
+                records.append(existing[item_id])
+                kept += 1
+
+        logger.info(f"Kept {kept} existing records without a stored page")
+        fetcher.sink.rewrite(records)
+        fetcher.save_final_data()
+
+    def rebuild_scraped_items(self, pool, page_source):
+        """
+        Regenerate the per-item JSON files in scraped_items/
+        """
+        fetcher = ItemDetailFetcher(self.all_items_path, offline=True)
+        items = []
+        seen_urls = set()
+        for item in fetcher.load_items():
+            item_url = item.get('item_url')
+            if item_url and item.get('item_name') and item_url not in seen_urls:
+                seen_urls.add(item_url)
+                items.append(item)
+
+        tasks, missing = self.collect_tasks(page_source, items)
+        logger.info(f"Re-parsing {len(tasks)} pages for {fetcher.output_dir}/ ({len(missing)} items have no stored page)")
+
+        saved = 0
+        for record in pool.imap(parse_detail_record, tasks, self.chunksize):
+            if record and fetcher.save_item_to_json(record):
+                saved += 1
+        logger.info(f"Saved {saved} item files to {fetcher.output_dir}")
+
+    def run(self, final=True, scraped_items=True):
+        """
+        Run the offline re-parse
+        """
+        start = time.time()
+        items = self.load_json(self.merge_items_path)
+        page_source = self.open_source(items)
+        logger.info(f"Starting offline re-parse from {self.source} with {self.workers} workers ({self.parser})")
+
+        with Pool(self.workers, initializer=init_worker, initargs=(self.parser, self.restrict)) as pool:
+            if final:
+                self.rebuild_final(pool, page_source, items)
+            if scraped_items:
+                self.rebuild_scraped_items(pool, page_source)
+
+        page_source.close()
+        logger.info(f"Offline re-parse completed in {time.time() - start:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild final.json and scraped_items/ from stored pages without network access')
+    parser.add_argument('--source', choices=['archive', 'example'], default='archive', help='Where to read stored pages from')
+    parser.add_argument('--archive', default=PAGE_ARCHIVE_DIR, help='Page archive directory')
+    parser.add_argument('--example-dir', default='example', help='Folder with <item_name>.html files')
+    parser.add_argument('--workers', type=int, help='Number of parser processes (default: all cores)')
+    parser.add_argument('--only', choices=['final', 'items'], help='Only rebuild final.json or only scraped_items/')
+    parser.add_argument('--parser', choices=PARSER_BACKENDS, default=DEFAULT_PARSER, help='HTML parser backend')
+    parser.add_argument('--restrict', action='store_true', help='Only parse the page regions the extractors read')
+    args = parser.parse_args()
+
+    reparser = OfflineReparser(args.source, args.archive, args.example_dir, args.workers, args.parser, args.restrict)
+    reparser.run(final=args.only != 'items', scraped_items=args.only != 'final')
+
+
+if __name__ == "__main__":
+    main()
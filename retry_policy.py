@@ -0,0 +1,146 @@
+import random
+import threading
+import time
+import logging
+from urllib.parse import urlparse
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Status codes worth retrying: throttling and transient server errors
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class CircuitOpenError(requests.RequestException):
+    """
+    Raised when a request is refused because the host's circuit is open
+
+    It says nothing about the item being fetched: crawl loops return the item
+    to the frontier and wait retry_after seconds instead of failing it.
+    """
+    def __init__(self, message, retry_after=0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def wait_for_circuit(error):
+    """
+    Sleep until an open circuit lets its next probe request through
+    """
+    logger.warning(f"{error}; pausing {error.retry_after:.0f}s before continuing")
+    time.sleep(error.retry_after)
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts=4, base_delay=1.0, max_delay=30.0):
+        """
+        Jittered exponential backoff for transient request failures
+
+        Args:
+            max_attempts: Total attempts per request, including the first
+            base_delay: Backoff for the first retry in seconds
+            max_delay: Upper bound for a single backoff
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay_for(self, attempt):
+        """
+        Return the backoff before retry number `attempt` (1-based), with full jitter
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+    def is_retryable_status(self, status_code):
+        """
+        Check whether a response status should be retried
+        """
+        return status_code in RETRYABLE_STATUS_CODES
+
+    def is_retryable_error(self, error):
+        """
+        Check whether a request exception should be retried
+        """
+        if isinstance(error, CircuitOpenError):
+            return False
+        return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+class HostCircuit:
+    def __init__(self):
+        """
+        Circuit state for a single host
+        """
+        self.failures = 0
+        self.opened_at = None
+        self.half_open_probe = False
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=8, reset_timeout=60.0):
+        """
+        Per-host circuit breaker
+
+        After failure_threshold consecutive failures the circuit opens and
+        requests to that host fail fast. After reset_timeout one probe request
+        is let through; success closes the circuit, failure re-opens it.
+
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds to wait before probing an open circuit
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.circuits = {}
+        self.lock = threading.Lock()
+
+    def circuit_for(self, url):
+        """
+        Return the circuit for the host of a URL, creating it on first use
+        """
+        host = urlparse(url).netloc
+        circuit = self.circuits.get(host)
+        if circuit is None:
+            circuit = HostCircuit()
+            self.circuits[host] = circuit
+        return circuit
+
+    def before_request(self, url):
+        """
+        Raise CircuitOpenError if requests to the URL's host are currently refused
+        """
+        with self.lock:
+            circuit = self.circuit_for(url)
+            if circuit.opened_at is None:
+                return
+            remaining = self.reset_timeout - (time.monotonic() - circuit.opened_at)
+            if remaining > 0 or circuit.half_open_probe:
+                # While the probe is in flight, check again shortly
+                raise CircuitOpenError(f"Circuit open for {urlparse(url).netloc}", max(remaining, 1.0))
+            # Let a single probe request through
+            circuit.half_open_probe = True
+
+    def record_success(self, url):
+        """
+        Reset the host's failure count and close its circuit
+        """
+        with self.lock:
+            circuit = self.circuit_for(url)
+            if circuit.opened_at is not None:
+                logger.info(f"Circuit closed for {urlparse(url).netloc}")
+            circuit.failures = 0
+            circuit.opened_at = None
+            circuit.half_open_probe = False
+
+    def record_failure(self, url):
+        """
+        Count a failure and open the host's circuit when the threshold is reached
+        """
+        with self.lock:
+            circuit = self.circuit_for(url)
+            circuit.failures += 1
+            if circuit.half_open_probe or circuit.failures >= self.failure_threshold:
+                if circuit.opened_at is None or circuit.half_open_probe:
+                    logger.warning(f"Circuit opened for {urlparse(url).netloc} after {circuit.failures} consecutive failures")
+                circuit.opened_at = time.monotonic()
+                circuit.half_open_probe = False
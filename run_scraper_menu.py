@@ -113,14 +113,14 @@ def run_item_detail_fetcher():
         except ValueError:
             print("輸入無效，將爬取所有物品")
     
-    # 詢問使用者設定延遲時間
-    delay = 1  # 預設延遲1秒
+    # 詢問使用者設定最小延遲時間 (未設定時由速率限制器自動調整)
+    delay = None
     try:
-        delay_input = input("請輸入每次爬蟲的延遲秒數 (預設1秒): ")
+        delay_input = input("請輸入每次爬蟲的最小延遲秒數 (留空為自動調整): ")
         if delay_input:
             delay = float(delay_input)
     except ValueError:
-        print("輸入無效，將使用預設延遲1秒")
+        print("輸入無效，將自動調整爬蟲速度")
     
     # 建立詳細資料爬蟲實例
     fetcher = ItemDetailFetcher(items_json_path)
@@ -202,10 +202,10 @@ def run_complete_workflow():
         max_items = None
     
     try:
-        delay = float(input("請輸入每次爬蟲的延遲秒數 (預設1秒): ") or "1")
+        delay = float(input("請輸入每次爬蟲的最小延遲秒數 (留空為自動調整): ") or "0") or None
     except ValueError:
-        print("輸入無效，將使用預設延遲1秒")
-        delay = 1
+        print("輸入無效，將自動調整爬蟲速度")
+        delay = None
     
     # 執行詳細資料爬蟲
     items_json_path = "scraped_data/json/all_items.json"
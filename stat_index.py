@@ -0,0 +1,282 @@
+import argparse
+import json
+import logging
+import os
+import time
+
+import numpy as np
+
+from stat_parser import stat_frame, item_frame, stat_values
+
+logger = logging.getLogger(__name__)
+
+STAT_INDEX_PATH = os.path.join("scraped_data", "stat_index.npz")
+# Non-stat posting lists: {name: record field}
+ITEM_FIELDS = {
+    'category': 'category_id',
+    'category_name': 'category_name',
+    'grade': 'item_grade',
+}
+
+def posting_lists(pairs):
+    """
+    Build a CSR layout from (key, item position, value) triples
+
+    Returns:
+        (sorted keys, offsets, item positions, values); within each key the
+        postings are ordered by value, then by item position
+    """
+    keys = np.array([key for key, _, _ in pairs], dtype=str)
+    positions = np.array([position for _, position, _ in pairs], dtype=np.int32)
+    values = np.array([value for _, _, value in pairs], dtype=np.float64)
+    order = np.lexsort((positions, values, keys))
+    keys, positions, values = keys[order], positions[order], values[order]
+    unique, starts = np.unique(keys, return_index=True)
+    offsets = np.append(starts, len(keys)).astype(np.int64)
+    return unique, offsets, positions, values
+
+
+class StatIndex:
+    def __init__(self, arrays):
+        """
+        Inverted index from stat key, class, category and grade to item posting lists
+
+        Each list family is stored CSR-style: sorted keys, offsets into one
+        array of item positions and, for stats, a parallel array of values
+        sorted within each key, so a value range is two binary searches.
+        Queries intersect the sorted position arrays, smallest first.
+
+        Args:
+            arrays: Dict of numpy arrays, as written by save()
+        """
+        self.arrays = arrays
+        self.item_ids = arrays['item_ids']
+        self.enhance_level = int(arrays['enhance_level'])
+        self.families = {}
+        for family in ['stat', 'class'] + list(ITEM_FIELDS):
+            keys = arrays[f"{family}_keys"]
+            self.families[family] = (
+                {key: index for index, key in enumerate(keys.tolist())},
+                arrays[f"{family}_offsets"],
+                arrays[f"{family}_items"],
+            )
+        self.stat_keys = arrays['stat_keys']
+        self.stat_values = arrays['stat_values']
+
+    @classmethod
+    def build(cls, records, enhance_level=0):
+        """
+        Parse the item records (stat_parser) and build the index
+
+        Args:
+            records: Item records (final.json)
+            enhance_level: Index stat values at this enhancement level (0: unenhanced)
+        """
+        items = item_frame(records)
+        items = items[~items.index.duplicated()]
+        position = {item_id: index for index, item_id in enumerate(items.index)}
+        values = stat_values(stat_frame(records), items, enhance_level)
+        stats = list(zip(values['column'].astype(str), values['item_id'].map(position), values['value']))
+        for column in ('dmg_small', 'dmg_large', 'ac'):
+            present = items[column].notna()
+            stats.extend(zip([column] * int(present.sum()), np.flatnonzero(present.to_numpy()), items[column][present]))
+
+        arrays = {'item_ids': np.array(items.index, dtype=str), 'enhance_level': np.array(enhance_level)}
+        families = {'stat': stats, 'class': [], **{family: [] for family in ITEM_FIELDS}}
+        seen = set()
+        for record in records:
+            item_id = str(record.get('item_id', ''))
+            if item_id in seen or item_id not in position:
+                continue
+            seen.add(item_id)
+            for name in {entry.get('name') for entry in record.get('item_classes') or [] if entry.get('name')}:
+                families['class'].append((name, position[item_id], 0.0))
+            for family, field in ITEM_FIELDS.items():
+                if record.get(field):
+                    families[family].append((str(record[field]), position[item_id], 0.0))
+        for family, pairs in families.items():
+            keys, offsets, positions, values = posting_lists(pairs)
+            arrays[f"{family}_keys"] = keys
+            arrays[f"{family}_offsets"] = offsets
+            arrays[f"{family}_items"] = positions
+            if family == 'stat':
+                arrays['stat_values'] = values
+        return cls(arrays)
+
+    @classmethod
+    def load(cls, path=STAT_INDEX_PATH):
+        with np.load(path, allow_pickle=False) as data:
+            return cls({name: data[name] for name in data.files})
+
+    def save(self, path=STAT_INDEX_PATH):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **self.arrays)
+        os.replace(tmp_path, path)
+
+    def postings(self, family, key):
+        """
+        Return the sorted item positions of one class, category or grade (or every item with a stat)
+        """
+        keys, offsets, positions = self.families[family]
+        index = keys.get(key)
+        if index is None:
+            return np.empty(0, dtype=np.int32)
+        segment = positions[offsets[index]:offsets[index + 1]]
+        return segment if family != 'stat' else np.sort(segment)
+
+    def stat(self, key, minimum=None, maximum=None):
+        """
+        Return the sorted positions of the items whose stat lies in [minimum, maximum]
+        """
+        keys, offsets, positions = self.families['stat']
+        index = keys.get(key)
+        if index is None:
+            return np.empty(0, dtype=np.int32)
+        start, end = offsets[index], offsets[index + 1]
+        values = self.stat_values[start:end]
+        low = np.searchsorted(values, minimum, 'left') if minimum is not None else 0
+        high = np.searchsorted(values, maximum, 'right') if maximum is not None else len(values)
+        return np.sort(positions[start + low:start + high])
+
+    def stat_prefix(self, prefix):
+        """
+        Return the sorted positions of the items with any stat key starting with prefix (e.g. 發動:)
+        """
+        keys, offsets, positions = self.families['stat']
+        low = np.searchsorted(self.stat_keys, prefix, 'left')
+        high = np.searchsorted(self.stat_keys, prefix + '\U0010ffff', 'left')
+        return np.unique(positions[offsets[low]:offsets[high]])
+
+    def matching(self, stats=(), prefixes=(), **filters):
+        """
+        Return the sorted positions of the items matching every condition
+
+        Args:
+            stats: (key, minimum, maximum) ranges; None leaves a side open
+            prefixes: Stat key prefixes
+            filters: class_name, category, category_name, grade
+        """
+        lists = [self.stat(key, minimum, maximum) for key, minimum, maximum in stats]
+        lists.extend(self.stat_prefix(prefix) for prefix in prefixes)
+        for name, value in filters.items():
+            if value is not None:
+                lists.append(self.postings('class' if name == 'class_name' else name, value))
+        if not lists:
+            return np.arange(len(self.item_ids), dtype=np.int32)
+        lists.sort(key=len)
+        result = lists[0]
+        for postings in lists[1:]:
+            if not len(result):
+                break
+            result = np.intersect1d(result, postings, assume_unique=True)
+        return result
+
+    def query(self, stats=(), prefixes=(), **filters):
+        """
+        Return the item IDs matching every condition, in catalog order
+        """
+        return self.item_ids[self.matching(stats, prefixes, **filters)].tolist()
+
+    def values(self, key, positions):
+        """
+        Return {item_id: value of the stat} for the given item positions
+        """
+        keys, offsets, all_positions = self.families['stat']
+        index = keys.get(key)
+        if index is None:
+            return {}
+        start, end = offsets[index], offsets[index + 1]
+        wanted = np.isin(all_positions[start:end], positions)
+        return dict(zip(self.item_ids[all_positions[start:end][wanted]].tolist(), self.stat_values[start:end][wanted].tolist()))
+
+    def keys(self, family='stat'):
+        """
+        Return [(key, number of items)] of a list family, largest first
+        """
+        keys, offsets, _ = self.families[family]
+        counts = np.diff(offsets)
+        return sorted(zip(keys, counts.tolist()), key=lambda entry: -entry[1])
+
+
+def refresh_stat_index(final_path="final.json", index_path=STAT_INDEX_PATH, enhance_level=0):
+    """
+    Rebuild the stat index from final.json; called by the pipeline after compacting final.json
+    """
+    with open(final_path, 'r', encoding='utf-8') as f:
+        records = json.load(f)
+    index = StatIndex.build(records, enhance_level)
+    index.save(index_path)
+    logger.info(f"Stat index: {len(index.item_ids)} items, {len(index.stat_keys)} stat keys")
+    return index
+
+def parse_condition(text):
+    """
+    Parse 'key', 'key>=5', 'key<=-3' or 'key=1..5' into (key, minimum, maximum)
+    """
+    for operator in ('>=', '<=', '='):
+        if operator in text:
+            key, value = text.split(operator, 1)
+            if operator == '>=':
+                return key, float(value), None
+            if operator == '<=':
+                return key, None, float(value)
+            low, separator, high = value.partition('..')
+            if not separator:
+                return key, float(value), float(value)
+            return key, float(low) if low else None, float(high) if high else None
+    return text, None, None
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description='Inverted stat index: which items have a stat, class or category')
+    parser.add_argument('command', choices=['build', 'query', 'keys'])
+    parser.add_argument('conditions', nargs='*', help="query: stat conditions, e.g. '傷害增加%%>=5' 'HP吸收' '物理防禦力(AC)=-5..-3'")
+    parser.add_argument('--input', default='final.json', help='build: item records')
+    parser.add_argument('--index', default=STAT_INDEX_PATH, help='Index file')
+    parser.add_argument('--level', type=int, default=0, help='build: index stat values at this enhancement level')
+    parser.add_argument('--prefix', action='append', default=[], help='query: any stat key with this prefix, e.g. 發動: or 祝福:')
+    parser.add_argument('--class', dest='class_name', help='query: class name, e.g. 騎士')
+    parser.add_argument('--category', help='query: category_id')
+    parser.add_argument('--category-name', help='query: category name, e.g. 戒指')
+    parser.add_argument('--grade', help='query: item_grade')
+    parser.add_argument('--family', default='stat', choices=['stat', 'class'] + list(ITEM_FIELDS), help='keys: list family')
+    parser.add_argument('--json', action='store_true', help='query: print the item IDs as JSON')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        index = refresh_stat_index(args.input, args.index, args.level)
+        print(f"Indexed {len(index.item_ids)} items, {len(index.stat_keys)} stat keys to {args.index}")
+        return
+
+    index = StatIndex.load(args.index)
+    if args.command == 'keys':
+        for key, count in index.keys(args.family):
+            print(f"{count:6} {key}")
+        return
+
+    conditions = [parse_condition(text) for text in args.conditions]
+    start = time.perf_counter()
+    positions = index.matching(conditions, args.prefix, class_name=args.class_name, category=args.category,
+                               category_name=args.category_name, grade=args.grade)
+    elapsed = time.perf_counter() - start
+    item_ids = index.item_ids[positions].tolist()
+    if args.json:
+        print(json.dumps(item_ids))
+        return
+    first = index.values(conditions[0][0], positions) if conditions else {}
+    for item_id in item_ids:
+        print(f"{item_id:>6} {first.get(item_id, ''):>8}" if conditions else item_id)
+    print(f"{len(item_ids)} items in {elapsed * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
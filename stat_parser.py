@@ -0,0 +1,253 @@
+import argparse
+import json
+import logging
+import re
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# One parsed stat: key without spaces, signed value (NaN for flag stats such as
+# 防止武器損壞), unit ('%', '' or a word such as 分鐘) and whether it is a proc (發動:)
+Stat = namedtuple('Stat', ['key', 'value', 'unit', 'proc'])
+
+STAT_SOURCES = ['item_stats', 'item_stats2']
+# item_stats2 holds the blessed variant's stats (祝福屬性), which replace rather
+# than add to the normal ones, so they get columns of their own
+BLESSED_SOURCE = 'item_stats2'
+BLESSED_PREFIX = '祝福:'
+
+# Spellings of the same stat that differ between pages
+STAT_ALIASES = {
+    '物理防禦(AC)': '物理防禦力(AC)',
+}
+
+NUMBER = r'(?P<value>\d+(?:\.\d+)?)'
+PROC_RE = re.compile(r'^發動\s*[:：]\s*(?P<key>.+?)\s*' + NUMBER + r'\s*%$')
+# '+10 武器命中', '+3 負重獎勵'
+LEADING_RE = re.compile(r'^(?P<sign>[+-])\s*' + NUMBER + r'\s*(?P<unit>%?)\s*(?P<key>\D.*)$')
+# '額外攻擊+8', '物理防禦力 (AC)-5', '昏迷命中 +5%', '魔法穿透3%', '持續時間 30 分鐘'
+TRAILING_RE = re.compile(r'^(?P<key>.*?\D)\s*(?P<sign>[+-]?)\s*' + NUMBER + r'\s*(?P<unit>%|[^\d\s%+-]{1,3})?$')
+# '68級以上可用' is the required level
+LEVEL_RE = re.compile(r'^(?P<value>\d+)\s*級以上可用$')
+# Enhancement effects are separated by ASCII or full-width commas
+EFFECT_SPLIT_RE = re.compile(r'\s*[,，]\s*')
+DAMAGE_RE = re.compile(r'^\s*(\d+)\s*/\s*(\d+)\s*$')
+AC_RE = re.compile(r'^\s*(-?\d+)\s*$')
+
+def stat_key(text):
+    key = re.sub(r'\s+', '', text)
+    return STAT_ALIASES.get(key, key)
+
+def parse_stat(text):
+    """
+    Parse one stat string into a Stat
+
+    Strings without a number (防止武器損壞, 雙手武器) become flag stats with a
+    NaN value; the whole text is their key.
+    """
+    text = text.strip()
+    match = LEVEL_RE.match(text)
+    if match:
+        return Stat('使用等級', float(match.group('value')), '', False)
+    match = PROC_RE.match(text)
+    if match:
+        return Stat(stat_key(match.group('key')), float(match.group('value')), '%', True)
+    match = LEADING_RE.match(text) or TRAILING_RE.match(text)
+    if match:
+        value = float(match.group('value'))
+        if match.group('sign') == '-':
+            value = -value
+        return Stat(stat_key(match.group('key')), value, match.group('unit') or '', False)
+    return Stat(stat_key(text), np.nan, '', False)
+
+def parse_effects(effect):
+    """
+    Parse an enhancement effect string ('額外攻擊+1,武器命中+1') into Stats
+    """
+    return [parse_stat(part) for part in EFFECT_SPLIT_RE.split(effect or '') if part.strip()]
+
+def parse_item_level(item_level):
+    """
+    Split item_level into (small damage, large damage, AC)
+
+    Weapons read '16 / 20' (damage against small / large monsters), armour
+    reads '-5' (AC); whatever is missing is NaN.
+    """
+    text = str(item_level or '')
+    match = DAMAGE_RE.match(text)
+    if match:
+        return float(match.group(1)), float(match.group(2)), np.nan
+    match = AC_RE.match(text)
+    if match:
+        return np.nan, np.nan, float(match.group(1))
+    return np.nan, np.nan, np.nan
+
+def column_name(stat, source=None):
+    """
+    Return the wide-table column of a stat: procs get a 發動: prefix, percentages a % suffix,
+    blessed stats (item_stats2) a 祝福: prefix
+    """
+    name = f"發動:{stat.key}" if stat.proc else stat.key
+    name = f"{name}%" if stat.unit == '%' and not stat.proc else name
+    return BLESSED_PREFIX + name if source == BLESSED_SOURCE else name
+
+def column_names(stats):
+    """
+    Return column_name() for every row of a stat_frame() as a Series
+    """
+    keys = stats['key'].astype(str)
+    percent = (stats['unit'] == '%').to_numpy() & ~stats['proc'].to_numpy()
+    names = pd.Series(np.where(stats['proc'], '發動:' + keys, np.where(percent, keys + '%', keys)), index=stats.index)
+    blessed = (stats['source'] == BLESSED_SOURCE).to_numpy()
+    return names.where(~blessed, BLESSED_PREFIX + names)
+
+def stat_rows(records):
+    """
+    Yield one row per stat of every item: base stats (enhance_level 0) and every enhancement level
+    """
+    for record in records:
+        item_id = str(record.get('item_id', ''))
+        for source in STAT_SOURCES:
+            for text in record.get(source) or []:
+                yield (item_id, source, 0, text) + tuple(parse_stat(text))
+        for entry in record.get('enhance_info') or []:
+            level = entry.get('level', '')
+            if not str(level).isdigit():
+                continue
+            for stat in parse_effects(entry.get('effect')):
+                yield (item_id, 'enhance_info', int(level), entry.get('effect')) + tuple(stat)
+
+def stat_frame(records):
+    """
+    Return every parsed stat as a long DataFrame
+
+    Columns: item_id, source, enhance_level, text, key, value (float64),
+    unit, proc (bool). Enhancement rows hold the effect of that level, which
+    the site lists as totals rather than increments.
+    """
+    frame = pd.DataFrame(stat_rows(records), columns=['item_id', 'source', 'enhance_level', 'text', 'key', 'value', 'unit', 'proc'])
+    frame['enhance_level'] = frame['enhance_level'].astype(np.int16)
+    frame['value'] = frame['value'].astype(np.float64)
+    frame['proc'] = frame['proc'].astype(bool)
+    for column in ('source', 'key', 'unit'):
+        frame[column] = frame[column].astype('category')
+    return frame
+
+def item_frame(records):
+    """
+    Return one row per item with its descriptive columns and parsed damage / AC
+    """
+    rows = []
+    for record in records:
+        small, large, ac = parse_item_level(record.get('item_level'))
+        levels = [int(entry['level']) for entry in record.get('enhance_info') or [] if str(entry.get('level', '')).isdigit()]
+        rows.append((str(record.get('item_id', '')), record.get('item_name', ''), record.get('category_id', ''),
+                     record.get('category_name', ''), record.get('item_grade', ''), small, large, ac, max(levels, default=0)))
+    frame = pd.DataFrame(rows, columns=['item_id', 'item_name', 'category_id', 'category_name', 'item_grade',
+                                        'dmg_small', 'dmg_large', 'ac', 'max_enhance'])
+    frame['max_enhance'] = frame['max_enhance'].astype(np.int16)
+    return frame.set_index('item_id')
+
+def stat_values(stats, items, enhance_level=0):
+    """
+    Return (item_id, column, value) with one summed row per stat of each item
+
+    Args:
+        stats: Long DataFrame from stat_frame()
+        items: DataFrame from item_frame()
+        enhance_level: Add the enhancement effect of this level (capped at each item's maximum)
+
+    Flag stats count as 1.0; the same stat listed twice is summed. Blessed
+    stats (item_stats2) stay in their own 祝福: columns.
+    """
+    columns = column_names(stats)
+    values = stats['value'].fillna(1.0)
+    base = stats['enhance_level'] == 0
+    selected = base
+    if enhance_level:
+        # Each item's own highest level up to the requested one
+        level = np.minimum(items['max_enhance'].reindex(stats['item_id']).to_numpy(), enhance_level)
+        selected = base | ((stats['enhance_level'].to_numpy() == level) & ~base)
+    return (pd.DataFrame({'item_id': stats['item_id'][selected], 'column': columns[selected], 'value': values[selected]})
+            .groupby(['item_id', 'column'], sort=False, observed=True)['value'].sum().reset_index())
+
+def stat_matrix(records, enhance_level=0, stats=None):
+    """
+    Return a wide float DataFrame indexed by item_id: item columns plus one column per stat
+
+    Args:
+        records: Item records (final.json)
+        enhance_level: Add the enhancement effect of this level (capped at each item's maximum)
+        stats: Long DataFrame from stat_frame(), to reuse an already parsed catalog
+
+    Missing stats are 0; see stat_values() for how values are combined.
+    """
+    items = item_frame(records)
+    stats = stat_frame(records) if stats is None else stats
+    wide = stat_values(stats, items, enhance_level).pivot(index='item_id', columns='column', values='value')
+    wide.columns.name = None
+    return items.join(wide.astype(np.float64), how='left').fillna({column: 0.0 for column in wide.columns})
+
+def rank(matrix, column, top=20, ascending=False, **filters):
+    """
+    Return the top items by a stat column, optionally filtered by category_id / item_grade
+    """
+    selected = matrix
+    for name, value in filters.items():
+        if value is not None:
+            selected = selected[selected[name] == value]
+    if column not in selected.columns:
+        raise KeyError(f"Unknown stat column: {column}")
+    return selected.sort_values(column, ascending=ascending, kind='stable').head(top)
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description='Parse item stats into typed columns and rank items')
+    parser.add_argument('command', choices=['keys', 'rank', 'export', 'unparsed'])
+    parser.add_argument('--input', default='final.json', help='Item records')
+    parser.add_argument('--stat', help='rank: stat column, e.g. 額外攻擊, 昏迷命中%%, 發動:格蘭肯的憤怒, dmg_large')
+    parser.add_argument('--level', type=int, default=0, help='Include the enhancement effect of this level')
+    parser.add_argument('--category', help='rank: only this category_id')
+    parser.add_argument('--grade', help='rank: only this item_grade')
+    parser.add_argument('--top', type=int, default=20, help='rank: number of items')
+    parser.add_argument('--ascending', action='store_true', help='rank: lowest first (e.g. AC)')
+    parser.add_argument('--output', default='item_stats.csv', help='export: CSV file for the wide stat table')
+    args = parser.parse_args()
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        records = json.load(f)
+
+    if args.command == 'keys':
+        stats = stat_frame(records)
+        base = stats[stats['enhance_level'] == 0]
+        counts = column_names(base).value_counts()
+        for column, count in counts.items():
+            print(f"{count:6} {column}")
+    elif args.command == 'unparsed':
+        stats = stat_frame(records)
+        flags = stats[stats['value'].isna()].groupby('key', observed=True).size().sort_values(ascending=False)
+        for key, count in flags.items():
+            print(f"{count:6} {key}")
+    elif args.command == 'rank':
+        if not args.stat:
+            parser.error("rank needs --stat")
+        matrix = stat_matrix(records, args.level)
+        top = rank(matrix, args.stat, args.top, args.ascending, category_id=args.category, item_grade=args.grade)
+        for item_id, row in top.iterrows():
+            print(f"{item_id:>6} {row[args.stat]:8g}  {row['category_name']:8} {row['item_name']}")
+    else:
+        matrix = stat_matrix(records, args.level)
+        matrix.to_csv(args.output, encoding='utf-8-sig')
+        print(f"Wrote {len(matrix)} items x {len(matrix.columns)} columns to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+測試頁面指紋、欄位差異與變更紀錄 (離線，使用 example/ 中的頁面)
+"""
+
+import glob
+import json
+import os
+import tempfile
+
+from change_feed import ChangeTracker, MISSING, CONTENT_END, content_fingerprint, diff_records
+
+def example_page():
+    with open(sorted(glob.glob(os.path.join("example", "*.html")))[0], 'r', encoding='utf-8') as f:
+        return f.read()
+
+def rename_item(page):
+    return page.replace('<h2 class="dbTitle">', '<h2 class="dbTitle">改', 1)
+
+def test_fingerprint_ignores_comment_section():
+    """
+    只有物品內容區塊影響指紋；頁首與留言區變動不算物品變更
+    """
+    page = example_page()
+    marker = CONTENT_END.decode('utf-8')
+    head, tail = page.split(marker, 1)
+    assert content_fingerprint(page) == content_fingerprint(head + marker + tail + "<p>新留言</p>")
+    assert content_fingerprint(page) == content_fingerprint(page.encode('utf-8'))
+    assert content_fingerprint(page) == content_fingerprint(page.replace("<head>", "<head><!-- 廣告 -->", 1))
+    assert content_fingerprint(page) != content_fingerprint(rename_item(page))
+    assert content_fingerprint("<html>a</html>") != content_fingerprint("<html>b</html>")
+
+def test_diff_records_nested_fields():
+    """
+    巢狀欄位以 basic_info.重量 表示，缺少的欄位標記為 <missing>，清單整體比較
+    """
+    old = {'item_name': '木劍', 'basic_info': {'重量': '10', '耐久': '50'}, 'item_stats': ['力量+1']}
+    new = {'item_name': '木劍', 'basic_info': {'重量': '12', '材質': '木'}, 'item_stats': ['力量+1', '敏捷+1']}
+    assert diff_records(old, new) == [
+        ('basic_info.重量', '10', '12'),
+        ('basic_info.耐久', '50', MISSING),
+        ('basic_info.材質', MISSING, '木'),
+        ('item_stats', ['力量+1'], ['力量+1', '敏捷+1']),
+    ]
+    assert diff_records(old, dict(old)) == []
+
+def test_tracker_records_added_changed_and_unchanged():
+    """
+    第一次寫入為 added，相同頁面視為未變更，內容改變時只記錄變動的欄位
+    """
+    page = example_page()
+    record = {'item_id': '1', 'item_name': '木劍', 'basic_info': {'重量': '10'}}
+    with tempfile.TemporaryDirectory() as directory:
+        changes_dir = os.path.join(directory, 'changes')
+        tracker = ChangeTracker('test', os.path.join(directory, 'frontier.db'), changes_dir)
+        assert not tracker.check('1', page)
+        assert tracker.commit('1', record) == 'added'
+        assert tracker.check('1', page)
+        tracker.skip('1')
+        assert not tracker.check('1', rename_item(page))
+        changed = dict(record, basic_info={'重量': '12'})
+        assert tracker.commit('1', changed, record) == 'changed'
+        history = tracker.conn.execute("SELECT changed FROM crawl_history WHERE stage = 'test' ORDER BY checked_at").fetchall()
+        tracker.close()
+
+        assert [row[0] for row in history] == [0, 0, 1]
+        with open(os.path.join(changes_dir, 'test.jsonl'), 'r', encoding='utf-8') as f:
+            entries = [json.loads(line) for line in f]
+        assert [entry['op'] for entry in entries] == ['added', 'changed']
+        assert entries[1]['fields'] == {'basic_info.重量': {'old': '10', 'new': '12'}}
+
+if __name__ == "__main__":
+    test_fingerprint_ignores_comment_section()
+    test_diff_records_nested_fields()
+    test_tracker_records_added_changed_and_unchanged()
+    print("變更紀錄測試通過")
@@ -0,0 +1,65 @@
+"""
+測試正規化匯出：拆表後還原的物品資料須與原始資料相同 (離線)
+"""
+
+import copy
+
+from normalized_export import normalize, NormalizedData
+
+ENHANCE = [{'level': '+1', 'rate': '100%'}, {'level': '+2', 'rate': '90%'}]
+CLASSES = ['騎士', '弓箭手']
+
+def drop(monster_id, name, areas=None, **fields):
+    row = {'monster_name': name, 'monster_url': f"/monster/{monster_id}", 'monster_id': monster_id, 'monster_level': '10'}
+    row.update(fields)
+    if areas is not None:
+        row['monster_areas'] = areas
+    return row
+
+RECORDS = [
+    {'item_id': '1', 'item_name': '木劍', 'enhance_info': ENHANCE, 'item_classes': CLASSES,
+     'monster_drops': [drop('m1', '哥布林', ['說話之島']), drop('m2', '狼', ['說話之島', '風木村'])]},
+    {'item_id': '2', 'item_name': '木盾', 'enhance_info': copy.deepcopy(ENHANCE), 'item_classes': list(CLASSES),
+     # 同一隻怪物的掉落資料與第一次出現時不同，且沒有 monster_areas
+     'monster_drops': [drop('m1', '哥布林', monster_level='12')]},
+    {'item_id': '3', 'item_name': '藥水', 'item_classes': ['法師'], 'monster_drops': []},
+    {'item_id': '4', 'item_name': '箭'},
+]
+
+def test_round_trip_gives_back_input():
+    """
+    item() 與 items() 還原的資料與輸入完全相同，包含覆寫欄位、缺少的 monster_areas 與空的掉落清單
+    """
+    data = NormalizedData(normalize(copy.deepcopy(RECORDS)))
+    assert list(data.items()) == RECORDS
+    for record in RECORDS:
+        assert data.item(record['item_id']) == record
+    assert list(data.item('1')['monster_drops'][0]) == list(RECORDS[0]['monster_drops'][0])
+    assert data.item('999') is None
+
+def test_shared_values_and_monsters_stored_once():
+    """
+    相同的強化表、職業清單、怪物與地區只存一次
+    """
+    tables = normalize(copy.deepcopy(RECORDS))
+    assert len(tables['enhance_tables']) == 1
+    assert len(tables['class_sets']) == 2
+    assert [monster['monster_id'] for monster in tables['monsters']] == ['m1', 'm2']
+    assert [area['area_name'] for area in tables['areas']] == ['說話之島', '風木村']
+    assert len(tables['drops']) == 3
+    assert tables['items'][0]['enhance_id'] == tables['items'][1]['enhance_id']
+
+def test_items_dropped_by_monster():
+    """
+    反查某隻怪物掉落的物品
+    """
+    data = NormalizedData(normalize(copy.deepcopy(RECORDS)))
+    assert data.items_dropped_by('m1') == ['1', '2']
+    assert data.items_dropped_by('m2') == ['1']
+    assert data.items_dropped_by('m3') == []
+
+if __name__ == "__main__":
+    test_round_trip_gives_back_input()
+    test_shared_values_and_monsters_stored_once()
+    test_items_dropped_by_monster()
+    print("正規化匯出測試通過")
@@ -0,0 +1,91 @@
+"""
+測試自適應速率限制器 (離線，不發送任何請求)
+"""
+
+from rate_limiter import AdaptiveRateLimiter
+
+URL = "https://www.gametsg.net/equip/detail.html?id=23"
+HOST = "www.gametsg.net"
+
+def test_healthy_responses_ramp_up_to_max_rate():
+    """
+    回應正常時速率逐步增加，但不超過上限
+    """
+    limiter = AdaptiveRateLimiter(initial_rate=1.0, max_rate=2.0, increase_step=0.25)
+    for _ in range(3):
+        limiter.record(URL, 200, 0.1)
+    assert limiter.current_rate(URL) == 1.75
+    for _ in range(10):
+        limiter.record(URL, 200, 0.1)
+    assert limiter.current_rate(URL) == 2.0
+
+def test_throttling_halves_rate_and_honours_retry_after():
+    """
+    429 / 5xx 時速率減半，Retry-After 期間暫停請求
+    """
+    limiter = AdaptiveRateLimiter(initial_rate=4.0, min_rate=0.5)
+    limiter.record(URL, 429, 0.1, retry_after="30")
+    assert limiter.current_rate(URL) == 2.0
+    assert limiter.reserve(URL) > 25
+    for _ in range(5):
+        limiter.record(URL, 503, 0.1)
+    assert limiter.current_rate(URL) == 0.5
+
+def test_baseline_follows_slower_latency():
+    """
+    一次很快的回應之後延遲穩定變慢，速率不應一直停在下限
+    """
+    limiter = AdaptiveRateLimiter(initial_rate=4.0, min_rate=0.2, max_rate=8.0, latency_window=0.0)
+    limiter.record(URL, 200, 0.05)
+    for _ in range(300):
+        limiter.record(URL, 200, 0.5)
+    assert limiter.current_rate(URL) == 8.0
+    assert abs(limiter.buckets[HOST].baseline_latency - 0.5) < 0.01
+
+def test_latency_cuts_are_spaced_by_window():
+    """
+    延遲升高時，每個時間窗只降低一次速率
+    """
+    limiter = AdaptiveRateLimiter(initial_rate=4.0, latency_window=60.0)
+    limiter.record(URL, 200, 0.1)
+    before = limiter.current_rate(URL)
+    limiter.record(URL, 200, 5.0)
+    assert limiter.current_rate(URL) == before * 0.8
+    for _ in range(5):
+        limiter.record(URL, 200, 5.0)
+    assert limiter.current_rate(URL) == before * 0.8
+
+def test_capped_restores_previous_limits():
+    """
+    capped() 只在 with 區塊內套用上限，結束後恢復原本的上下限
+    """
+    limiter = AdaptiveRateLimiter(initial_rate=4.0, min_rate=0.2, max_rate=8.0)
+    limiter.record(URL, 200, 0.1)
+    with limiter.capped(0.1):
+        assert limiter.current_rate(URL) == 0.1
+        limiter.record(URL, 200, 0.1)
+        assert limiter.current_rate(URL) == 0.1
+    assert (limiter.max_rate, limiter.min_rate) == (8.0, 0.2)
+    limiter.record(URL, 200, 0.1)
+    assert limiter.current_rate(URL) > 0.1
+
+def test_capped_without_a_positive_rate_is_no_limit():
+    """
+    capped(None) 與 capped(0) 不改變上限 (--rps 0 表示不限制)
+    """
+    limiter = AdaptiveRateLimiter(initial_rate=4.0, max_rate=8.0)
+    for max_rate in (None, 0, -1):
+        with limiter.capped(max_rate):
+            assert limiter.max_rate == 8.0
+            limiter.reserve(URL)
+            limiter.reserve(URL)
+            assert limiter.current_rate(URL) == 4.0
+
+if __name__ == "__main__":
+    test_healthy_responses_ramp_up_to_max_rate()
+    test_throttling_halves_rate_and_honours_retry_after()
+    test_baseline_follows_slower_latency()
+    test_latency_cuts_are_spaced_by_window()
+    test_capped_restores_previous_limits()
+    test_capped_without_a_positive_rate_is_no_limit()
+    print("速率限制器測試通過")
@@ -0,0 +1,83 @@
+"""
+測試重試策略、斷路器與斷路時歸還爬取進度 (離線，不發送任何請求)
+"""
+
+import os
+import tempfile
+
+import requests
+
+from crawl_frontier import CrawlFrontier, PENDING, IN_FLIGHT
+from retry_policy import RetryPolicy, CircuitBreaker, CircuitOpenError
+
+URL = "https://www.gametsg.net/equip/detail.html?id=23"
+
+def test_retry_policy_backoff_and_retryable_errors():
+    """
+    退避時間不超過上限；只重試暫時性錯誤，斷路錯誤不重試
+    """
+    policy = RetryPolicy(max_attempts=4, base_delay=1.0, max_delay=5.0)
+    for attempt in range(1, 10):
+        assert 0 <= policy.delay_for(attempt) <= min(5.0, 2 ** (attempt - 1))
+    assert policy.is_retryable_status(503)
+    assert policy.is_retryable_status(429)
+    assert not policy.is_retryable_status(404)
+    assert policy.is_retryable_error(requests.ConnectionError())
+    assert policy.is_retryable_error(requests.Timeout())
+    assert not policy.is_retryable_error(CircuitOpenError("open", 10.0))
+    assert not policy.is_retryable_error(ValueError())
+
+def test_circuit_opens_after_threshold_and_reports_wait():
+    """
+    連續失敗達門檻後斷路，錯誤帶有需等待的秒數；其他主機不受影響
+    """
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60.0)
+    for _ in range(2):
+        breaker.record_failure(URL)
+    breaker.before_request(URL)
+    breaker.record_failure(URL)
+    try:
+        breaker.before_request(URL)
+        assert False, "circuit should be open"
+    except CircuitOpenError as e:
+        assert 55 < e.retry_after <= 60
+    breaker.before_request("https://example.com/")
+
+def test_half_open_probe_closes_circuit():
+    """
+    等待時間過後只放行一個探測請求，成功後恢復正常
+    """
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure(URL)
+    breaker.before_request(URL)
+    try:
+        breaker.before_request(URL)
+        assert False, "only one probe may be in flight"
+    except CircuitOpenError as e:
+        assert e.retry_after >= 1.0
+    breaker.record_success(URL)
+    breaker.before_request(URL)
+    breaker.before_request(URL)
+
+def test_release_returns_urls_without_counting_attempt():
+    """
+    斷路時歸還的網址回到待處理，且不計入嘗試次數
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        frontier = CrawlFrontier('test', os.path.join(directory, 'frontier.db'))
+        frontier.seed([{'item_id': str(i), 'item_url': f"{URL}{i}"} for i in range(3)])
+        batch = frontier.lease(3)
+        assert frontier.release(urls=[item['item_url'] for item in batch[1:]]) == 2
+        assert frontier.counts() == {IN_FLIGHT: 1, PENDING: 2}
+        attempts = dict(frontier.conn.execute("SELECT item_id, attempts FROM frontier WHERE stage = 'test'").fetchall())
+        assert attempts == {'0': 1, '1': 0, '2': 0}
+        again = frontier.lease(3)
+        assert [item['item_id'] for item in again] == ['1', '2']
+        frontier.close()
+
+if __name__ == "__main__":
+    test_retry_policy_backoff_and_retryable_errors()
+    test_circuit_opens_after_threshold_and_reports_wait()
+    test_half_open_probe_closes_circuit()
+    test_release_returns_urls_without_counting_attempt()
+    print("重試策略測試通過")
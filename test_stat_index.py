@@ -0,0 +1,75 @@
+"""
+測試屬性倒排索引的建立與查詢 (離線)
+"""
+
+import os
+import tempfile
+
+from stat_index import StatIndex, posting_lists, parse_condition
+
+RECORDS = [
+    {'item_id': '1', 'item_name': '長劍', 'category_id': '1', 'category_name': '單手劍', 'item_grade': '一般',
+     'item_level': '16 / 20', 'item_stats': ['額外攻擊+2', '發動:格蘭肯的憤怒 1%'], 'item_classes': [{'name': '騎士'}]},
+    {'item_id': '2', 'item_name': '大劍', 'category_id': '2', 'category_name': '雙手劍', 'item_grade': '稀有',
+     'item_level': '20 / 24', 'item_stats': ['額外攻擊+5', '發動:雷擊 2%'], 'item_classes': [{'name': '騎士'}, {'name': '黑暗妖精'}]},
+    {'item_id': '3', 'item_name': '短劍', 'category_id': '1', 'category_name': '單手劍', 'item_grade': '一般',
+     'item_level': '8 / 6', 'item_stats': ['額外攻擊+5'], 'item_stats2': ['額外攻擊+7'], 'item_classes': [{'name': '妖精'}]},
+    {'item_id': '4', 'item_name': '皮盔甲', 'category_id': '3', 'category_name': '盔甲', 'item_grade': '一般',
+     'item_level': '-3', 'item_stats': ['昏迷命中 +5%'], 'item_classes': [{'name': '騎士'}]},
+]
+
+def test_posting_lists_csr_order():
+    """
+    鍵排序後以 offsets 切分；同一個鍵內依數值、再依物品位置排序
+    """
+    keys, offsets, positions, values = posting_lists([('b', 2, 5.0), ('a', 3, 1.0), ('b', 0, 5.0), ('b', 1, 2.0)])
+    assert keys.tolist() == ['a', 'b']
+    assert offsets.tolist() == [0, 1, 4]
+    assert positions.tolist() == [3, 1, 0, 2]
+    assert values.tolist() == [1.0, 2.0, 5.0, 5.0]
+
+def test_query_by_stat_range_prefix_and_filters():
+    """
+    屬性範圍、屬性前綴、職業與分類條件取交集
+    """
+    index = StatIndex.build(RECORDS)
+    assert index.query([('額外攻擊', 5, None)]) == ['2', '3']
+    assert index.query([('額外攻擊', None, 2)]) == ['1']
+    assert index.query([('額外攻擊', 5, None)], class_name='騎士') == ['2']
+    assert index.query(prefixes=['發動:']) == ['1', '2']
+    assert index.query(prefixes=['祝福:']) == ['3']
+    assert index.query(category_name='單手劍') == ['1', '3']
+    assert index.query([('ac', None, 0)]) == ['4']
+    assert index.query([('dmg_large', 20, None)], grade='稀有') == ['2']
+    assert index.query([('不存在', None, None)]) == []
+    assert index.query() == ['1', '2', '3', '4']
+    assert index.values('額外攻擊', index.matching(class_name='騎士')) == {'1': 2.0, '2': 5.0}
+
+def test_save_and_load_round_trip():
+    """
+    存檔後重新載入，查詢結果不變
+    """
+    index = StatIndex.build(RECORDS)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'stat_index.npz')
+        index.save(path)
+        loaded = StatIndex.load(path)
+    assert loaded.query([('額外攻擊', 5, None)], category='1') == ['3']
+    assert loaded.keys('class')[0] == ('騎士', 3)
+
+def test_parse_condition():
+    """
+    命令列條件 key、key>=5、key<=-3、key=1..5
+    """
+    assert parse_condition('額外攻擊') == ('額外攻擊', None, None)
+    assert parse_condition('額外攻擊>=5') == ('額外攻擊', 5.0, None)
+    assert parse_condition('ac<=-3') == ('ac', None, -3.0)
+    assert parse_condition('額外攻擊=1..5') == ('額外攻擊', 1.0, 5.0)
+    assert parse_condition('額外攻擊=..5') == ('額外攻擊', None, 5.0)
+
+if __name__ == "__main__":
+    test_posting_lists_csr_order()
+    test_query_by_stat_range_prefix_and_filters()
+    test_save_and_load_round_trip()
+    test_parse_condition()
+    print("屬性索引測試通過")
@@ -0,0 +1,70 @@
+"""
+測試屬性字串解析與屬性矩陣 (離線)
+"""
+
+import math
+
+from stat_parser import Stat, parse_stat, parse_item_level, column_name, stat_matrix
+
+def test_parse_stat_forms():
+    """
+    數值在前或在後、百分比、發動效果、使用等級與別名
+    """
+    assert parse_stat('額外攻擊+8') == Stat('額外攻擊', 8.0, '', False)
+    assert parse_stat('+10 武器命中') == Stat('武器命中', 10.0, '', False)
+    assert parse_stat('昏迷命中 +5%') == Stat('昏迷命中', 5.0, '%', False)
+    assert parse_stat('發動:格蘭肯的憤怒 1%') == Stat('格蘭肯的憤怒', 1.0, '%', True)
+    assert parse_stat('68級以上可用') == Stat('使用等級', 68.0, '', False)
+    assert parse_stat('物理防禦(AC)-5') == Stat('物理防禦力(AC)', -5.0, '', False)
+    assert parse_stat('物理防禦力 (AC)-5') == parse_stat('物理防禦(AC)-5')
+
+def test_flag_stats_have_nan_value():
+    """
+    沒有數字的屬性以整段文字為名稱，數值為 NaN
+    """
+    stat = parse_stat('防止武器損壞')
+    assert stat.key == '防止武器損壞'
+    assert math.isnan(stat.value)
+    assert not stat.proc
+
+def test_parse_item_level():
+    """
+    武器為 小 / 大 傷害，防具為 AC，其餘皆為 NaN
+    """
+    small, large, ac = parse_item_level('16 / 20')
+    assert (small, large) == (16.0, 20.0) and math.isnan(ac)
+    small, large, ac = parse_item_level('-5')
+    assert math.isnan(small) and math.isnan(large) and ac == -5.0
+    assert all(math.isnan(value) for value in parse_item_level(None))
+
+def test_column_names_and_blessed_columns():
+    """
+    發動效果加上 發動: 前綴、百分比加上 % 後綴，祝福屬性 (item_stats2) 有自己的欄位
+    """
+    assert column_name(parse_stat('昏迷命中 +5%')) == '昏迷命中%'
+    assert column_name(parse_stat('發動:格蘭肯的憤怒 1%')) == '發動:格蘭肯的憤怒'
+    assert column_name(parse_stat('額外攻擊+8'), 'item_stats2') == '祝福:額外攻擊'
+
+    records = [
+        {'item_id': '1', 'item_name': '長劍', 'item_level': '16 / 20',
+         'item_stats': ['額外攻擊+2', '額外攻擊+1', '防止武器損壞'], 'item_stats2': ['額外攻擊+4'],
+         'enhance_info': [{'level': '1', 'effect': '額外攻擊+1,武器命中+1'}]},
+        {'item_id': '2', 'item_name': '皮盔甲', 'item_level': '-3', 'item_stats': ['昏迷命中 +5%']},
+    ]
+    matrix = stat_matrix(records)
+    assert matrix.loc['1', '額外攻擊'] == 3.0
+    assert matrix.loc['1', '祝福:額外攻擊'] == 4.0
+    assert matrix.loc['1', '防止武器損壞'] == 1.0
+    assert matrix.loc['2', '額外攻擊'] == 0.0
+    assert matrix.loc['2', '昏迷命中%'] == 5.0
+    assert matrix.loc['2', 'ac'] == -3.0
+    enhanced = stat_matrix(records, enhance_level=1)
+    assert enhanced.loc['1', '額外攻擊'] == 4.0
+    assert enhanced.loc['1', '武器命中'] == 1.0
+
+if __name__ == "__main__":
+    test_parse_stat_forms()
+    test_flag_stats_have_nan_value()
+    test_parse_item_level()
+    test_column_names_and_blessed_columns()
+    print("屬性解析測試通過")
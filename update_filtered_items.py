@@ -1,10 +1,14 @@
 import json
 import os
 import re
-import time
-import requests
-from bs4 import BeautifulSoup
 import logging
+from http_client import BASE_URL, get_client
+from page_archive import PageArchive
+from failed_items import DeadLetterQueue
+from retry_policy import CircuitOpenError, wait_for_circuit
+from crawl_frontier import CrawlFrontier, PENDING, IN_FLIGHT, DONE, FAILED
+from jsonl_sink import JsonlSink
+from parser_backend import PARSER_BACKENDS, DEFAULT_PARSER, DETAIL_REGIONS, make_soup
 
 # Configure logging
 logging.basicConfig(
@@ -18,6 +22,11 @@ console.setLevel(logging.INFO)
 console.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
 logging.getLogger('').addHandler(console)
 
+DEFAULT_INPUT_FILE = os.path.join('scraped_data', 'json', 'nonempty_name_items.json')
+DEFAULT_OUTPUT_FILE = os.path.join('scraped_data', 'json', 'updated_nonempty_name_items.json')
+
+MONSTER_ID_RE = re.compile(r'id=(\d+)')
+
 def extract_item_name(soup):
     """Extract item name from the page"""
     try:
@@ -54,8 +63,9 @@ def extract_monster_drops(soup):
                 continue
                 
             monster_name = monster_link.text.strip()
-            monster_url = f"https://www.gametsg.net{monster_link['href']}"
-            monster_id = re.search(r'id=(\d+)', monster_url).group(1) if re.search(r'id=(\d+)', monster_url) else ""
+            monster_url = f"{BASE_URL}{monster_link['href']}"
+            id_match = MONSTER_ID_RE.search(monster_url)
+            monster_id = id_match.group(1) if id_match else ""
             
             # Extract monster type class
             monster_type_span = columns[0].select_one('span')
@@ -102,15 +112,70 @@ def extract_monster_drops(soup):
     
     return monster_drops
 
-def fetch_and_update_items(input_file, output_file, start_index=0, max_items=None):
+def fetch_monster_drops(client, archive, item, parser=DEFAULT_PARSER, regions=None):
+    """Fetch an item page, keep it in the page archive and extract its monster drops"""
+    item_url = item['item_url']
+    response = client.get(item_url)
+    response.raise_for_status()
+    
+    # Keep the raw page in the page archive
+    if item.get('item_id'):
+        archive.put(item['item_id'], response.text, item.get('item_name'), item_url)
+    
+    # Parse the HTML
+    soup = make_soup(response.text, parser, regions)
+    return extract_monster_drops(soup)
+
+def updates_path_for(output_file):
+    """
+    Return the JSONL file that collects monster drop updates for an output file
+    """
+    return os.path.splitext(output_file)[0] + '.jsonl'
+
+def compact_updates(input_file, output_file):
+    """
+    Apply the collected monster drop updates to the input items and write the output file
+    
+    Returns:
+        int: Number of items updated
+    """
+    with open(input_file, 'r', encoding='utf-8') as f:
+        items = json.load(f)
+    
+    monster_drops_by_url = {}
+    for record in JsonlSink(updates_path_for(output_file)):
+        monster_drops_by_url[record['item_url']] = record['monster_drops']
+    
+    updated = 0
+    for item in items:
+        monster_drops = monster_drops_by_url.get(item.get('item_url'))
+        if monster_drops:
+            item['monster_drops'] = monster_drops
+            updated += 1
+    
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(items, f, ensure_ascii=False, indent=2)
+    return updated
+
+def fetch_and_update_items(input_file, output_file, start_index=0, max_items=None, parser=DEFAULT_PARSER, restrict=False):
     """
     Fetch web pages and update item information
     
+    Each item's monster drops are appended to a JSONL file as soon as they are
+    fetched; the output file is written once at the end. Progress is kept in
+    the crawl frontier, so an interrupted run resumes with the remaining items.
+    
+    Selecting a range (start_index > 0 or max_items) fetches exactly those
+    items again, even if an earlier run finished them, as before the crawl
+    frontier existed; items of other ranges left pending are not touched.
+    
     Args:
         input_file (str): Path to the filtered items JSON file
         output_file (str): Path to save the updated items
-        start_index (int): Index to start processing from (for resuming)
-        max_items (int): Maximum number of items to process (None for all)
+        start_index (int): Index of the first item to fetch
+        max_items (int): Maximum number of items to fetch (None for all)
+        parser (str): Parser backend, one of PARSER_BACKENDS
+        restrict (bool): Only parse the page regions the extractors read
     """
     try:
         # Load filtered items
@@ -120,87 +185,136 @@ def fetch_and_update_items(input_file, output_file, start_index=0, max_items=Non
         total_items = len(filtered_items)
         logging.info(f"Loaded {total_items} items from {input_file}")
         
-        # Determine how many items to process
+        # Determine which items to add to the frontier
         items_to_process = filtered_items[start_index:]
         if max_items is not None:
             items_to_process = items_to_process[:max_items]
         
-        logging.info(f"Processing {len(items_to_process)} items starting from index {start_index}")
+        skipped = sum(1 for item in items_to_process if not item.get('item_url'))
+        if skipped:
+            logging.warning(f"{skipped} items have no URL, skipping")
+        frontier = CrawlFrontier('update_filtered_items')
+        frontier.seed(items_to_process)
+        # A selected range only leases its own URLs; pending items of other ranges wait for their run
+        range_urls = None
+        if start_index or max_items is not None:
+            range_urls = list(dict.fromkeys(item['item_url'] for item in items_to_process if item.get('item_url')))
+            requeued = frontier.requeue(urls=range_urls)
+            logging.info(f"Fetching items {start_index} to {start_index + len(items_to_process) - 1} ({requeued} fetched again)")
+        del filtered_items, items_to_process
         
-        session = requests.Session()
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Cache-Control': 'max-age=0',
-        }
+        counts = frontier.counts()
+        logging.info(f"Crawl frontier: {counts.get(PENDING, 0)} pending, {counts.get(DONE, 0)} done, {counts.get(FAILED, 0)} failed")
+        if not counts.get(PENDING) and not counts.get(IN_FLIGHT):
+            logging.info("Every item is already done; the stage is complete. "
+                         "Use --start/--max to fetch a range again, or crawl_frontier.py reset-all --stage update_filtered_items")
         
-        # Process each item
-        for i, item in enumerate(items_to_process):
-            current_index = start_index + i
-            item_url = item.get('item_url', '')
-            if not item_url:
-                logging.warning(f"Item at index {current_index} has no URL, skipping")
-                continue
-            
-            logging.info(f"Processing item {current_index+1}/{total_items}: {item_url}")
-            
-            try:
-                # Fetch the web page
-                response = session.get(item_url, headers=headers)
-                response.raise_for_status()
-                
-                # Parse the HTML
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # Extract item name
-                # item_name = extract_item_name(soup)
-                # if item_name:
-                #     filtered_items[current_index]['item_name'] = item_name
-                #     logging.info(f"Updated item name: {item_name}")
-                
-                # Extract monster drops
-                monster_drops = extract_monster_drops(soup)
-                if monster_drops:
-                    filtered_items[current_index]['monster_drops'] = monster_drops
-                    logging.info(f"Added {len(monster_drops)} monster drops")
-                
-                # Save progress every 10 items
-                if (i + 1) % 10 == 0:
-                    with open(output_file, 'w', encoding='utf-8') as f:
-                        json.dump(filtered_items, f, ensure_ascii=False, indent=2)
-                    logging.info(f"Progress saved after processing {i+1} items")
+        client = get_client()
+        archive = PageArchive()
+        dead_letters = DeadLetterQueue()
+        updates = JsonlSink(updates_path_for(output_file))
+        processed = 0
+        
+        try:
+            while True:
+                batch = frontier.lease(10, urls=range_urls)
+                if not batch:
+                    break
                 
-                # Be nice to the server
-                time.sleep(1)
+                for position, item in enumerate(batch):
+                    item_url = item['item_url']
+                    logging.info(f"Processing item {item.get('item_id', '')}: {item_url}")
+                    
+                    try:
+                        # Fetch the web page and extract monster drops
+                        monster_drops = fetch_monster_drops(client, archive, item, parser, DETAIL_REGIONS if restrict else None)
+                        if monster_drops:
+                            updates.append({'item_url': item_url, 'monster_drops': monster_drops})
+                            logging.info(f"Added {len(monster_drops)} monster drops")
+                        frontier.complete(item_url)
+                    except CircuitOpenError as e:
+                        # The host is down, not the item: hand the rest of the batch back and wait
+                        frontier.release(urls=[entry['item_url'] for entry in batch[position:]])
+                        wait_for_circuit(e)
+                        break
+                    except Exception as e:
+                        logging.error(f"Error processing item {item_url}: {e}")
+                        # Record the failure for replay and continue with the next item
+                        dead_letters.add('update_filtered_items', item, e)
+                        frontier.fail(item_url, e)
+                    
+                    processed += 1
                 
-            except Exception as e:
-                logging.error(f"Error processing item {current_index}: {e}")
-                # Continue with the next item even if this one fails
+                logging.info(f"Progress: processed {processed} items")
+        except KeyboardInterrupt:
+            logging.warning("Interrupted, returning leased items to the frontier")
+            frontier.release()
+        finally:
+            updates.close()
         
-        # Save the final results
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(filtered_items, f, ensure_ascii=False, indent=2)
+        # Write the output file from the collected updates
+        updated = compact_updates(input_file, output_file)
         
-        logging.info(f"Processing complete. Updated data saved to {output_file}")
+        logging.info(f"Processing complete. {updated} updated items saved to {output_file}")
         
     except Exception as e:
         logging.error(f"Error in fetch_and_update_items: {e}")
 
+def replay_failed_items(entries, input_file=DEFAULT_INPUT_FILE, output_file=DEFAULT_OUTPUT_FILE):
+    """
+    Re-fetch monster drops for items from the failed-items list
+    
+    Args:
+        entries (list): Failed-item entries for this stage
+        input_file (str): Filtered items JSON file
+        output_file (str): Updated items file to rebuild
+    
+    Returns:
+        int: Number of items recovered
+    """
+    client = get_client()
+    archive = PageArchive()
+    dead_letters = DeadLetterQueue()
+    updates = JsonlSink(updates_path_for(output_file))
+    recovered = 0
+    
+    for entry in entries:
+        item_url = entry['item_url']
+        try:
+            monster_drops = fetch_monster_drops(client, archive, entry['item'])
+            if monster_drops:
+                updates.append({'item_url': item_url, 'monster_drops': monster_drops})
+            dead_letters.resolve('update_filtered_items', item_url)
+            recovered += 1
+        except CircuitOpenError as e:
+            logging.error(f"{e}; stopping the replay, the remaining items stay in the failed list")
+            break
+        except Exception as e:
+            logging.error(f"Error replaying item {item_url}: {e}")
+            dead_letters.add('update_filtered_items', entry['item'], e)
+    
+    updates.close()
+    compact_updates(input_file, output_file)
+    return recovered
+
 def main():
-    input_file = os.path.join('scraped_data', 'json', 'nonempty_name_items.json')
-    output_file = os.path.join('scraped_data', 'json', 'updated_nonempty_name_items.json')
+    input_file = DEFAULT_INPUT_FILE
+    output_file = DEFAULT_OUTPUT_FILE
     
     # Check if arguments are provided
     import argparse
-    parser = argparse.ArgumentParser(description='Update filtered items with web data')
-    parser.add_argument('--start', type=int, default=0, help='Index to start processing from')
-    parser.add_argument('--max', type=int, help='Maximum number of items to process')
+    parser = argparse.ArgumentParser(
+        description='Update filtered items with web data',
+        epilog='Without --start/--max an interrupted run resumes and a finished stage has nothing left to do; '
+               '--start/--max fetch only the selected items, again even if they are already done.'
+    )
+    parser.add_argument('--start', type=int, default=0, help='Index of the first item to fetch')
+    parser.add_argument('--max', type=int, help='Maximum number of items to fetch')
+    parser.add_argument('--parser', choices=PARSER_BACKENDS, default=DEFAULT_PARSER, help='HTML parser backend')
+    parser.add_argument('--restrict', action='store_true', help='Only parse the page regions the extractors read')
     args = parser.parse_args()
     
-    fetch_and_update_items(input_file, output_file, args.start, args.max)
+    fetch_and_update_items(input_file, output_file, args.start, args.max, args.parser, args.restrict)
 
 if __name__ == "__main__":
     main()
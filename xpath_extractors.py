@@ -0,0 +1,464 @@
+import logging
+import re
+
+from lxml import etree
+
+from parser_backend import has_class, classes, text_of, joined_text, first
+
+logger = logging.getLogger(__name__)
+
+MONSTER_ID_RE = re.compile(r'id=(\d+)')
+
+def label_value_path(section, label, value_path):
+    """
+    XPath for `<section> .ti:contains(label) + .con <value_path>`
+    """
+    return (f"//*[{has_class(section)}]//*[{has_class('ti')}][contains(., '{label}')]"
+            f"/following-sibling::*[1][{has_class('con')}]{value_path}")
+
+# XPath expressions used for every page, compiled once.
+# "(...)[1]" expressions match at most the first element in document order.
+CONN_PATH = f"//*[{has_class('conn')}]"
+COLUMNS = etree.XPath(f".//*[{has_class('column')}]")
+LINK = etree.XPath("(.//a)[1]")
+SPAN = etree.XPath("(.//span)[1]")
+
+# ItemFetcher (final.json)
+ITEM_GRADE = etree.XPath(f"(//*[{has_class('itemTit')}]//*[{has_class('name')}]//span)[1]")
+ITEM_CLASSES = etree.XPath(label_value_path('basicList', '職業', f"//*[{has_class('class')}]"))
+ITEM_CONN = {
+    label: etree.XPath(f"({label_value_path('basicList', label, CONN_PATH)})[1]")
+    for label in ('武器攻擊力', '物理防禦(AC)', '屬性', '祝福屬性', '材質', '重量')
+}
+ITEM_DETAIL = {
+    label: etree.XPath(f"(//*[{has_class('detailInfo')}]{label_value_path('xjList', label, '')})[1]")
+    for label in ('損傷', '倉庫', '交換', '安定值')
+}
+ITEM_ENHANCE_ROWS = etree.XPath(f"//*[{has_class('addList')}]//*[{has_class('tbody')}]//li")
+MONSTER_SECTION = etree.XPath(f"(//*[{has_class('monsterInfo')}])[1]")
+MONSTERS = etree.XPath(f".//*[{has_class('monsInfo')}]")
+MONSTER_NAME = etree.XPath(f"(.//*[{has_class('monsName')}]//a)[1]")
+MONSTER_TYPE = etree.XPath(f"(.//*[{has_class('monsType')}])[1]")
+MONSTER_SIZE = etree.XPath(f"(.//*[{has_class('monsSize')}])[1]")
+MONSTER_LEVEL = etree.XPath(f"(.//*[{has_class('monsLevel')}])[1]")
+MONSTER_WEAKNESSES = etree.XPath(f".//*[{has_class('monsPoint')}]//span")
+MONSTER_AREAS = etree.XPath(f".//*[{has_class('monsAddr')}]//li")
+
+# ItemDetailFetcher (scraped_items/)
+TITLE = etree.XPath(f"(//h2[{has_class('dbTitle')}])[1]")
+BASIC_ROWS = etree.XPath(f"//ul[{has_class('basicList')}]//li")
+DETAIL_ROWS = etree.XPath(f"//ul[{has_class('xjList')}]//li")
+LABEL = etree.XPath(f"(.//*[{has_class('ti')}])[1]")
+VALUE = etree.XPath(f"(.//*[{has_class('con')}])[1]")
+CONTENT = etree.XPath(f"(.//*[{has_class('conn')}])[1]")
+CLASSES = etree.XPath(f".//*[{has_class('class')}]")
+ENHANCE_ROWS = etree.XPath(f"//div[{has_class('addList')}]//div[{has_class('tbody')}]//ul//li")
+CRAFT_SECTION = etree.XPath(f"(//div[{has_class('craftInfo')}])[1]")
+CRAFT_ROWS = etree.XPath(f".//ul[{has_class('craftList')}]/li")
+CRAFT_ALTERNATIVES = etree.XPath(f".//ul[{has_class('craftList')} and {has_class('childList')}]/li[{has_class('subst')}]")
+ITEM_ICON = etree.XPath(f"(.//img[{has_class('itemIcon')}])[1]")
+ITEM_NAME = etree.XPath(f"(.//span[{has_class('itemname')}])[1]")
+COUNT = etree.XPath(f"(.//span[{has_class('count')}])[1]")
+INFO_HEADINGS = etree.XPath(f"//h5[{has_class('infoTit')}]")
+NEXT_TABLE = etree.XPath(f"(descendant::div[{has_class('tbody')}] | following::div[{has_class('tbody')}])[1]")
+TABLE_ROWS = etree.XPath(".//li[parent::ul]")
+MON_SIZE = etree.XPath(f"(.//*[{has_class('monSize')}])[1]")
+WEAKNESS_POINTS = etree.XPath(f".//*[{has_class('point')}]")
+
+
+class ItemXPathExtractor:
+    def __init__(self):
+        """
+        lxml.html/XPath versions of the ItemFetcher extractors
+
+        Each method returns the same value as the ItemFetcher method of the
+        same name does for the BeautifulSoup tree of the page.
+        """
+
+    def extract_basic_info(self, tree):
+        """
+        Extract basic information about the item
+        """
+        basic_info = {}
+
+        try:
+            grade_span = first(ITEM_GRADE(tree))
+            if grade_span is not None and grade_span.get('class') is not None:
+                basic_info['item_grade'] = classes(grade_span)[0]
+        except Exception as e:
+            logger.warning(f"Error extracting item grade: {e}")
+
+        try:
+            class_elements = ITEM_CLASSES(tree)
+            if class_elements:
+                item_classes = []
+                for class_elem in class_elements:
+                    class_name = text_of(class_elem).strip()
+                    class_level = (classes(class_elem) or [''])[0]
+                    item_classes.append({
+                        'name': class_name,
+                        'level': class_level
+                    })
+                basic_info['item_classes'] = item_classes
+
+                if item_classes:
+                    class_levels = [c['level'].replace('level', '') for c in item_classes if 'level' in c]
+                    if class_levels:
+                        basic_info['data_zhiye'] = '|'.join(class_levels)
+        except Exception as e:
+            logger.warning(f"Error extracting item classes: {e}")
+
+        for label, key in (('武器攻擊力', 'attack'), ('物理防禦(AC)', 'defense'), ('材質', 'material'), ('重量', 'weight')):
+            try:
+                element = first(ITEM_CONN[label](tree))
+                if element is not None:
+                    basic_info[key] = text_of(element).strip()
+                    if key == 'attack':
+                        basic_info['item_level'] = basic_info['attack']
+            except Exception as e:
+                logger.warning(f"Error extracting {key}: {e}")
+
+        for label, key in (('屬性', 'item_stats'), ('祝福屬性', 'item_stats2')):
+            try:
+                element = first(ITEM_CONN[label](tree))
+                if element is not None:
+                    stats_text = joined_text(element, "\n").strip()
+                    basic_info[key] = [s.strip() for s in stats_text.split('\n') if s.strip()]
+            except Exception as e:
+                logger.warning(f"Error extracting {key}: {e}")
+
+        # Keep the key order of ItemFetcher.extract_basic_info
+        order = ['item_grade', 'item_classes', 'data_zhiye', 'attack', 'item_level', 'defense',
+                 'item_stats', 'item_stats2', 'material', 'weight']
+        return {key: basic_info[key] for key in order if key in basic_info}
+
+    def extract_detail_info(self, tree):
+        """
+        Extract detailed information about the item
+        """
+        detail_info = {}
+
+        for label, key in (('損傷', 'canbedmg'), ('倉庫', 'store'), ('交換', 'trade'), ('安定值', 'safe_val')):
+            try:
+                element = first(ITEM_DETAIL[label](tree))
+                if element is not None:
+                    detail_info[key] = text_of(element).strip()
+            except Exception as e:
+                logger.warning(f"Error extracting {key}: {e}")
+
+        return detail_info
+
+    def extract_enhance_info(self, tree):
+        """
+        Extract enhancement information
+        """
+        enhance_info = []
+
+        try:
+            for element in ITEM_ENHANCE_ROWS(tree):
+                columns = COLUMNS(element)
+                if len(columns) >= 2:
+                    enhance_info.append({
+                        'level': text_of(columns[0]).strip(),
+                        'effect': text_of(columns[1]).strip()
+                    })
+        except Exception as e:
+            logger.warning(f"Error extracting enhancement info: {e}")
+
+        return enhance_info
+
+    def extract_monster_drops(self, tree):
+        """
+        Extract monster drops information
+        """
+        monster_drops = []
+
+        try:
+            monster_section = first(MONSTER_SECTION(tree))
+            if monster_section is not None:
+                for monster_elem in MONSTERS(monster_section):
+                    monster_info = {}
+
+                    name_elem = first(MONSTER_NAME(monster_elem))
+                    if name_elem is not None:
+                        monster_info['monster_name'] = text_of(name_elem).strip()
+                        monster_info['monster_url'] = name_elem.get('href', '')
+                        if monster_info['monster_url'] and not monster_info['monster_url'].startswith('http'):
+                            monster_info['monster_url'] = f"https://www.gametsg.net{monster_info['monster_url']}"
+
+                        id_match = MONSTER_ID_RE.search(monster_info['monster_url'])
+                        if id_match:
+                            monster_info['monster_id'] = id_match.group(1)
+
+                    type_elem = first(MONSTER_TYPE(monster_elem))
+                    if type_elem is not None:
+                        type_classes = classes(type_elem)
+                        monster_info['monster_type'] = type_classes[1] if len(type_classes) > 1 else ''
+                        monster_info['monster_size'] = text_of(type_elem).strip()
+
+                    size_elem = first(MONSTER_SIZE(monster_elem))
+                    if size_elem is not None:
+                        monster_info['monster_size_class'] = (classes(size_elem) or [''])[0]
+
+                    level_elem = first(MONSTER_LEVEL(monster_elem))
+                    if level_elem is not None:
+                        monster_info['monster_level'] = text_of(level_elem).strip()
+
+                    weakness_elements = MONSTER_WEAKNESSES(monster_elem)
+                    if weakness_elements:
+                        monster_info['monster_weaknesses'] = [
+                            {'type': text_of(elem).strip(), 'class': (classes(elem) or [''])[0]}
+                            for elem in weakness_elements
+                        ]
+
+                    area_elements = MONSTER_AREAS(monster_elem)
+                    if area_elements:
+                        monster_info['monster_areas'] = [text_of(elem).strip() for elem in area_elements if text_of(elem).strip()]
+
+                    monster_drops.append(monster_info)
+        except Exception as e:
+            logger.warning(f"Error extracting monster drops: {e}")
+
+        return monster_drops
+
+
+class DetailXPathExtractor:
+    def __init__(self, fetcher):
+        """
+        lxml.html/XPath versions of the ItemDetailFetcher extractors
+
+        Args:
+            fetcher: The ItemDetailFetcher, for clean_text and base_url
+        """
+        self.clean_text = fetcher.clean_text
+        self.base_url = fetcher.base_url
+
+    def extract_basic_info(self, tree, item_data):
+        """
+        Extract basic information from the item detail page
+        """
+        basic_info = {}
+
+        try:
+            title = first(TITLE(tree))
+            if title is not None:
+                basic_info['title'] = self.clean_text(text_of(title))
+
+            for li in BASIC_ROWS(tree):
+                label = first(LABEL(li))
+                value = first(VALUE(li))
+
+                if label is not None and value is not None:
+                    label_text = self.clean_text(text_of(label))
+
+                    content = first(CONTENT(value))
+                    if label_text == "職業":
+                        class_list = []
+                        for span in CLASSES(value):
+                            span_classes = classes(span)
+                            class_list.append({"name": self.clean_text(text_of(span)), "level": span_classes[1] if len(span_classes) > 1 else ""})
+                        basic_info[label_text] = class_list
+                    elif content is not None:
+                        values = [self.clean_text(v) for v in text_of(content).split("\n") if self.clean_text(v)]
+                        basic_info[label_text] = values[0] if len(values) == 1 else values
+                    else:
+                        basic_info[label_text] = self.clean_text(text_of(value))
+
+            return basic_info
+
+        except Exception as e:
+            logger.error(f"Error extracting basic info for {item_data.get('item_name', '')}: {str(e)}")
+            return basic_info
+
+    def extract_detail_info(self, tree, item_data):
+        """
+        Extract detail information from the item detail page
+        """
+        detail_info = {}
+
+        try:
+            for li in DETAIL_ROWS(tree):
+                label = first(LABEL(li))
+                value = first(VALUE(li))
+
+                if label is not None and value is not None:
+                    detail_info[self.clean_text(text_of(label))] = self.clean_text(text_of(value))
+
+            return detail_info
+
+        except Exception as e:
+            logger.error(f"Error extracting detail info for {item_data.get('item_name', '')}: {str(e)}")
+            return detail_info
+
+    def extract_enhance_info(self, tree, item_data):
+        """
+        Extract enhancement information from the item detail page
+        """
+        enhance_info = []
+
+        try:
+            for li in ENHANCE_ROWS(tree):
+                columns = COLUMNS(li)
+                if len(columns) >= 2:
+                    enhance_info.append({
+                        "level": self.clean_text(text_of(columns[0])),
+                        "attributes": self.clean_text(text_of(columns[1]))
+                    })
+
+            return enhance_info
+
+        except Exception as e:
+            logger.error(f"Error extracting enhancement info for {item_data.get('item_name', '')}: {str(e)}")
+            return enhance_info
+
+    def id_from_href(self, href):
+        """
+        Return the part after 'id=' in a link, or ''
+        """
+        return href.split('id=')[-1] if 'id=' in href else ''
+
+    def extract_craft_materials(self, tree, item_data):
+        """
+        Extract manufacturing materials information from the item detail page
+        """
+        craft_materials = []
+
+        try:
+            craft_section = first(CRAFT_SECTION(tree))
+            if craft_section is None:
+                return craft_materials
+
+            for item in CRAFT_ROWS(craft_section):
+                material = {}
+
+                material_link = first(LINK(item))
+                if material_link is not None:
+                    href = material_link.get('href', '')
+                    material['material_url'] = self.base_url + href
+                    material['material_id'] = self.id_from_href(href)
+                    material['material_name'] = self.clean_text(material_link.get('title', ''))
+
+                    material_icon = first(ITEM_ICON(material_link))
+                    if material_icon is not None:
+                        material['material_image'] = self.base_url + material_icon.get('src', '')
+
+                    name_span = first(ITEM_NAME(material_link))
+                    if name_span is not None:
+                        name_classes = classes(name_span)
+                        material['material_grade'] = name_classes[1] if len(name_classes) > 1 else ''
+
+                        count_span = first(COUNT(name_span))
+                        if count_span is not None:
+                            material['material_count'] = self.clean_text(text_of(count_span))
+
+                alternatives = []
+                for alt in CRAFT_ALTERNATIVES(item):
+                    alternative = {}
+
+                    alt_link = first(LINK(alt))
+                    if alt_link is not None:
+                        href = alt_link.get('href', '')
+                        alternative['alt_url'] = self.base_url + href
+                        alternative['alt_id'] = self.id_from_href(href)
+
+                        alt_name_span = first(ITEM_NAME(alt_link))
+                        if alt_name_span is not None:
+                            alternative['alt_name'] = self.clean_text(text_of(alt_name_span).split('x')[0])
+                            alt_classes = classes(alt_name_span)
+                            alternative['alt_grade'] = alt_classes[1] if len(alt_classes) > 1 else ''
+
+                            alt_count_span = first(COUNT(alt_name_span))
+                            if alt_count_span is not None:
+                                alternative['alt_count'] = self.clean_text(text_of(alt_count_span))
+
+                    if alternative:
+                        alternatives.append(alternative)
+
+                if alternatives:
+                    material['alternatives'] = alternatives
+
+                if material:
+                    craft_materials.append(material)
+
+            return craft_materials
+
+        except Exception as e:
+            logger.error(f"Error extracting craft materials for {item_data.get('item_name', '')}: {str(e)}")
+            return craft_materials
+
+    def only_string(self, element):
+        """
+        Return BeautifulSoup's .string for an lxml element: its text when it has
+        a single text child, following a chain of single-child elements
+        """
+        children = list(element)
+        if not children:
+            return element.text
+        if len(children) == 1 and not element.text and not children[0].tail and isinstance(children[0].tag, str):
+            return self.only_string(children[0])
+        return None
+
+    def extract_monster_drops(self, tree, item_data):
+        """
+        Extract monster drop information from the item detail page
+        """
+        monster_drops = []
+
+        try:
+            monster_section = None
+            for heading in INFO_HEADINGS(tree):
+                if self.only_string(heading) == '怪物掉落訊息':
+                    monster_section = heading
+                    break
+            if monster_section is None:
+                return monster_drops
+
+            monster_table = first(NEXT_TABLE(monster_section))
+            if monster_table is None:
+                return monster_drops
+
+            for row in TABLE_ROWS(monster_table):
+                monster = {}
+                columns = COLUMNS(row)
+
+                if len(columns) < 5:
+                    continue
+
+                monster_link = first(LINK(columns[0]))
+                if monster_link is not None:
+                    href = monster_link.get('href', '')
+                    monster['monster_name'] = self.clean_text(text_of(monster_link))
+                    monster['monster_url'] = self.base_url + href
+                    monster['monster_id'] = self.id_from_href(href)
+                    link_span = first(SPAN(monster_link))
+                    monster['monster_type'] = classes(link_span)[-1] if link_span is not None else ''
+
+                size_span = first(MON_SIZE(columns[1]))
+                if size_span is not None:
+                    size_classes = classes(size_span)
+                    monster['monster_size'] = self.clean_text(text_of(size_span))
+                    monster['monster_size_class'] = size_classes[-1] if len(size_classes) > 1 else ''
+
+                monster['monster_level'] = self.clean_text(text_of(columns[2]))
+
+                weaknesses = []
+                for span in WEAKNESS_POINTS(columns[3]):
+                    span_classes = classes(span)
+                    weaknesses.append({
+                        'type': self.clean_text(text_of(span)),
+                        'class': span_classes[-1] if len(span_classes) > 1 else ''
+                    })
+
+                if weaknesses:
+                    monster['monster_weaknesses'] = weaknesses
+
+                monster['monster_areas'] = [self.clean_text(area) for area in text_of(columns[4]).split('\n') if self.clean_text(area)]
+
+                if monster:
+                    monster_drops.append(monster)
+
+            return monster_drops
+
+        except Exception as e:
+            logger.error(f"Error extracting monster drop info for {item_data.get('item_name', '')}: {str(e)}")
+            return monster_drops